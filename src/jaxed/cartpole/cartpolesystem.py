@@ -1,7 +1,68 @@
 from __future__ import annotations
+from typing import NamedTuple
 import jax
 import jax.numpy as jnp
-from eom import generate_dynamics_with_1_poles, generate_dynamics_with_2_poles
+from eom import dynamics_with_1_poles, dynamics_with_2_poles, dynamics_with_3_poles, dynamics_with_4_poles
+
+# Dynamics, observation and distance functions, compiled once per pole count and shared by every parameterization
+DYNAMICS_FUNCTIONS = {
+    1: (dynamics_with_1_poles.dynamics_function, dynamics_with_1_poles.observation_function, dynamics_with_1_poles.distance_function),
+    2: (dynamics_with_2_poles.dynamics_function, dynamics_with_2_poles.observation_function, dynamics_with_2_poles.distance_function),
+    3: (dynamics_with_3_poles.dynamics_function, dynamics_with_3_poles.observation_function, dynamics_with_3_poles.distance_function),
+    4: (dynamics_with_4_poles.dynamics_function, dynamics_with_4_poles.observation_function, dynamics_with_4_poles.distance_function),
+}
+
+# The fused dynamics and observation kernel and the analytic jacobians of the dynamics
+FUSED_FUNCTIONS = {
+    1: (dynamics_with_1_poles.dynamics_and_observe_function, dynamics_with_1_poles.dynamics_jacobian_function),
+    2: (dynamics_with_2_poles.dynamics_and_observe_function, dynamics_with_2_poles.dynamics_jacobian_function),
+    3: (dynamics_with_3_poles.dynamics_and_observe_function, dynamics_with_3_poles.dynamics_jacobian_function),
+    4: (dynamics_with_4_poles.dynamics_and_observe_function, dynamics_with_4_poles.dynamics_jacobian_function),
+}
+
+class CartPoleParams(NamedTuple):
+    cart_mass: jnp.ndarray
+    gravity: jnp.ndarray
+    gravity_orientation: jnp.ndarray
+    masses: jnp.ndarray
+    lengths: jnp.ndarray
+    centres_of_mass: jnp.ndarray
+    frictions: jnp.ndarray
+    inertias: jnp.ndarray
+
+def generate_random_cartpole_params(
+        key, 
+        n_poles: int,
+        cart_mass_range: tuple[float, float],
+        gravity_range: tuple[float, float],
+        gravity_orientation_range: tuple[float, float],
+        masses_range: tuple[float, float],
+        lengths_range: tuple[float, float],
+        frictions_range: tuple[float, float],
+        inertias_range: tuple[float, float]
+        ) -> CartPoleParams:
+    # Only traceable operations, so this can run inside jax.jit and jax.vmap
+    # Every parameter gets its own key, otherwise the samples are correlated
+    keys = jax.random.split(key, 8)
+    cart_mass = jax.random.uniform(keys[0], minval=cart_mass_range[0], maxval=cart_mass_range[1])
+    gravity = jax.random.uniform(keys[1], minval=gravity_range[0], maxval=gravity_range[1])
+    gravity_orientation = jax.random.uniform(keys[2], minval=gravity_orientation_range[0], maxval=gravity_orientation_range[1])
+    masses = jax.random.uniform(keys[3], shape=(n_poles,), minval=masses_range[0], maxval=masses_range[1])
+    lengths = jax.random.uniform(keys[4], shape=(n_poles,), minval=lengths_range[0], maxval=lengths_range[1])
+    centres_of_mass = jax.random.uniform(keys[5], shape=(n_poles,), minval=lengths_range[0] * 0.1, maxval=lengths_range[1] * 0.9)
+    frictions = jax.random.uniform(keys[6], shape=(n_poles,), minval=frictions_range[0], maxval=frictions_range[1])
+    inertias = jax.random.uniform(keys[7], shape=(n_poles,), minval=inertias_range[0], maxval=inertias_range[1])
+    return CartPoleParams(cart_mass, gravity, gravity_orientation, masses, lengths, centres_of_mass, frictions, inertias)
+
+def generate_random_cartpole_params_batch(keys, n_poles: int, *ranges: tuple[float, float]) -> CartPoleParams:
+    # One system per key, stacked along the first axis of every field for domain randomization with jax.vmap
+    return jax.vmap(lambda key: generate_random_cartpole_params(key, n_poles, *ranges))(keys)
+
+def dynamics_functions(n_poles: int):
+    return DYNAMICS_FUNCTIONS[n_poles]
+
+def fused_functions(n_poles: int):
+    return FUSED_FUNCTIONS[n_poles]
 
 def generate_random_cartpole_system(
         key, 
@@ -15,15 +76,10 @@ def generate_random_cartpole_system(
         inertias_range: tuple[float, float]
         ) -> CartPoleSystem:
     assert n_poles > 0
-    cart_mass = jax.random.uniform(key, minval=cart_mass_range[0], maxval=cart_mass_range[1])
-    gravity = jax.random.uniform(key, minval=gravity_range[0], maxval=gravity_range[1])
-    gravity_orientation = jax.random.uniform(key, minval=gravity_orientation_range[0], maxval=gravity_orientation_range[1])
-    masses = jax.random.uniform(key, shape=(n_poles,), minval=masses_range[0], maxval=masses_range[1])
-    lengths = jax.random.uniform(key, shape=(n_poles,), minval=lengths_range[0], maxval=lengths_range[1])
-    centres_of_mass = jax.random.uniform(key, shape=(n_poles,), minval=lengths_range[0] * 0.1, maxval=lengths_range[1] * 0.9)
-    frictions = jax.random.uniform(key, shape=(n_poles,), minval=frictions_range[0], maxval=frictions_range[1])
-    inertias = jax.random.uniform(key, shape=(n_poles,), minval=inertias_range[0], maxval=inertias_range[1])
-    return CartPoleSystem(n_poles, cart_mass, gravity, gravity_orientation, masses, lengths, centres_of_mass, frictions, inertias)
+    params = generate_random_cartpole_params(
+        key, n_poles, cart_mass_range, gravity_range, gravity_orientation_range, masses_range, lengths_range, frictions_range, inertias_range
+    )
+    return CartPoleSystem(n_poles, *params)
 
 class CartPoleSystem:
     def __init__(
@@ -38,7 +94,7 @@ class CartPoleSystem:
             frictions: jnp.ndarray,
             inertias: jnp.ndarray
             ) -> None:
-        assert 1 <= n_poles <= 2
+        assert n_poles in DYNAMICS_FUNCTIONS
         self._n_poles = n_poles
 
         assert cart_mass > 0
@@ -65,15 +121,13 @@ class CartPoleSystem:
         assert inertias.shape == (n_poles,)
         self._inertias = inertias
 
-        match n_poles:
-            case 1:
-                generate_dynamics = generate_dynamics_with_1_poles
-            case 2:
-                generate_dynamics = generate_dynamics_with_2_poles
-
-        self.dynamics, self.observe, self.distance = generate_dynamics(
-            cart_mass, gravity, gravity_orientation, masses, lengths, centres_of_mass, frictions, inertias
-        )
+        dynamics, observe, distance = DYNAMICS_FUNCTIONS[n_poles]
+        self.dynamics = lambda state, action: dynamics(state, action, self.params)
+        self.observe = lambda state, action: observe(state, action, self.params)
+        self.distance = distance
+        dynamics_and_observe, jacobian = FUSED_FUNCTIONS[n_poles]
+        self.dynamics_and_observe = lambda state, action: dynamics_and_observe(state, action, self.params)
+        self.jacobian = lambda state, action: jacobian(state, action, self.params)
     
     @property
     def n_poles(self) -> int:
@@ -107,6 +161,12 @@ class CartPoleSystem:
     def inertias(self) -> jnp.ndarray:
         return self._inertias
 
+    @property
+    def params(self) -> CartPoleParams:
+        return CartPoleParams(
+            self._cart_mass, self._gravity, self._gravity_orientation, self._masses, self._lengths, self._centres_of_mass, self._frictions, self._inertias
+        )
+
     def __call__(self, state: jnp.ndarray, action: jnp.ndarray) -> jnp.ndarray:
         return self.dynamics(state, action)
 
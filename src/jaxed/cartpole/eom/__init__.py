@@ -1,3 +1,6 @@
-from .eom import load_equations_of_motions, save_equations_of_motions, calculate_equations_of_motions, substitute_params, generate_dynamic_vars, generate_param_vars
+from .eom import load_equations_of_motions, save_equations_of_motions, calculate_equations_of_motions, load_mass_matrix, save_mass_matrix, calculate_mass_matrix, calculate_euler_lagrange_equations, substitute_params, generate_dynamic_vars, generate_param_vars
+from .dynamics import dynamics_with_1_poles, dynamics_with_2_poles, dynamics_with_3_poles, dynamics_with_4_poles
 from .dynamics.dynamics_with_1_poles import generate_dynamics_with_1_poles
-from .dynamics.dynamics_with_2_poles import generate_dynamics_with_2_poles
\ No newline at end of file
+from .dynamics.dynamics_with_2_poles import generate_dynamics_with_2_poles
+from .dynamics.dynamics_with_3_poles import generate_dynamics_with_3_poles
+from .dynamics.dynamics_with_4_poles import generate_dynamics_with_4_poles
\ No newline at end of file
@@ -4,34 +4,114 @@ from typing import Sequence, Callable
 
 # This file and its content are generated by generate_dynamics.py
 
-def generate_dynamics_with_1_poles(mc: float, g: float, phi: float, pole_ms: Sequence[float], pole_ls: Sequence[float], pole_as: Sequence[float], pole_ds: Sequence[float], pole_Js: Sequence[float]) -> tuple[Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray], Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray], Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray]]:
+def lu_factor(A: list) -> tuple[list, list]:
+	n = len(A)
+	U = [list(row) for row in A]
+	L = [[0]*n for _ in range(n)]
+	for k in range(n):
+		for i in range(k+1, n):
+			L[i][k] = U[i][k]/U[k][k]
+			for j in range(k+1, n):
+				U[i][j] = U[i][j] - L[i][k]*U[k][j]
+	return L, U
+
+def lu_solve(lu: tuple[list, list], b: list) -> list:
+	L, U = lu
+	n = len(b)
+	y = list(b)
+	for i in range(n):
+		y[i] = y[i] - sum(L[i][k]*y[k] for k in range(i))
+	x = [0]*n
+	for k in reversed(range(n)):
+		x[k] = (y[k] - sum(U[k][j]*x[j] for j in range(k+1, n)))/U[k][k]
+	return x
+
+def linear_solve(A: list, b: list) -> list:
+	return lu_solve(lu_factor(A), b)
+
+def solve_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> list:
+	mc, g, phi, pole_ms, pole_ls, pole_as, pole_ds, pole_Js = params
 	m1, l1, a1, d1, J1 = pole_ms[0], pole_ls[0], pole_as[0], pole_ds[0], pole_Js[0]
+	s, ds, theta1, dtheta1 = state
+	dds = action[0]
+	x0 = a1*m1
+	x1 = x0*jnp.cos(theta1)
+	A = [
+		[J1 + a1**2*m1, 0],
+		[x1, -1],
+	]
+	b = [-d1*dtheta1 - dds*x1 - g*x0*jnp.sin(phi - theta1), -dds*(m1 + mc) - m1*(-a1*dtheta1**2*jnp.sin(theta1) + g*jnp.sin(phi))]
+	# [ddtheta1, ..., ddthetan, tau]
+	return linear_solve(A, b)
+
+@jax.jit
+def dynamics_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> jnp.ndarray:
+	s, ds, theta1, dtheta1 = state
+	dds = action[0]
+	unknowns = solve_function(state, action, params)
+	dstate = jnp.array([ds, dds, dtheta1, unknowns[0]])
+	return dstate
+
+@jax.jit
+def observation_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> jnp.ndarray:
+	s, ds, theta1, dtheta1 = state
+	tau = solve_function(state, action, params)[-1]
+	observation = jnp.array([s, ds, theta1, dtheta1, tau])
+	return observation
 
-	@jax.jit
-	def dynamics_function(state: jnp.ndarray, action: jnp.ndarray) -> jnp.ndarray:
-		s, ds, theta1, dtheta1 = state
-		dds = action[0]
-		ddtheta1 = (-a1*dds*m1*jnp.cos(theta1) - a1*g*m1*jnp.sin(phi - theta1) - d1*dtheta1)/(J1 + a1**2*m1)
-		dstate = jnp.array([ds, dds, dtheta1, ddtheta1])
-		return dstate
-
-	@jax.jit
-	def observation_function(state: jnp.ndarray, action: jnp.ndarray) -> jnp.ndarray:
-		s, ds, theta1, dtheta1 = state
-		dds = action[0]
-		tau = (-J1*a1*dtheta1**2*m1*jnp.sin(theta1) + J1*dds*m1 + J1*dds*mc + J1*g*m1*jnp.sin(phi) - a1**3*dtheta1**2*m1**2*jnp.sin(theta1) + a1**2*dds*m1**2*jnp.sin(theta1)**2 + a1**2*dds*m1*mc + a1**2*g*m1**2*jnp.sin(phi) - a1**2*g*m1**2*jnp.sin(phi - theta1)*jnp.cos(theta1) - a1*d1*dtheta1*m1*jnp.cos(theta1))/(J1 + a1**2*m1)
-		observation = jnp.array([s, ds, theta1, dtheta1, tau])
-		return observation
-
-	@jax.jit
-	def distance_function(state: jnp.ndarray, goal_state: jnp.ndarray) -> jnp.ndarray:
-		s, ds, theta1, dtheta1 = state
-		s_, ds_, theta1_, dtheta1_ = goal_state
-		dist_s = s_-s
-		dist_ds = ds_-ds
-		dist_theta1 = jnp.arctan2(jnp.sin(theta1-theta1_), jnp.cos(theta1-theta1_))
-		dist_dtheta1 = dtheta1_-dtheta1
-		dist = jnp.array([dist_s, dist_ds, dist_theta1, dist_dtheta1])
-		return dist
-
-	return dynamics_function, observation_function, distance_function
+@jax.jit
+def dynamics_and_observe_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> tuple[jnp.ndarray, jnp.ndarray]:
+	s, ds, theta1, dtheta1 = state
+	dds = action[0]
+	unknowns = solve_function(state, action, params)
+	dstate = jnp.array([ds, dds, dtheta1, unknowns[0]])
+	observation = jnp.array([s, ds, theta1, dtheta1, unknowns[-1]])
+	return dstate, observation
+
+@jax.jit
+def dynamics_jacobian_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> tuple[jnp.ndarray, jnp.ndarray]:
+	mc, g, phi, pole_ms, pole_ls, pole_as, pole_ds, pole_Js = params
+	m1, l1, a1, d1, J1 = pole_ms[0], pole_ls[0], pole_as[0], pole_ds[0], pole_Js[0]
+	s, ds, theta1, dtheta1 = state
+	dds = action[0]
+	x0 = a1*m1
+	x1 = x0*jnp.cos(theta1)
+	x2 = phi - theta1
+	x3 = g*x0
+	x4 = m1 + mc
+	x5 = jnp.sin(theta1)
+	x6 = dtheta1**2
+	x7 = x0*x5
+	A = [
+		[J1 + a1**2*m1, 0],
+		[x1, -1],
+	]
+	b = [-d1*dtheta1 - dds*x1 - x3*jnp.sin(x2), -dds*x4 - m1*(-a1*x5*x6 + g*jnp.sin(phi))]
+	lu = lu_factor(A)
+	unknowns = lu_solve(lu, b)
+	jac_theta1 = lu_solve(lu, [dds*x7 + x3*jnp.cos(x2), x1*x6 - (-x7)*unknowns[0]])
+	jac_dtheta1 = lu_solve(lu, [-d1, 2*dtheta1*x7])
+	jac_dds = lu_solve(lu, [-x1, -x4])
+	jacobian_state = jnp.array([
+		[0, 1, 0, 0],
+		[0, 0, 0, 0],
+		[0, 0, 0, 1],
+		[0, 0, jac_theta1[0], jac_dtheta1[0]],
+	])
+	jacobian_action = jnp.array([[0], [1], [0], [jac_dds[0]]])
+	return jacobian_state, jacobian_action
+
+@jax.jit
+def distance_function(state: jnp.ndarray, goal_state: jnp.ndarray) -> jnp.ndarray:
+	s, ds, theta1, dtheta1 = state
+	s_, ds_, theta1_, dtheta1_ = goal_state
+	dist_s = s_-s
+	dist_ds = ds_-ds
+	dist_theta1 = jnp.arctan2(jnp.sin(theta1-theta1_), jnp.cos(theta1-theta1_))
+	dist_dtheta1 = dtheta1_-dtheta1
+	dist = jnp.array([dist_s, dist_ds, dist_theta1, dist_dtheta1])
+	return dist
+
+def generate_dynamics_with_1_poles(mc: float, g: float, phi: float, pole_ms: Sequence[float], pole_ls: Sequence[float], pole_as: Sequence[float], pole_ds: Sequence[float], pole_Js: Sequence[float]) -> tuple[Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray], Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray], Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray]]:
+	params = (mc, g, phi, pole_ms, pole_ls, pole_as, pole_ds, pole_Js)
+	return lambda state, action: dynamics_function(state, action, params), lambda state, action: observation_function(state, action, params), distance_function
@@ -4,38 +4,169 @@ from typing import Sequence, Callable
 
 # This file and its content are generated by generate_dynamics.py
 
-def generate_dynamics_with_2_poles(mc: float, g: float, phi: float, pole_ms: Sequence[float], pole_ls: Sequence[float], pole_as: Sequence[float], pole_ds: Sequence[float], pole_Js: Sequence[float]) -> tuple[Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray], Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray], Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray]]:
+def lu_factor(A: list) -> tuple[list, list]:
+	n = len(A)
+	U = [list(row) for row in A]
+	L = [[0]*n for _ in range(n)]
+	for k in range(n):
+		for i in range(k+1, n):
+			L[i][k] = U[i][k]/U[k][k]
+			for j in range(k+1, n):
+				U[i][j] = U[i][j] - L[i][k]*U[k][j]
+	return L, U
+
+def lu_solve(lu: tuple[list, list], b: list) -> list:
+	L, U = lu
+	n = len(b)
+	y = list(b)
+	for i in range(n):
+		y[i] = y[i] - sum(L[i][k]*y[k] for k in range(i))
+	x = [0]*n
+	for k in reversed(range(n)):
+		x[k] = (y[k] - sum(U[k][j]*x[j] for j in range(k+1, n)))/U[k][k]
+	return x
+
+def linear_solve(A: list, b: list) -> list:
+	return lu_solve(lu_factor(A), b)
+
+def solve_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> list:
+	mc, g, phi, pole_ms, pole_ls, pole_as, pole_ds, pole_Js = params
+	m1, l1, a1, d1, J1 = pole_ms[0], pole_ls[0], pole_as[0], pole_ds[0], pole_Js[0]
+	m2, l2, a2, d2, J2 = pole_ms[1], pole_ls[1], pole_as[1], pole_ds[1], pole_Js[1]
+	s, ds, theta1, dtheta1, theta2, dtheta2 = state
+	dds = action[0]
+	x0 = -theta2
+	x1 = theta1 + x0
+	x2 = l1*m2
+	x3 = a2*x2*jnp.cos(x1)
+	x4 = a1*m1
+	x5 = (x2 + x4)*jnp.cos(theta1)
+	x6 = a2*m2
+	x7 = x6*jnp.cos(theta2)
+	x8 = d2*dtheta1
+	x9 = d2*dtheta2
+	x10 = g*jnp.sin(phi - theta1)
+	x11 = jnp.sin(x1)
+	x12 = a2*dtheta2**2
+	x13 = dtheta1**2
+	x14 = g*jnp.sin(phi)
+	x15 = jnp.sin(theta1)
+	A = [
+		[J1 + a1**2*m1 + l1**2*m2, x3, 0],
+		[x3, J2 + a2**2*m2, 0],
+		[x5, x7, -1],
+	]
+	b = [-d1*dtheta1 - dds*x5 - x10*x2 - x10*x4 - x11*x12*x2 - x8 + x9, a2*l1*m2*x11*x13 - dds*x7 - g*x6*jnp.sin(phi + x0) + x8 - x9, a1*m1*x13*x15 - dds*(m1 + m2 + mc) - m1*x14 - m2*x14 + m2*(l1*x13*x15 + x12*jnp.sin(theta2))]
+	# [ddtheta1, ..., ddthetan, tau]
+	return linear_solve(A, b)
+
+@jax.jit
+def dynamics_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> jnp.ndarray:
+	s, ds, theta1, dtheta1, theta2, dtheta2 = state
+	dds = action[0]
+	unknowns = solve_function(state, action, params)
+	dstate = jnp.array([ds, dds, dtheta1, unknowns[0], dtheta2, unknowns[1]])
+	return dstate
+
+@jax.jit
+def observation_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> jnp.ndarray:
+	s, ds, theta1, dtheta1, theta2, dtheta2 = state
+	tau = solve_function(state, action, params)[-1]
+	observation = jnp.array([s, ds, theta1, dtheta1, theta2, dtheta2, tau])
+	return observation
+
+@jax.jit
+def dynamics_and_observe_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> tuple[jnp.ndarray, jnp.ndarray]:
+	s, ds, theta1, dtheta1, theta2, dtheta2 = state
+	dds = action[0]
+	unknowns = solve_function(state, action, params)
+	dstate = jnp.array([ds, dds, dtheta1, unknowns[0], dtheta2, unknowns[1]])
+	observation = jnp.array([s, ds, theta1, dtheta1, theta2, dtheta2, unknowns[-1]])
+	return dstate, observation
+
+@jax.jit
+def dynamics_jacobian_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> tuple[jnp.ndarray, jnp.ndarray]:
+	mc, g, phi, pole_ms, pole_ls, pole_as, pole_ds, pole_Js = params
 	m1, l1, a1, d1, J1 = pole_ms[0], pole_ls[0], pole_as[0], pole_ds[0], pole_Js[0]
 	m2, l2, a2, d2, J2 = pole_ms[1], pole_ls[1], pole_as[1], pole_ds[1], pole_Js[1]
+	s, ds, theta1, dtheta1, theta2, dtheta2 = state
+	dds = action[0]
+	x0 = -theta2
+	x1 = theta1 + x0
+	x2 = jnp.cos(x1)
+	x3 = l1*m2
+	x4 = a2*x3
+	x5 = x2*x4
+	x6 = jnp.cos(theta1)
+	x7 = a1*m1
+	x8 = x3 + x7
+	x9 = x6*x8
+	x10 = a2*m2
+	x11 = x10*jnp.cos(theta2)
+	x12 = d2*dtheta1
+	x13 = d2*dtheta2
+	x14 = phi - theta1
+	x15 = g*jnp.sin(x14)
+	x16 = jnp.sin(x1)
+	x17 = dtheta2**2
+	x18 = a2*x17
+	x19 = x18*x3
+	x20 = phi + x0
+	x21 = g*x10
+	x22 = dtheta1**2
+	x23 = g*jnp.sin(phi)
+	x24 = m1 + m2 + mc
+	x25 = jnp.sin(theta1)
+	x26 = jnp.sin(theta2)
+	x27 = x16*x4
+	x28 = -x27
+	x29 = x25*x8
+	x30 = g*jnp.cos(x14)
+	x31 = x19*x2
+	x32 = x22*x5
+	x33 = x22*x6
+	x34 = 2*dtheta1
+	x35 = x25*x34
+	x36 = x10*x26
+	x37 = -d2
+	x38 = 2*dtheta2
+	A = [
+		[J1 + a1**2*m1 + l1**2*m2, x5, 0],
+		[x5, J2 + a2**2*m2, 0],
+		[x9, x11, -1],
+	]
+	b = [-d1*dtheta1 - dds*x9 - x12 + x13 - x15*x3 - x15*x7 - x16*x19, a2*l1*m2*x16*x22 - dds*x11 + x12 - x13 - x21*jnp.sin(x20), a1*m1*x22*x25 - dds*x24 - m1*x23 - m2*x23 + m2*(l1*x22*x25 + x18*x26)]
+	lu = lu_factor(A)
+	unknowns = lu_solve(lu, b)
+	jac_theta1 = lu_solve(lu, [dds*x29 + x3*x30 + x30*x7 - x31 - (x28)*unknowns[1], x32 - (x28)*unknowns[0], x3*x33 + x33*x7 - (-x29)*unknowns[0]])
+	jac_dtheta1 = lu_solve(lu, [-d1 - d2, d2 + x27*x34, x3*x35 + x35*x7])
+	jac_theta2 = lu_solve(lu, [x31 - (x27)*unknowns[1], dds*x36 + x21*jnp.cos(x20) - x32 - (x27)*unknowns[0], x11*x17 - (-x36)*unknowns[1]])
+	jac_dtheta2 = lu_solve(lu, [-x27*x38 - x37, x37, x36*x38])
+	jac_dds = lu_solve(lu, [-x9, -x11, -x24])
+	jacobian_state = jnp.array([
+		[0, 1, 0, 0, 0, 0],
+		[0, 0, 0, 0, 0, 0],
+		[0, 0, 0, 1, 0, 0],
+		[0, 0, jac_theta1[0], jac_dtheta1[0], jac_theta2[0], jac_dtheta2[0]],
+		[0, 0, 0, 0, 0, 1],
+		[0, 0, jac_theta1[1], jac_dtheta1[1], jac_theta2[1], jac_dtheta2[1]],
+	])
+	jacobian_action = jnp.array([[0], [1], [0], [jac_dds[0]], [0], [jac_dds[1]]])
+	return jacobian_state, jacobian_action
+
+@jax.jit
+def distance_function(state: jnp.ndarray, goal_state: jnp.ndarray) -> jnp.ndarray:
+	s, ds, theta1, dtheta1, theta2, dtheta2 = state
+	s_, ds_, theta1_, dtheta1_, theta2_, dtheta2_ = goal_state
+	dist_s = s_-s
+	dist_ds = ds_-ds
+	dist_theta1 = jnp.arctan2(jnp.sin(theta1-theta1_), jnp.cos(theta1-theta1_))
+	dist_dtheta1 = dtheta1_-dtheta1
+	dist_theta2 = jnp.arctan2(jnp.sin(theta2-theta2_), jnp.cos(theta2-theta2_))
+	dist_dtheta2 = dtheta2_-dtheta2
+	dist = jnp.array([dist_s, dist_ds, dist_theta1, dist_dtheta1, dist_theta2, dist_dtheta2])
+	return dist
 
-	@jax.jit
-	def dynamics_function(state: jnp.ndarray, action: jnp.ndarray) -> jnp.ndarray:
-		s, ds, theta1, dtheta1, theta2, dtheta2 = state
-		dds = action[0]
-		ddtheta1 = (-J2*a1*dds*m1*jnp.cos(theta1) - J2*a1*g*m1*jnp.sin(phi - theta1) - J2*a2*dtheta2**2*l1*m2*jnp.sin(theta1 - theta2) - J2*d1*dtheta1 - J2*d2*dtheta1 + J2*d2*dtheta2 - J2*dds*l1*m2*jnp.cos(theta1) - J2*g*l1*m2*jnp.sin(phi - theta1) - a1*a2**2*dds*m1*m2*jnp.cos(theta1) - a1*a2**2*g*m1*m2*jnp.sin(phi - theta1) - a2**3*dtheta2**2*l1*m2**2*jnp.sin(theta1 - theta2) - a2**2*d1*dtheta1*m2 - a2**2*d2*dtheta1*m2 + a2**2*d2*dtheta2*m2 - a2**2*dds*l1*m2**2*jnp.cos(theta1)/2 + a2**2*dds*l1*m2**2*jnp.cos(theta1 - 2*theta2)/2 - a2**2*dtheta1**2*l1**2*m2**2*jnp.sin(2*theta1 - 2*theta2)/2 - a2**2*g*l1*m2**2*jnp.sin(phi - theta1)/2 + a2**2*g*l1*m2**2*jnp.sin(phi + theta1 - 2*theta2)/2 - a2*d2*dtheta1*l1*m2*jnp.cos(theta1 - theta2) + a2*d2*dtheta2*l1*m2*jnp.cos(theta1 - theta2))/(J1*J2 + J1*a2**2*m2 + J2*a1**2*m1 + J2*l1**2*m2 + a1**2*a2**2*m1*m2 - a2**2*l1**2*m2**2*jnp.cos(theta1 - theta2)**2 + a2**2*l1**2*m2**2)
-		ddtheta2 = (-J1*a2*dds*m2*jnp.cos(theta2) + J1*a2*dtheta1**2*l1*m2*jnp.sin(theta1 - theta2) - J1*a2*g*m2*jnp.sin(phi - theta2) + J1*d2*dtheta1 - J1*d2*dtheta2 - a1**2*a2*dds*m1*m2*jnp.cos(theta2) + a1**2*a2*dtheta1**2*l1*m1*m2*jnp.sin(theta1 - theta2) - a1**2*a2*g*m1*m2*jnp.sin(phi - theta2) + a1**2*d2*dtheta1*m1 - a1**2*d2*dtheta2*m1 + a1*a2*dds*l1*m1*m2*jnp.cos(theta2)/2 + a1*a2*dds*l1*m1*m2*jnp.cos(2*theta1 - theta2)/2 + a1*a2*g*l1*m1*m2*jnp.sin(phi - theta2)/2 + a1*a2*g*l1*m1*m2*jnp.sin(phi - 2*theta1 + theta2)/2 + a2**2*dtheta2**2*l1**2*m2**2*jnp.sin(2*theta1 - 2*theta2)/2 + a2*d1*dtheta1*l1*m2*jnp.cos(theta1 - theta2) + a2*d2*dtheta1*l1*m2*jnp.cos(theta1 - theta2) - a2*d2*dtheta2*l1*m2*jnp.cos(theta1 - theta2) - a2*dds*l1**2*m2**2*jnp.cos(theta2)/2 + a2*dds*l1**2*m2**2*jnp.cos(2*theta1 - theta2)/2 + a2*dtheta1**2*l1**3*m2**2*jnp.sin(theta1 - theta2) - a2*g*l1**2*m2**2*jnp.sin(phi - theta2)/2 + a2*g*l1**2*m2**2*jnp.sin(phi - 2*theta1 + theta2)/2 + d2*dtheta1*l1**2*m2 - d2*dtheta2*l1**2*m2)/(J1*J2 + J1*a2**2*m2 + J2*a1**2*m1 + J2*l1**2*m2 + a1**2*a2**2*m1*m2 - a2**2*l1**2*m2**2*jnp.cos(theta1 - theta2)**2 + a2**2*l1**2*m2**2)
-		dstate = jnp.array([ds, dds, dtheta1, ddtheta1, dtheta2, ddtheta2])
-		return dstate
-
-	@jax.jit
-	def observation_function(state: jnp.ndarray, action: jnp.ndarray) -> jnp.ndarray:
-		s, ds, theta1, dtheta1, theta2, dtheta2 = state
-		dds = action[0]
-		tau = (-1.0*J1*J2*a1*dtheta1**2*m1*jnp.sin(theta1) - 1.0*J1*J2*a2*dtheta2**2*m2*jnp.sin(theta2) + 1.0*J1*J2*dds*m1 + 1.0*J1*J2*dds*m2 + 1.0*J1*J2*dds*mc - 1.0*J1*J2*dtheta1**2*l1*m2*jnp.sin(theta1) + 1.0*J1*J2*g*m1*jnp.sin(phi) + 1.0*J1*J2*g*m2*jnp.sin(phi) - 1.0*J1*a1*a2**2*dtheta1**2*m1*m2*jnp.sin(theta1) - 1.0*J1*a2**3*dtheta2**2*m2**2*jnp.sin(theta2) + 1.0*J1*a2**2*dds*m1*m2 - 1.0*J1*a2**2*dds*m2**2*jnp.cos(theta2)**2 + 1.0*J1*a2**2*dds*m2**2 + 1.0*J1*a2**2*dds*m2*mc - 1.0*J1*a2**2*dtheta1**2*l1*m2**2*jnp.sin(theta1) + 1.0*J1*a2**2*dtheta1**2*l1*m2**2*jnp.sin(theta1 - theta2)*jnp.cos(theta2) + 1.0*J1*a2**2*g*m1*m2*jnp.sin(phi) + 1.0*J1*a2**2*g*m2**2*jnp.sin(phi) - 1.0*J1*a2**2*g*m2**2*jnp.sin(phi - theta2)*jnp.cos(theta2) + 1.0*J1*a2*d2*dtheta1*m2*jnp.cos(theta2) - 1.0*J1*a2*d2*dtheta2*m2*jnp.cos(theta2) - 1.0*J2*a1**3*dtheta1**2*m1**2*jnp.sin(theta1) - 1.0*J2*a1**2*a2*dtheta2**2*m1*m2*jnp.sin(theta2) - 1.0*J2*a1**2*dds*m1**2*jnp.cos(theta1)**2 + 1.0*J2*a1**2*dds*m1**2 + 1.0*J2*a1**2*dds*m1*m2 + 1.0*J2*a1**2*dds*m1*mc - 1.0*J2*a1**2*dtheta1**2*l1*m1*m2*jnp.sin(theta1) + 1.0*J2*a1**2*g*m1**2*jnp.sin(phi) - 1.0*J2*a1**2*g*m1**2*jnp.sin(phi - theta1)*jnp.cos(theta1) + 1.0*J2*a1**2*g*m1*m2*jnp.sin(phi) - 1.0*J2*a1*a2*dtheta2**2*l1*m1*m2*jnp.sin(theta1 - theta2)*jnp.cos(theta1) - 1.0*J2*a1*d1*dtheta1*m1*jnp.cos(theta1) - 1.0*J2*a1*d2*dtheta1*m1*jnp.cos(theta1) + 1.0*J2*a1*d2*dtheta2*m1*jnp.cos(theta1) - 2.0*J2*a1*dds*l1*m1*m2*jnp.cos(theta1)**2 - 1.0*J2*a1*dtheta1**2*l1**2*m1*m2*jnp.sin(theta1) - 2.0*J2*a1*g*l1*m1*m2*jnp.sin(phi - theta1)*jnp.cos(theta1) - 1.0*J2*a2*dtheta2**2*l1**2*m2**2*jnp.sin(theta2) - 1.0*J2*a2*dtheta2**2*l1**2*m2**2*jnp.sin(theta1 - theta2)*jnp.cos(theta1) - 1.0*J2*d1*dtheta1*l1*m2*jnp.cos(theta1) - 1.0*J2*d2*dtheta1*l1*m2*jnp.cos(theta1) + 1.0*J2*d2*dtheta2*l1*m2*jnp.cos(theta1) + 1.0*J2*dds*l1**2*m1*m2 - 1.0*J2*dds*l1**2*m2**2*jnp.cos(theta1)**2 + 1.0*J2*dds*l1**2*m2**2 + 1.0*J2*dds*l1**2*m2*mc - 1.0*J2*dtheta1**2*l1**3*m2**2*jnp.sin(theta1) + 1.0*J2*g*l1**2*m1*m2*jnp.sin(phi) + 1.0*J2*g*l1**2*m2**2*jnp.sin(phi) - 1.0*J2*g*l1**2*m2**2*jnp.sin(phi - theta1)*jnp.cos(theta1) - 1.0*a1**3*a2**2*dtheta1**2*m1**2*m2*jnp.sin(theta1) - 1.0*a1**2*a2**3*dtheta2**2*m1*m2**2*jnp.sin(theta2) - 1.0*a1**2*a2**2*dds*m1**2*m2*jnp.cos(theta1)**2 + 1.0*a1**2*a2**2*dds*m1**2*m2 - 1.0*a1**2*a2**2*dds*m1*m2**2*jnp.cos(theta2)**2 + 1.0*a1**2*a2**2*dds*m1*m2**2 + 1.0*a1**2*a2**2*dds*m1*m2*mc - 1.0*a1**2*a2**2*dtheta1**2*l1*m1*m2**2*jnp.sin(theta1) + 1.0*a1**2*a2**2*dtheta1**2*l1*m1*m2**2*jnp.sin(theta1 - theta2)*jnp.cos(theta2) + 1.0*a1**2*a2**2*g*m1**2*m2*jnp.sin(phi) - 1.0*a1**2*a2**2*g*m1**2*m2*jnp.sin(phi - theta1)*jnp.cos(theta1) + 1.0*a1**2*a2**2*g*m1*m2**2*jnp.sin(phi) - 1.0*a1**2*a2**2*g*m1*m2**2*jnp.sin(phi - theta2)*jnp.cos(theta2) + 1.0*a1**2*a2*d2*dtheta1*m1*m2*jnp.cos(theta2) - 1.0*a1**2*a2*d2*dtheta2*m1*m2*jnp.cos(theta2) - 1.0*a1*a2**3*dtheta2**2*l1*m1*m2**2*jnp.sin(theta1 - theta2)*jnp.cos(theta1) - 1.0*a1*a2**2*d1*dtheta1*m1*m2*jnp.cos(theta1) - 1.0*a1*a2**2*d2*dtheta1*m1*m2*jnp.cos(theta1) + 1.0*a1*a2**2*d2*dtheta2*m1*m2*jnp.cos(theta1) - 2.0*a1*a2**2*dds*l1*m1*m2**2*jnp.cos(theta1)**2 + 2.0*a1*a2**2*dds*l1*m1*m2**2*jnp.cos(theta1)*jnp.cos(theta2)*jnp.cos(theta1 - theta2) - 0.25*a1*a2**2*dtheta1**2*l1**2*m1*m2**2*(jnp.sin(theta1 - 2*theta2) + jnp.sin(3*theta1 - 2*theta2)) + 1.0*a1*a2**2*dtheta1**2*l1**2*m1*m2**2*jnp.sin(theta1)*jnp.cos(theta1 - theta2)**2 - 1.0*a1*a2**2*dtheta1**2*l1**2*m1*m2**2*jnp.sin(theta1) - 2.0*a1*a2**2*g*l1*m1*m2**2*jnp.sin(phi - theta1)*jnp.cos(theta1) + 1.0*a1*a2**2*g*l1*m1*m2**2*jnp.sin(phi - theta1)*jnp.cos(theta2)*jnp.cos(theta1 - theta2) + 1.0*a1*a2**2*g*l1*m1*m2**2*jnp.sin(phi - theta2)*jnp.cos(theta1)*jnp.cos(theta1 - theta2) - 1.0*a1*a2*d2*dtheta1*l1*m1*m2*jnp.cos(theta1)*jnp.cos(theta1 - theta2) + 1.0*a1*a2*d2*dtheta2*l1*m1*m2*jnp.cos(theta1)*jnp.cos(theta1 - theta2) + 0.25*a2**3*dtheta2**2*l1**2*m2**3*(jnp.sin(2*theta1 - 3*theta2) + jnp.sin(2*theta1 - theta2)) + 1.0*a2**3*dtheta2**2*l1**2*m2**3*jnp.sin(theta2)*jnp.cos(theta1 - theta2)**2 - 1.0*a2**3*dtheta2**2*l1**2*m2**3*jnp.sin(theta2) - 1.0*a2**3*dtheta2**2*l1**2*m2**3*jnp.sin(theta1 - theta2)*jnp.cos(theta1) - 1.0*a2**2*d1*dtheta1*l1*m2**2*jnp.cos(theta1) + 1.0*a2**2*d1*dtheta1*l1*m2**2*jnp.cos(theta2)*jnp.cos(theta1 - theta2) - 1.0*a2**2*d2*dtheta1*l1*m2**2*jnp.cos(theta1) + 1.0*a2**2*d2*dtheta1*l1*m2**2*jnp.cos(theta2)*jnp.cos(theta1 - theta2) + 1.0*a2**2*d2*dtheta2*l1*m2**2*jnp.cos(theta1) - 1.0*a2**2*d2*dtheta2*l1*m2**2*jnp.cos(theta2)*jnp.cos(theta1 - theta2) - 1.0*a2**2*dds*l1**2*m1*m2**2*jnp.cos(theta1 - theta2)**2 + 1.0*a2**2*dds*l1**2*m1*m2**2 - 1.0*a2**2*dds*l1**2*m2**3*jnp.cos(theta1)**2 + 2.0*a2**2*dds*l1**2*m2**3*jnp.cos(theta1)*jnp.cos(theta2)*jnp.cos(theta1 - theta2) - 1.0*a2**2*dds*l1**2*m2**3*jnp.cos(theta2)**2 - 1.0*a2**2*dds*l1**2*m2**3*jnp.cos(theta1 - theta2)**2 + 1.0*a2**2*dds*l1**2*m2**3 - 1.0*a2**2*dds*l1**2*m2**2*mc*jnp.cos(theta1 - theta2)**2 + 1.0*a2**2*dds*l1**2*m2**2*mc - 0.25*a2**2*dtheta1**2*l1**3*m2**3*(jnp.sin(theta1 - 2*theta2) + jnp.sin(3*theta1 - 2*theta2)) + 1.0*a2**2*dtheta1**2*l1**3*m2**3*jnp.sin(theta1)*jnp.cos(theta1 - theta2)**2 - 1.0*a2**2*dtheta1**2*l1**3*m2**3*jnp.sin(theta1) + 1.0*a2**2*dtheta1**2*l1**3*m2**3*jnp.sin(theta1 - theta2)*jnp.cos(theta2) - 1.0*a2**2*g*l1**2*m1*m2**2*jnp.sin(phi)*jnp.cos(theta1 - theta2)**2 + 1.0*a2**2*g*l1**2*m1*m2**2*jnp.sin(phi) - 1.0*a2**2*g*l1**2*m2**3*jnp.sin(phi)*jnp.cos(theta1 - theta2)**2 + 1.0*a2**2*g*l1**2*m2**3*jnp.sin(phi) - 1.0*a2**2*g*l1**2*m2**3*jnp.sin(phi - theta1)*jnp.cos(theta1) + 1.0*a2**2*g*l1**2*m2**3*jnp.sin(phi - theta1)*jnp.cos(theta2)*jnp.cos(theta1 - theta2) + 1.0*a2**2*g*l1**2*m2**3*jnp.sin(phi - theta2)*jnp.cos(theta1)*jnp.cos(theta1 - theta2) - 1.0*a2**2*g*l1**2*m2**3*jnp.sin(phi - theta2)*jnp.cos(theta2) - 1.0*a2*d2*dtheta1*l1**2*m2**2*jnp.cos(theta1)*jnp.cos(theta1 - theta2) + 1.0*a2*d2*dtheta1*l1**2*m2**2*jnp.cos(theta2) + 1.0*a2*d2*dtheta2*l1**2*m2**2*jnp.cos(theta1)*jnp.cos(theta1 - theta2) - 1.0*a2*d2*dtheta2*l1**2*m2**2*jnp.cos(theta2))/(J1*J2 + J1*a2**2*m2 + J2*a1**2*m1 + J2*l1**2*m2 + a1**2*a2**2*m1*m2 - a2**2*l1**2*m2**2*jnp.cos(theta1 - theta2)**2 + a2**2*l1**2*m2**2)
-		observation = jnp.array([s, ds, theta1, dtheta1, theta2, dtheta2, tau])
-		return observation
-
-	@jax.jit
-	def distance_function(state: jnp.ndarray, goal_state: jnp.ndarray) -> jnp.ndarray:
-		s, ds, theta1, dtheta1, theta2, dtheta2 = state
-		s_, ds_, theta1_, dtheta1_, theta2_, dtheta2_ = goal_state
-		dist_s = s_-s
-		dist_ds = ds_-ds
-		dist_theta1 = jnp.arctan2(jnp.sin(theta1-theta1_), jnp.cos(theta1-theta1_))
-		dist_dtheta1 = dtheta1_-dtheta1
-		dist_theta2 = jnp.arctan2(jnp.sin(theta2-theta2_), jnp.cos(theta2-theta2_))
-		dist_dtheta2 = dtheta2_-dtheta2
-		dist = jnp.array([dist_s, dist_ds, dist_theta1, dist_dtheta1, dist_theta2, dist_dtheta2])
-		return dist
-
-	return dynamics_function, observation_function, distance_function
+def generate_dynamics_with_2_poles(mc: float, g: float, phi: float, pole_ms: Sequence[float], pole_ls: Sequence[float], pole_as: Sequence[float], pole_ds: Sequence[float], pole_Js: Sequence[float]) -> tuple[Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray], Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray], Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray]]:
+	params = (mc, g, phi, pole_ms, pole_ls, pole_as, pole_ds, pole_Js)
+	return lambda state, action: dynamics_function(state, action, params), lambda state, action: observation_function(state, action, params), distance_function
@@ -0,0 +1,249 @@
+import jax
+import jax.numpy as jnp
+from typing import Sequence, Callable
+
+# This file and its content are generated by generate_dynamics.py
+
+def lu_factor(A: list) -> tuple[list, list]:
+	n = len(A)
+	U = [list(row) for row in A]
+	L = [[0]*n for _ in range(n)]
+	for k in range(n):
+		for i in range(k+1, n):
+			L[i][k] = U[i][k]/U[k][k]
+			for j in range(k+1, n):
+				U[i][j] = U[i][j] - L[i][k]*U[k][j]
+	return L, U
+
+def lu_solve(lu: tuple[list, list], b: list) -> list:
+	L, U = lu
+	n = len(b)
+	y = list(b)
+	for i in range(n):
+		y[i] = y[i] - sum(L[i][k]*y[k] for k in range(i))
+	x = [0]*n
+	for k in reversed(range(n)):
+		x[k] = (y[k] - sum(U[k][j]*x[j] for j in range(k+1, n)))/U[k][k]
+	return x
+
+def linear_solve(A: list, b: list) -> list:
+	return lu_solve(lu_factor(A), b)
+
+def solve_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> list:
+	mc, g, phi, pole_ms, pole_ls, pole_as, pole_ds, pole_Js = params
+	m1, l1, a1, d1, J1 = pole_ms[0], pole_ls[0], pole_as[0], pole_ds[0], pole_Js[0]
+	m2, l2, a2, d2, J2 = pole_ms[1], pole_ls[1], pole_as[1], pole_ds[1], pole_Js[1]
+	m3, l3, a3, d3, J3 = pole_ms[2], pole_ls[2], pole_as[2], pole_ds[2], pole_Js[2]
+	s, ds, theta1, dtheta1, theta2, dtheta2, theta3, dtheta3 = state
+	dds = action[0]
+	x0 = l1**2
+	x1 = -theta2
+	x2 = theta1 + x1
+	x3 = a2*m2
+	x4 = l2*m3
+	x5 = x3 + x4
+	x6 = l1*x5*jnp.cos(x2)
+	x7 = -theta3
+	x8 = theta1 + x7
+	x9 = l1*m3
+	x10 = a3*x9*jnp.cos(x8)
+	x11 = theta2 + x7
+	x12 = a3*x4*jnp.cos(x11)
+	x13 = a1*m1
+	x14 = l1*m2
+	x15 = (x13 + x14 + x9)*jnp.cos(theta1)
+	x16 = x5*jnp.cos(theta2)
+	x17 = a3*m3
+	x18 = x17*jnp.cos(theta3)
+	x19 = d2*dtheta1
+	x20 = d2*dtheta2
+	x21 = g*jnp.sin(phi - theta1)
+	x22 = dtheta2**2
+	x23 = jnp.sin(x2)
+	x24 = l1*x22*x23
+	x25 = jnp.sin(x8)
+	x26 = a3*dtheta3**2
+	x27 = d3*dtheta2
+	x28 = d3*dtheta3
+	x29 = g*jnp.sin(phi + x1)
+	x30 = jnp.sin(x11)
+	x31 = dtheta1**2
+	x32 = g*jnp.sin(phi)
+	x33 = jnp.sin(theta1)
+	x34 = x22*jnp.sin(theta2)
+	x35 = l1*x31*x33
+	A = [
+		[J1 + a1**2*m1 + m2*x0 + m3*x0, x6, x10, 0],
+		[x6, J2 + a2**2*m2 + l2**2*m3, x12, 0],
+		[x10, x12, J3 + a3**2*m3, 0],
+		[x15, x16, x18, -1],
+	]
+	b = [-d1*dtheta1 - dds*x15 - x13*x21 - x14*x21 - x19 + x20 - x21*x9 - x24*x3 - x24*x4 - x25*x26*x9, a2*l1*m2*x23*x31 - dds*x16 + l1*l2*m3*x23*x31 + x19 - x20 - x26*x30*x4 - x27 + x28 - x29*x3 - x29*x4, a3*l1*m3*x25*x31 + a3*l2*m3*x22*x30 - dds*x18 - g*x17*jnp.sin(phi + x7) + x27 - x28, a1*m1*x31*x33 - dds*(m1 + m2 + m3 + mc) - m1*x32 - m2*x32 + m2*(a2*x34 + x35) - m3*x32 + m3*(l2*x34 + x26*jnp.sin(theta3) + x35)]
+	# [ddtheta1, ..., ddthetan, tau]
+	return linear_solve(A, b)
+
+@jax.jit
+def dynamics_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> jnp.ndarray:
+	s, ds, theta1, dtheta1, theta2, dtheta2, theta3, dtheta3 = state
+	dds = action[0]
+	unknowns = solve_function(state, action, params)
+	dstate = jnp.array([ds, dds, dtheta1, unknowns[0], dtheta2, unknowns[1], dtheta3, unknowns[2]])
+	return dstate
+
+@jax.jit
+def observation_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> jnp.ndarray:
+	s, ds, theta1, dtheta1, theta2, dtheta2, theta3, dtheta3 = state
+	tau = solve_function(state, action, params)[-1]
+	observation = jnp.array([s, ds, theta1, dtheta1, theta2, dtheta2, theta3, dtheta3, tau])
+	return observation
+
+@jax.jit
+def dynamics_and_observe_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> tuple[jnp.ndarray, jnp.ndarray]:
+	s, ds, theta1, dtheta1, theta2, dtheta2, theta3, dtheta3 = state
+	dds = action[0]
+	unknowns = solve_function(state, action, params)
+	dstate = jnp.array([ds, dds, dtheta1, unknowns[0], dtheta2, unknowns[1], dtheta3, unknowns[2]])
+	observation = jnp.array([s, ds, theta1, dtheta1, theta2, dtheta2, theta3, dtheta3, unknowns[-1]])
+	return dstate, observation
+
+@jax.jit
+def dynamics_jacobian_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> tuple[jnp.ndarray, jnp.ndarray]:
+	mc, g, phi, pole_ms, pole_ls, pole_as, pole_ds, pole_Js = params
+	m1, l1, a1, d1, J1 = pole_ms[0], pole_ls[0], pole_as[0], pole_ds[0], pole_Js[0]
+	m2, l2, a2, d2, J2 = pole_ms[1], pole_ls[1], pole_as[1], pole_ds[1], pole_Js[1]
+	m3, l3, a3, d3, J3 = pole_ms[2], pole_ls[2], pole_as[2], pole_ds[2], pole_Js[2]
+	s, ds, theta1, dtheta1, theta2, dtheta2, theta3, dtheta3 = state
+	dds = action[0]
+	x0 = l1**2
+	x1 = -theta2
+	x2 = theta1 + x1
+	x3 = jnp.cos(x2)
+	x4 = a2*m2
+	x5 = l2*m3
+	x6 = x4 + x5
+	x7 = l1*x6
+	x8 = x3*x7
+	x9 = -theta3
+	x10 = theta1 + x9
+	x11 = jnp.cos(x10)
+	x12 = l1*m3
+	x13 = a3*x12
+	x14 = x11*x13
+	x15 = theta2 + x9
+	x16 = jnp.cos(x15)
+	x17 = a3*x5
+	x18 = x16*x17
+	x19 = jnp.cos(theta1)
+	x20 = a1*m1
+	x21 = l1*m2
+	x22 = x12 + x20 + x21
+	x23 = x19*x22
+	x24 = jnp.cos(theta2)
+	x25 = x24*x6
+	x26 = a3*m3
+	x27 = x26*jnp.cos(theta3)
+	x28 = d2*dtheta1
+	x29 = d2*dtheta2
+	x30 = phi - theta1
+	x31 = g*jnp.sin(x30)
+	x32 = dtheta2**2
+	x33 = jnp.sin(x2)
+	x34 = l1*x33
+	x35 = x32*x34
+	x36 = jnp.sin(x10)
+	x37 = dtheta3**2
+	x38 = a3*x37
+	x39 = x12*x38
+	x40 = d3*dtheta2
+	x41 = d3*dtheta3
+	x42 = phi + x1
+	x43 = g*jnp.sin(x42)
+	x44 = jnp.sin(x15)
+	x45 = x38*x5
+	x46 = dtheta1**2
+	x47 = phi + x9
+	x48 = g*x26
+	x49 = g*jnp.sin(phi)
+	x50 = m1 + m2 + m3 + mc
+	x51 = jnp.sin(theta1)
+	x52 = jnp.sin(theta2)
+	x53 = x32*x52
+	x54 = l1*x46*x51
+	x55 = jnp.sin(theta3)
+	x56 = x33*x7
+	x57 = -x56
+	x58 = x13*x36
+	x59 = -x58
+	x60 = x22*x51
+	x61 = g*jnp.cos(x30)
+	x62 = l1*x3
+	x63 = x32*x62
+	x64 = x4*x63
+	x65 = x11*x39
+	x66 = x5*x63
+	x67 = x46*x62
+	x68 = x4*x67 + x5*x67
+	x69 = x14*x46
+	x70 = x19*x46
+	x71 = 2*dtheta1
+	x72 = x34*x71
+	x73 = x51*x71
+	x74 = x17*x44
+	x75 = -x74
+	x76 = jnp.cos(x42)
+	x77 = x16*x45
+	x78 = x18*x32
+	x79 = x24*x32
+	x80 = 2*dtheta2
+	x81 = x34*x80
+	x82 = x52*x80
+	x83 = x26*x55
+	x84 = 2*dtheta3
+	x85 = -d3
+	A = [
+		[J1 + a1**2*m1 + m2*x0 + m3*x0, x8, x14, 0],
+		[x8, J2 + a2**2*m2 + l2**2*m3, x18, 0],
+		[x14, x18, J3 + a3**2*m3, 0],
+		[x23, x25, x27, -1],
+	]
+	b = [-d1*dtheta1 - dds*x23 - x12*x31 - x20*x31 - x21*x31 - x28 + x29 - x35*x4 - x35*x5 - x36*x39, a2*l1*m2*x33*x46 - dds*x25 + l1*l2*m3*x33*x46 + x28 - x29 - x4*x43 - x40 + x41 - x43*x5 - x44*x45, a3*l1*m3*x36*x46 + a3*l2*m3*x32*x44 - dds*x27 + x40 - x41 - x48*jnp.sin(x47), a1*m1*x46*x51 - dds*x50 - m1*x49 - m2*x49 + m2*(a2*x53 + x54) - m3*x49 + m3*(l2*x53 + x38*x55 + x54)]
+	lu = lu_factor(A)
+	unknowns = lu_solve(lu, b)
+	jac_theta1 = lu_solve(lu, [dds*x60 + x12*x61 + x20*x61 + x21*x61 - x64 - x65 - x66 - (x57)*unknowns[1] - (x59)*unknowns[2], x68 - (x57)*unknowns[0], x69 - (x59)*unknowns[0], x12*x70 + x20*x70 + x21*x70 - (-x60)*unknowns[0]])
+	jac_dtheta1 = lu_solve(lu, [-d1 - d2, d2 + x4*x72 + x5*x72, x58*x71, x12*x73 + x20*x73 + x21*x73])
+	jac_theta2 = lu_solve(lu, [x64 + x66 - (x56)*unknowns[1], a2*g*m2*x76 + dds*x52*x6 + g*l2*m3*x76 - x68 - x77 - (x56)*unknowns[0] - (x75)*unknowns[2], x78 - (x75)*unknowns[1], x4*x79 + x5*x79 - (-x52*x6)*unknowns[1]])
+	jac_dtheta2 = lu_solve(lu, [d2 - x4*x81 - x5*x81, -d2 - d3, d3 + x74*x80, x4*x82 + x5*x82])
+	jac_theta3 = lu_solve(lu, [x65 - (x58)*unknowns[2], x77 - (x74)*unknowns[2], dds*x83 + x48*jnp.cos(x47) - x69 - x78 - (x58)*unknowns[0] - (x74)*unknowns[1], x27*x37 - (-x83)*unknowns[2]])
+	jac_dtheta3 = lu_solve(lu, [-x58*x84, -x74*x84 - x85, x85, x83*x84])
+	jac_dds = lu_solve(lu, [-x23, -x25, -x27, -x50])
+	jacobian_state = jnp.array([
+		[0, 1, 0, 0, 0, 0, 0, 0],
+		[0, 0, 0, 0, 0, 0, 0, 0],
+		[0, 0, 0, 1, 0, 0, 0, 0],
+		[0, 0, jac_theta1[0], jac_dtheta1[0], jac_theta2[0], jac_dtheta2[0], jac_theta3[0], jac_dtheta3[0]],
+		[0, 0, 0, 0, 0, 1, 0, 0],
+		[0, 0, jac_theta1[1], jac_dtheta1[1], jac_theta2[1], jac_dtheta2[1], jac_theta3[1], jac_dtheta3[1]],
+		[0, 0, 0, 0, 0, 0, 0, 1],
+		[0, 0, jac_theta1[2], jac_dtheta1[2], jac_theta2[2], jac_dtheta2[2], jac_theta3[2], jac_dtheta3[2]],
+	])
+	jacobian_action = jnp.array([[0], [1], [0], [jac_dds[0]], [0], [jac_dds[1]], [0], [jac_dds[2]]])
+	return jacobian_state, jacobian_action
+
+@jax.jit
+def distance_function(state: jnp.ndarray, goal_state: jnp.ndarray) -> jnp.ndarray:
+	s, ds, theta1, dtheta1, theta2, dtheta2, theta3, dtheta3 = state
+	s_, ds_, theta1_, dtheta1_, theta2_, dtheta2_, theta3_, dtheta3_ = goal_state
+	dist_s = s_-s
+	dist_ds = ds_-ds
+	dist_theta1 = jnp.arctan2(jnp.sin(theta1-theta1_), jnp.cos(theta1-theta1_))
+	dist_dtheta1 = dtheta1_-dtheta1
+	dist_theta2 = jnp.arctan2(jnp.sin(theta2-theta2_), jnp.cos(theta2-theta2_))
+	dist_dtheta2 = dtheta2_-dtheta2
+	dist_theta3 = jnp.arctan2(jnp.sin(theta3-theta3_), jnp.cos(theta3-theta3_))
+	dist_dtheta3 = dtheta3_-dtheta3
+	dist = jnp.array([dist_s, dist_ds, dist_theta1, dist_dtheta1, dist_theta2, dist_dtheta2, dist_theta3, dist_dtheta3])
+	return dist
+
+def generate_dynamics_with_3_poles(mc: float, g: float, phi: float, pole_ms: Sequence[float], pole_ls: Sequence[float], pole_as: Sequence[float], pole_ds: Sequence[float], pole_Js: Sequence[float]) -> tuple[Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray], Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray], Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray]]:
+	params = (mc, g, phi, pole_ms, pole_ls, pole_as, pole_ds, pole_Js)
+	return lambda state, action: dynamics_function(state, action, params), lambda state, action: observation_function(state, action, params), distance_function
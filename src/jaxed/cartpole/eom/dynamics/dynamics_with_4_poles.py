@@ -0,0 +1,351 @@
+import jax
+import jax.numpy as jnp
+from typing import Sequence, Callable
+
+# This file and its content are generated by generate_dynamics.py
+
+def lu_factor(A: list) -> tuple[list, list]:
+	n = len(A)
+	U = [list(row) for row in A]
+	L = [[0]*n for _ in range(n)]
+	for k in range(n):
+		for i in range(k+1, n):
+			L[i][k] = U[i][k]/U[k][k]
+			for j in range(k+1, n):
+				U[i][j] = U[i][j] - L[i][k]*U[k][j]
+	return L, U
+
+def lu_solve(lu: tuple[list, list], b: list) -> list:
+	L, U = lu
+	n = len(b)
+	y = list(b)
+	for i in range(n):
+		y[i] = y[i] - sum(L[i][k]*y[k] for k in range(i))
+	x = [0]*n
+	for k in reversed(range(n)):
+		x[k] = (y[k] - sum(U[k][j]*x[j] for j in range(k+1, n)))/U[k][k]
+	return x
+
+def linear_solve(A: list, b: list) -> list:
+	return lu_solve(lu_factor(A), b)
+
+def solve_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> list:
+	mc, g, phi, pole_ms, pole_ls, pole_as, pole_ds, pole_Js = params
+	m1, l1, a1, d1, J1 = pole_ms[0], pole_ls[0], pole_as[0], pole_ds[0], pole_Js[0]
+	m2, l2, a2, d2, J2 = pole_ms[1], pole_ls[1], pole_as[1], pole_ds[1], pole_Js[1]
+	m3, l3, a3, d3, J3 = pole_ms[2], pole_ls[2], pole_as[2], pole_ds[2], pole_Js[2]
+	m4, l4, a4, d4, J4 = pole_ms[3], pole_ls[3], pole_as[3], pole_ds[3], pole_Js[3]
+	s, ds, theta1, dtheta1, theta2, dtheta2, theta3, dtheta3, theta4, dtheta4 = state
+	dds = action[0]
+	x0 = l1**2
+	x1 = -theta2
+	x2 = theta1 + x1
+	x3 = a2*m2
+	x4 = l2*m3
+	x5 = l2*m4
+	x6 = x3 + x4 + x5
+	x7 = l1*x6*jnp.cos(x2)
+	x8 = -theta3
+	x9 = theta1 + x8
+	x10 = a3*m3
+	x11 = l3*m4
+	x12 = x10 + x11
+	x13 = l1*x12*jnp.cos(x9)
+	x14 = -theta4
+	x15 = theta1 + x14
+	x16 = l1*m4
+	x17 = a4*x16
+	x18 = x17*jnp.cos(x15)
+	x19 = l2**2
+	x20 = theta2 + x8
+	x21 = l2*x12*jnp.cos(x20)
+	x22 = theta2 + x14
+	x23 = a4*x5
+	x24 = x23*jnp.cos(x22)
+	x25 = theta3 + x14
+	x26 = a4*x11
+	x27 = x26*jnp.cos(x25)
+	x28 = a1*m1
+	x29 = l1*m2
+	x30 = l1*m3
+	x31 = (x16 + x28 + x29 + x30)*jnp.cos(theta1)
+	x32 = x6*jnp.cos(theta2)
+	x33 = x12*jnp.cos(theta3)
+	x34 = a4*m4
+	x35 = x34*jnp.cos(theta4)
+	x36 = d2*dtheta1
+	x37 = d2*dtheta2
+	x38 = g*jnp.sin(phi - theta1)
+	x39 = dtheta2**2
+	x40 = jnp.sin(x2)
+	x41 = l1*x39*x40
+	x42 = dtheta3**2
+	x43 = l1*jnp.sin(x9)
+	x44 = x42*x43
+	x45 = jnp.sin(x15)
+	x46 = a4*dtheta4**2
+	x47 = g*jnp.sin(phi + x1)
+	x48 = jnp.sin(x20)
+	x49 = x42*x48
+	x50 = a3*x4
+	x51 = jnp.sin(x22)
+	x52 = l3*x5
+	x53 = dtheta1**2
+	x54 = d3*dtheta2 - d3*dtheta3
+	x55 = d4*dtheta4
+	x56 = d4*dtheta3
+	x57 = g*jnp.sin(phi + x8)
+	x58 = x43*x53
+	x59 = x39*x48
+	x60 = jnp.sin(x25)
+	x61 = g*jnp.sin(phi)
+	x62 = jnp.sin(theta1)
+	x63 = x39*jnp.sin(theta2)
+	x64 = l1*x53*x62
+	x65 = x42*jnp.sin(theta3)
+	x66 = l2*x63 + x64
+	A = [
+		[J1 + a1**2*m1 + m2*x0 + m3*x0 + m4*x0, x7, x13, x18, 0],
+		[x7, J2 + a2**2*m2 + m3*x19 + m4*x19, x21, x24, 0],
+		[x13, x21, J3 + a3**2*m3 + l3**2*m4, x27, 0],
+		[x18, x24, x27, J4 + a4**2*m4, 0],
+		[x31, x32, x33, x35, -1],
+	]
+	b = [-d1*dtheta1 - dds*x31 - x10*x44 - x11*x44 - x16*x38 - x16*x45*x46 - x28*x38 - x29*x38 - x3*x41 - x30*x38 - x36 + x37 - x4*x41 - x41*x5, a2*l1*m2*x40*x53 - dds*x32 + l1*l2*m3*x40*x53 + l1*l2*m4*x40*x53 - x3*x47 + x36 - x37 - x4*x47 - x46*x5*x51 - x47*x5 - x49*x50 - x49*x52 - x54, -dds*x33 - x10*x57 + x10*x58 - x11*x46*x60 - x11*x57 + x11*x58 + x50*x59 + x52*x59 + x54 + x55 - x56, -dds*x35 - g*x34*jnp.sin(phi + x14) + x17*x45*x53 + x23*x39*x51 + x26*x42*x60 - x55 + x56, a1*m1*x53*x62 - dds*(m1 + m2 + m3 + m4 + mc) - m1*x61 - m2*x61 + m2*(a2*x63 + x64) - m3*x61 + m3*(a3*x65 + x66) - m4*x61 + m4*(l3*x65 + x46*jnp.sin(theta4) + x66)]
+	# [ddtheta1, ..., ddthetan, tau]
+	return linear_solve(A, b)
+
+@jax.jit
+def dynamics_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> jnp.ndarray:
+	s, ds, theta1, dtheta1, theta2, dtheta2, theta3, dtheta3, theta4, dtheta4 = state
+	dds = action[0]
+	unknowns = solve_function(state, action, params)
+	dstate = jnp.array([ds, dds, dtheta1, unknowns[0], dtheta2, unknowns[1], dtheta3, unknowns[2], dtheta4, unknowns[3]])
+	return dstate
+
+@jax.jit
+def observation_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> jnp.ndarray:
+	s, ds, theta1, dtheta1, theta2, dtheta2, theta3, dtheta3, theta4, dtheta4 = state
+	tau = solve_function(state, action, params)[-1]
+	observation = jnp.array([s, ds, theta1, dtheta1, theta2, dtheta2, theta3, dtheta3, theta4, dtheta4, tau])
+	return observation
+
+@jax.jit
+def dynamics_and_observe_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> tuple[jnp.ndarray, jnp.ndarray]:
+	s, ds, theta1, dtheta1, theta2, dtheta2, theta3, dtheta3, theta4, dtheta4 = state
+	dds = action[0]
+	unknowns = solve_function(state, action, params)
+	dstate = jnp.array([ds, dds, dtheta1, unknowns[0], dtheta2, unknowns[1], dtheta3, unknowns[2], dtheta4, unknowns[3]])
+	observation = jnp.array([s, ds, theta1, dtheta1, theta2, dtheta2, theta3, dtheta3, theta4, dtheta4, unknowns[-1]])
+	return dstate, observation
+
+@jax.jit
+def dynamics_jacobian_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> tuple[jnp.ndarray, jnp.ndarray]:
+	mc, g, phi, pole_ms, pole_ls, pole_as, pole_ds, pole_Js = params
+	m1, l1, a1, d1, J1 = pole_ms[0], pole_ls[0], pole_as[0], pole_ds[0], pole_Js[0]
+	m2, l2, a2, d2, J2 = pole_ms[1], pole_ls[1], pole_as[1], pole_ds[1], pole_Js[1]
+	m3, l3, a3, d3, J3 = pole_ms[2], pole_ls[2], pole_as[2], pole_ds[2], pole_Js[2]
+	m4, l4, a4, d4, J4 = pole_ms[3], pole_ls[3], pole_as[3], pole_ds[3], pole_Js[3]
+	s, ds, theta1, dtheta1, theta2, dtheta2, theta3, dtheta3, theta4, dtheta4 = state
+	dds = action[0]
+	x0 = l1**2
+	x1 = -theta2
+	x2 = theta1 + x1
+	x3 = jnp.cos(x2)
+	x4 = a2*m2
+	x5 = l2*m3
+	x6 = l2*m4
+	x7 = x4 + x5 + x6
+	x8 = l1*x7
+	x9 = x3*x8
+	x10 = -theta3
+	x11 = theta1 + x10
+	x12 = jnp.cos(x11)
+	x13 = a3*m3
+	x14 = l3*m4
+	x15 = x13 + x14
+	x16 = l1*x15
+	x17 = x12*x16
+	x18 = -theta4
+	x19 = theta1 + x18
+	x20 = jnp.cos(x19)
+	x21 = l1*m4
+	x22 = a4*x21
+	x23 = x20*x22
+	x24 = l2**2
+	x25 = theta2 + x10
+	x26 = jnp.cos(x25)
+	x27 = l2*x15
+	x28 = x26*x27
+	x29 = theta2 + x18
+	x30 = jnp.cos(x29)
+	x31 = a4*x6
+	x32 = x30*x31
+	x33 = theta3 + x18
+	x34 = jnp.cos(x33)
+	x35 = a4*x14
+	x36 = x34*x35
+	x37 = jnp.cos(theta1)
+	x38 = a1*m1
+	x39 = l1*m2
+	x40 = l1*m3
+	x41 = x21 + x38 + x39 + x40
+	x42 = x37*x41
+	x43 = jnp.cos(theta2)
+	x44 = x43*x7
+	x45 = jnp.cos(theta3)
+	x46 = x15*x45
+	x47 = a4*m4
+	x48 = x47*jnp.cos(theta4)
+	x49 = d2*dtheta1
+	x50 = d2*dtheta2
+	x51 = phi - theta1
+	x52 = g*jnp.sin(x51)
+	x53 = dtheta2**2
+	x54 = jnp.sin(x2)
+	x55 = l1*x54
+	x56 = x53*x55
+	x57 = dtheta3**2
+	x58 = jnp.sin(x11)
+	x59 = l1*x58
+	x60 = x57*x59
+	x61 = jnp.sin(x19)
+	x62 = dtheta4**2
+	x63 = a4*x62
+	x64 = x21*x63
+	x65 = phi + x1
+	x66 = g*jnp.sin(x65)
+	x67 = jnp.sin(x25)
+	x68 = x57*x67
+	x69 = a3*x5
+	x70 = jnp.sin(x29)
+	x71 = x6*x63
+	x72 = l3*x6
+	x73 = dtheta1**2
+	x74 = d3*dtheta2 - d3*dtheta3
+	x75 = d4*dtheta4
+	x76 = d4*dtheta3
+	x77 = phi + x10
+	x78 = g*jnp.sin(x77)
+	x79 = x59*x73
+	x80 = x53*x67
+	x81 = jnp.sin(x33)
+	x82 = x14*x63
+	x83 = phi + x18
+	x84 = x22*x61
+	x85 = x31*x70
+	x86 = x35*x81
+	x87 = g*jnp.sin(phi)
+	x88 = m1 + m2 + m3 + m4 + mc
+	x89 = jnp.sin(theta1)
+	x90 = jnp.sin(theta2)
+	x91 = x53*x90
+	x92 = l1*x73*x89
+	x93 = jnp.sin(theta3)
+	x94 = x57*x93
+	x95 = l2*x91 + x92
+	x96 = jnp.sin(theta4)
+	x97 = x54*x8
+	x98 = -x97
+	x99 = x16*x58
+	x100 = -x99
+	x101 = -x84
+	x102 = jnp.cos(x51)
+	x103 = x20*x64
+	x104 = l1*x12
+	x105 = x104*x57
+	x106 = x105*x13 + x105*x14
+	x107 = l1*x3
+	x108 = x107*x53
+	x109 = x108*x4 + x108*x5 + x108*x6
+	x110 = x107*x73
+	x111 = x110*x4 + x110*x5 + x110*x6
+	x112 = x104*x73
+	x113 = x112*x13 + x112*x14
+	x114 = x23*x73
+	x115 = x37*x73
+	x116 = 2*dtheta1
+	x117 = x116*x55
+	x118 = x116*x59
+	x119 = x116*x89
+	x120 = x27*x67
+	x121 = -x120
+	x122 = -x85
+	x123 = jnp.cos(x65)
+	x124 = x30*x71
+	x125 = x26*x57
+	x126 = x125*x69 + x125*x72
+	x127 = x26*x53
+	x128 = x127*x69 + x127*x72
+	x129 = x32*x53
+	x130 = x43*x53
+	x131 = 2*dtheta2
+	x132 = x131*x55
+	x133 = x131*x67
+	x134 = x131*x90
+	x135 = -x86
+	x136 = jnp.cos(x77)
+	x137 = x34*x82
+	x138 = x36*x57
+	x139 = x45*x57
+	x140 = 2*dtheta3
+	x141 = x140*x59
+	x142 = x140*x67
+	x143 = x140*x93
+	x144 = x47*x96
+	x145 = 2*dtheta4
+	x146 = -d4
+	A = [
+		[J1 + a1**2*m1 + m2*x0 + m3*x0 + m4*x0, x9, x17, x23, 0],
+		[x9, J2 + a2**2*m2 + m3*x24 + m4*x24, x28, x32, 0],
+		[x17, x28, J3 + a3**2*m3 + l3**2*m4, x36, 0],
+		[x23, x32, x36, J4 + a4**2*m4, 0],
+		[x42, x44, x46, x48, -1],
+	]
+	b = [-d1*dtheta1 - dds*x42 - x13*x60 - x14*x60 - x21*x52 - x38*x52 - x39*x52 - x4*x56 - x40*x52 - x49 - x5*x56 + x50 - x56*x6 - x61*x64, a2*l1*m2*x54*x73 - dds*x44 + l1*l2*m3*x54*x73 + l1*l2*m4*x54*x73 - x4*x66 + x49 - x5*x66 - x50 - x6*x66 - x68*x69 - x68*x72 - x70*x71 - x74, -dds*x46 - x13*x78 + x13*x79 - x14*x78 + x14*x79 + x69*x80 + x72*x80 + x74 + x75 - x76 - x81*x82, -dds*x48 - g*x47*jnp.sin(x83) + x53*x85 + x57*x86 + x73*x84 - x75 + x76, a1*m1*x73*x89 - dds*x88 - m1*x87 - m2*x87 + m2*(a2*x91 + x92) - m3*x87 + m3*(a3*x94 + x95) - m4*x87 + m4*(l3*x94 + x63*x96 + x95)]
+	lu = lu_factor(A)
+	unknowns = lu_solve(lu, b)
+	jac_theta1 = lu_solve(lu, [a1*g*m1*x102 + dds*x41*x89 + g*l1*m2*x102 + g*l1*m3*x102 + g*l1*m4*x102 - x103 - x106 - x109 - (x98)*unknowns[1] - (x100)*unknowns[2] - (x101)*unknowns[3], x111 - (x98)*unknowns[0], x113 - (x100)*unknowns[0], x114 - (x101)*unknowns[0], x115*x21 + x115*x38 + x115*x39 + x115*x40 - (-x41*x89)*unknowns[0]])
+	jac_dtheta1 = lu_solve(lu, [-d1 - d2, d2 + x117*x4 + x117*x5 + x117*x6, x118*x13 + x118*x14, x116*x84, x119*x21 + x119*x38 + x119*x39 + x119*x40])
+	jac_theta2 = lu_solve(lu, [x109 - (x97)*unknowns[1], a2*g*m2*x123 + dds*x7*x90 + g*l2*m3*x123 + g*l2*m4*x123 - x111 - x124 - x126 - (x97)*unknowns[0] - (x121)*unknowns[2] - (x122)*unknowns[3], x128 - (x121)*unknowns[1], x129 - (x122)*unknowns[1], x130*x4 + x130*x5 + x130*x6 - (-x7*x90)*unknowns[1]])
+	jac_dtheta2 = lu_solve(lu, [d2 - x132*x4 - x132*x5 - x132*x6, -d2 - d3, d3 + x133*x69 + x133*x72, x131*x85, x134*x4 + x134*x5 + x134*x6])
+	jac_theta3 = lu_solve(lu, [x106 - (x99)*unknowns[2], x126 - (x120)*unknowns[2], a3*g*m3*x136 + dds*x15*x93 + g*l3*m4*x136 - x113 - x128 - x137 - (x99)*unknowns[0] - (x120)*unknowns[1] - (x135)*unknowns[3], x138 - (x135)*unknowns[2], x13*x139 + x139*x14 - (-x15*x93)*unknowns[2]])
+	jac_dtheta3 = lu_solve(lu, [-x13*x141 - x14*x141, d3 - x142*x69 - x142*x72, -d3 - d4, d4 + x140*x86, x13*x143 + x14*x143])
+	jac_theta4 = lu_solve(lu, [x103 - (x84)*unknowns[3], x124 - (x85)*unknowns[3], x137 - (x86)*unknowns[3], a4*dds*m4*x96 + a4*g*m4*jnp.cos(x83) - x114 - x129 - x138 - (x84)*unknowns[0] - (x85)*unknowns[1] - (x86)*unknowns[2], x48*x62 - (-x144)*unknowns[3]])
+	jac_dtheta4 = lu_solve(lu, [-x145*x84, -x145*x85, -x145*x86 - x146, x146, x144*x145])
+	jac_dds = lu_solve(lu, [-x42, -x44, -x46, -x48, -x88])
+	jacobian_state = jnp.array([
+		[0, 1, 0, 0, 0, 0, 0, 0, 0, 0],
+		[0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+		[0, 0, 0, 1, 0, 0, 0, 0, 0, 0],
+		[0, 0, jac_theta1[0], jac_dtheta1[0], jac_theta2[0], jac_dtheta2[0], jac_theta3[0], jac_dtheta3[0], jac_theta4[0], jac_dtheta4[0]],
+		[0, 0, 0, 0, 0, 1, 0, 0, 0, 0],
+		[0, 0, jac_theta1[1], jac_dtheta1[1], jac_theta2[1], jac_dtheta2[1], jac_theta3[1], jac_dtheta3[1], jac_theta4[1], jac_dtheta4[1]],
+		[0, 0, 0, 0, 0, 0, 0, 1, 0, 0],
+		[0, 0, jac_theta1[2], jac_dtheta1[2], jac_theta2[2], jac_dtheta2[2], jac_theta3[2], jac_dtheta3[2], jac_theta4[2], jac_dtheta4[2]],
+		[0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
+		[0, 0, jac_theta1[3], jac_dtheta1[3], jac_theta2[3], jac_dtheta2[3], jac_theta3[3], jac_dtheta3[3], jac_theta4[3], jac_dtheta4[3]],
+	])
+	jacobian_action = jnp.array([[0], [1], [0], [jac_dds[0]], [0], [jac_dds[1]], [0], [jac_dds[2]], [0], [jac_dds[3]]])
+	return jacobian_state, jacobian_action
+
+@jax.jit
+def distance_function(state: jnp.ndarray, goal_state: jnp.ndarray) -> jnp.ndarray:
+	s, ds, theta1, dtheta1, theta2, dtheta2, theta3, dtheta3, theta4, dtheta4 = state
+	s_, ds_, theta1_, dtheta1_, theta2_, dtheta2_, theta3_, dtheta3_, theta4_, dtheta4_ = goal_state
+	dist_s = s_-s
+	dist_ds = ds_-ds
+	dist_theta1 = jnp.arctan2(jnp.sin(theta1-theta1_), jnp.cos(theta1-theta1_))
+	dist_dtheta1 = dtheta1_-dtheta1
+	dist_theta2 = jnp.arctan2(jnp.sin(theta2-theta2_), jnp.cos(theta2-theta2_))
+	dist_dtheta2 = dtheta2_-dtheta2
+	dist_theta3 = jnp.arctan2(jnp.sin(theta3-theta3_), jnp.cos(theta3-theta3_))
+	dist_dtheta3 = dtheta3_-dtheta3
+	dist_theta4 = jnp.arctan2(jnp.sin(theta4-theta4_), jnp.cos(theta4-theta4_))
+	dist_dtheta4 = dtheta4_-dtheta4
+	dist = jnp.array([dist_s, dist_ds, dist_theta1, dist_dtheta1, dist_theta2, dist_dtheta2, dist_theta3, dist_dtheta3, dist_theta4, dist_dtheta4])
+	return dist
+
+def generate_dynamics_with_4_poles(mc: float, g: float, phi: float, pole_ms: Sequence[float], pole_ls: Sequence[float], pole_as: Sequence[float], pole_ds: Sequence[float], pole_Js: Sequence[float]) -> tuple[Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray], Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray], Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray]]:
+	params = (mc, g, phi, pole_ms, pole_ls, pole_as, pole_ds, pole_Js)
+	return lambda state, action: dynamics_function(state, action, params), lambda state, action: observation_function(state, action, params), distance_function
@@ -21,11 +21,10 @@ def generate_dynamic_vars(n_poles: int) -> list[Symbol]:
     pure_vars = [pure_s, pure_d_s] + [item for pair in zip(pure_thetas, pure_d_thetas) for item in pair] + [pure_dd_s] + pure_dd_thetas
     return pure_vars
 
-def calculate_equations_of_motions(n_poles: int, verbose: bool = True):
+def calculate_euler_lagrange_equations(n_poles: int, verbose: bool = True):
     assert n_poles > 0
 
     if verbose:
-        print(f"Calculating equations of motion for {n_poles} pole(s)")
         print(f"Creating variables...")
 
     # Create time dependent variables
@@ -86,6 +85,17 @@ def calculate_equations_of_motions(n_poles: int, verbose: bool = True):
         rh = 0
         eqs.append(lh-rh)
 
+    sp_vars = [s, d_s] + [item for pair in zip(thetas, d_thetas) for item in pair] + [dd_s] + dd_thetas
+    return eqs, sp_vars, tau
+
+def calculate_equations_of_motions(n_poles: int, verbose: bool = True):
+    assert n_poles > 0
+
+    if verbose:
+        print(f"Calculating equations of motion for {n_poles} pole(s)")
+    eqs, sp_vars, tau = calculate_euler_lagrange_equations(n_poles, verbose)
+    dd_thetas = sp_vars[-n_poles:]
+
     if verbose:
         print(f"Simplifying equations...")
     # Simplify equations makes the solution faster (I think)
@@ -105,7 +115,6 @@ def calculate_equations_of_motions(n_poles: int, verbose: bool = True):
         sols = dict(zip([tau]+dd_thetas, sols[0]))
 
     sp_sols = [sp.simplify(sols[tau])] + [sp.simplify(sols[dd_theta]) for dd_theta in dd_thetas] 
-    sp_vars = [s, d_s] + [item for pair in zip(thetas, d_thetas) for item in pair] + [dd_s] + dd_thetas
 
     pure_vars = generate_dynamic_vars(n_poles)
     subs_dict = dict(zip(sp_vars, pure_vars))
@@ -113,6 +122,53 @@ def calculate_equations_of_motions(n_poles: int, verbose: bool = True):
 
     return sp_sols, pure_sols
 
+def calculate_mass_matrix(n_poles: int, verbose: bool = True) -> tuple[sp.Matrix, sp.Matrix, sp.Matrix]:
+    assert n_poles > 0
+
+    if verbose:
+        print(f"Calculating mass matrix for {n_poles} pole(s)")
+    eqs, sp_vars, tau = calculate_euler_lagrange_equations(n_poles, verbose)
+
+    pure_vars = generate_dynamic_vars(n_poles)
+    subs_dict = dict(zip(sp_vars, pure_vars))
+    eqs = sp.Matrix([eq.subs(subs_dict) for eq in eqs])
+    accelerations = pure_vars[-(n_poles+1):]
+
+    if verbose:
+        print(f"Collecting mass matrix, bias and input map...")
+
+    # The Euler-Lagrange equations are linear in the accelerations and the input,
+    # M(q)*[dds, ddtheta] + bias(q, dq) = input_map*tau, which is solved numerically at runtime
+    # instead of symbolically, since the closed form solutions grow combinatorially with the number of poles
+    mass_matrix = eqs.jacobian(accelerations)
+    input_map = -eqs.jacobian([tau])
+    bias = eqs.subs({var: 0 for var in accelerations + [tau]})
+
+    if verbose:
+        print(f"Simplifying...")
+    mass_matrix = mass_matrix.applyfunc(sp.simplify)
+    input_map = input_map.applyfunc(sp.simplify)
+    bias = bias.applyfunc(sp.simplify)
+
+    return mass_matrix, bias, input_map
+
+def save_mass_matrix(n_poles: int, mass_matrix: sp.Matrix, bias: sp.Matrix, input_map: sp.Matrix) -> None:
+    current_path = os.path.dirname(__file__)
+    for name, matrix in zip(["mass_matrix", "bias", "input_map"], [mass_matrix, bias, input_map]):
+        file_path = f"{current_path}/solutions/{name}_with_{n_poles}_poles.txt"
+        with open(file_path, 'w') as file:
+            file.write(str(matrix.tolist()))
+
+def load_mass_matrix(n_poles: int) -> tuple[sp.Matrix, sp.Matrix, sp.Matrix]:
+    current_path = os.path.dirname(__file__)
+    matrices = []
+    for name in ["mass_matrix", "bias", "input_map"]:
+        file_path = f"{current_path}/solutions/{name}_with_{n_poles}_poles.txt"
+        with open(file_path, 'r') as file:
+            matrices.append(sp.Matrix(sp.sympify(file.read())))
+    mass_matrix, bias, input_map = matrices
+    return mass_matrix, bias, input_map
+
 def save_equations_of_motions(n_poles: int, sols) -> None:
     for i, sol in enumerate(sols):
         name = "tau" if i == 0 else f"dd_theta_{i}"
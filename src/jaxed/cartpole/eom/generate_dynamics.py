@@ -1,64 +1,197 @@
-from eom import load_equations_of_motions
+from eom import load_mass_matrix, generate_dynamic_vars
+from sympy.printing.numpy import JaxPrinter
+import sympy as sp
 import os
 
-def generate_dynamics_script(n_poles: int, sols):
-    eqs_str = [str(sol) for sol in sols]
-    replace = {
-        "sin": "jnp.sin",
-        "cos": "jnp.cos",
-    }
-    for old, new in replace.items():
-        eqs_str = [eq_str.replace(old, new) for eq_str in eqs_str]
+class JnpPrinter(JaxPrinter):
+    def _module_format(self, fqn: str, register: bool = True) -> str:
+        return super()._module_format(fqn, register).replace("jax.numpy.", "jnp.")
+
+def clean_floats(expr):
+    # 1.0*x -> x, the equations of motion are derived with float coefficients
+    return sp.nsimplify(expr, rational=True)
+
+def cse_lines(exprs: list, printer: JaxPrinter) -> tuple[str, list[str]]:
+    # Shared subexpressions across all outputs become temporaries x0, x1, ...
+    replacements, reduced = sp.cse(exprs, symbols=sp.numbered_symbols("x"))
+    lines = "".join(f"\t{symbol} = {printer.doprint(expr)}\n" for symbol, expr in replacements)
+    return lines, [printer.doprint(expr) for expr in reduced]
+
+def generate_dynamics_script(n_poles: int, mass_matrix, bias, input_map):
+    printer = JnpPrinter()
     script = "import jax\n"
     script += "import jax.numpy as jnp\n"
     script += "from typing import Sequence, Callable\n"
     script += "\n# This file and its content are generated by generate_dynamics.py\n"
-    script += f"\ndef generate_dynamics_with_{n_poles}_poles(mc: float, g: float, phi: float, pole_ms: Sequence[float], pole_ls: Sequence[float], pole_as: Sequence[float], pole_ds: Sequence[float], pole_Js: Sequence[float]) -> tuple[Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray], Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray], Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray]]:\n"
-    states = "\t\ts, ds"
-    states_ = "\t\ts_, ds_"
-    ddthetas = ""
-    params = ""
-    dstates = f"\t\tdstate = jnp.array([ds, dds"
-    observation = f"\t\tobservation = jnp.array([s, ds"
+    states = "\ts, ds"
+    states_ = "\ts_, ds_"
+    params = "\tmc, g, phi, pole_ms, pole_ls, pole_as, pole_ds, pole_Js = params\n"
+    dstates = f"\tdstate = jnp.array([ds, dds"
+    observation = f"\tobservation = jnp.array([s, ds"
 
     for i in range(n_poles):
         states += f", theta{i+1}, dtheta{i+1}"
         states_ += f", theta{i+1}_, dtheta{i+1}_"
-        ddthetas += f"\t\tddtheta{i+1} = {eqs_str[i+1]}\n"
         params += f"\tm{i+1}, l{i+1}, a{i+1}, d{i+1}, J{i+1} = pole_ms[{i}], pole_ls[{i}], pole_as[{i}], pole_ds[{i}], pole_Js[{i}]\n"
-        dstates += f", dtheta{i+1}, ddtheta{i+1}"
+        dstates += f", dtheta{i+1}, unknowns[{i}]"
         observation += f", theta{i+1}, dtheta{i+1}"
+
+    # M(q)*[dds, ddthetas] + bias = input_map*tau, where dds is the action and tau and the ddthetas are the unknowns of A*unknowns = b.
+    # The pole rows come first, so the pivots are the leading minors of the positive definite pole block
+    pure_vars = generate_dynamic_vars(n_poles)
+    state_vars = pure_vars[:2+2*n_poles]
+    dds = pure_vars[2+2*n_poles]
+    order = list(range(1, n_poles+1)) + [0]
+    A = [[clean_floats(mass_matrix[i, j]) for j in range(1, n_poles+1)] + [clean_floats(-input_map[i])] for i in order]
+    b = [clean_floats(-(mass_matrix[i, 0]*dds + bias[i])) for i in order]
+    n_unknowns = n_poles+1
+
+    def system_lines(exprs: list) -> tuple[str, list[str]]:
+        lines, reduced = cse_lines(exprs, printer)
+        A_str = [reduced[i*n_unknowns:(i+1)*n_unknowns] for i in range(n_unknowns)]
+        b_str = reduced[n_unknowns**2:n_unknowns**2+n_unknowns]
+        lines += "\tA = [\n"
+        for row in A_str:
+            lines += f"\t\t[{', '.join(row)}],\n"
+        lines += "\t]\n"
+        lines += f"\tb = [{', '.join(b_str)}]\n"
+        return lines, reduced[n_unknowns**2+n_unknowns:]
+
+    # Gaussian elimination without pivoting, unrolled at trace time into scalar operations,
+    # which is much faster than jnp.linalg.solve for a handful of unknowns, especially when vmapped
+    script += "\ndef lu_factor(A: list) -> tuple[list, list]:\n"
+    script += "\tn = len(A)\n"
+    script += "\tU = [list(row) for row in A]\n"
+    script += "\tL = [[0]*n for _ in range(n)]\n"
+    script += "\tfor k in range(n):\n"
+    script += "\t\tfor i in range(k+1, n):\n"
+    script += "\t\t\tL[i][k] = U[i][k]/U[k][k]\n"
+    script += "\t\t\tfor j in range(k+1, n):\n"
+    script += "\t\t\t\tU[i][j] = U[i][j] - L[i][k]*U[k][j]\n"
+    script += "\treturn L, U\n"
+
+    script += "\ndef lu_solve(lu: tuple[list, list], b: list) -> list:\n"
+    script += "\tL, U = lu\n"
+    script += "\tn = len(b)\n"
+    script += "\ty = list(b)\n"
+    script += "\tfor i in range(n):\n"
+    script += "\t\ty[i] = y[i] - sum(L[i][k]*y[k] for k in range(i))\n"
+    script += "\tx = [0]*n\n"
+    script += "\tfor k in reversed(range(n)):\n"
+    script += "\t\tx[k] = (y[k] - sum(U[k][j]*x[j] for j in range(k+1, n)))/U[k][k]\n"
+    script += "\treturn x\n"
+
+    script += "\ndef linear_solve(A: list, b: list) -> list:\n"
+    script += "\treturn lu_solve(lu_factor(A), b)\n"
+
+    lines, _ = system_lines([entry for row in A for entry in row] + b)
+    script += "\ndef solve_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> list:\n"
     script += params
-    script += "\n\t@jax.jit\n"
-    script += "\tdef dynamics_function(state: jnp.ndarray, action: jnp.ndarray) -> jnp.ndarray:\n"
     script += states + " = state\n"
-    script += "\t\tdds = action[0]\n"
-    script += ddthetas
+    script += "\tdds = action[0]\n"
+    script += lines
+    script += "\t# [ddtheta1, ..., ddthetan, tau]\n"
+    script += "\treturn linear_solve(A, b)\n"
+
+    # The parameters are an argument, so one compiled kernel serves every system and batches of systems can be vmapped
+    script += "\n@jax.jit\n"
+    script += "def dynamics_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> jnp.ndarray:\n"
+    script += states + " = state\n"
+    script += "\tdds = action[0]\n"
+    script += "\tunknowns = solve_function(state, action, params)\n"
     script += f"{dstates}])\n"
-    script += "\t\treturn dstate\n"
+    script += "\treturn dstate\n"
 
-    script += "\n\t@jax.jit\n"
-    script += "\tdef observation_function(state: jnp.ndarray, action: jnp.ndarray) -> jnp.ndarray:\n"
+    script += "\n@jax.jit\n"
+    script += "def observation_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> jnp.ndarray:\n"
     script += states + " = state\n"
-    script += "\t\tdds = action[0]\n"
-    script += f"\t\ttau = {eqs_str[0]}\n"
+    script += "\ttau = solve_function(state, action, params)[-1]\n"
     script += f"{observation}, tau])\n"
-    script += "\t\treturn observation\n"
+    script += "\treturn observation\n"
 
-    script += "\n\t@jax.jit\n"
-    script += "\tdef distance_function(state: jnp.ndarray, goal_state: jnp.ndarray) -> jnp.ndarray:\n"
+    # Both outputs from a single solve
+    script += "\n@jax.jit\n"
+    script += "def dynamics_and_observe_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> tuple[jnp.ndarray, jnp.ndarray]:\n"
+    script += states + " = state\n"
+    script += "\tdds = action[0]\n"
+    script += "\tunknowns = solve_function(state, action, params)\n"
+    script += f"{dstates}])\n"
+    script += f"{observation}, unknowns[-1]])\n"
+    script += "\treturn dstate, observation\n"
+
+    # Differentiating A*unknowns = b gives A*d_unknowns/dz = db/dz - dA/dz*unknowns for every state and the action,
+    # which reuses the factorization of A
+    variables = state_vars + [dds]
+    derivatives = []
+    for var in variables:
+        dA = [[sp.diff(entry, var) for entry in row] for row in A]
+        db = [sp.diff(entry, var) for entry in b]
+        derivatives.append((var, dA, db))
+    jacobian_exprs = [entry for row in A for entry in row] + b
+    for var, dA, db in derivatives:
+        jacobian_exprs += [entry for row in dA for entry in row] + db
+    lines, reduced = system_lines(jacobian_exprs)
+
+    script += "\n@jax.jit\n"
+    script += "def dynamics_jacobian_function(state: jnp.ndarray, action: jnp.ndarray, params: Sequence) -> tuple[jnp.ndarray, jnp.ndarray]:\n"
+    script += params
+    script += states + " = state\n"
+    script += "\tdds = action[0]\n"
+    script += lines
+    script += "\tlu = lu_factor(A)\n"
+    script += "\tunknowns = lu_solve(lu, b)\n"
+    size = n_unknowns**2+n_unknowns
+    jacobian_columns = {}
+    for k, (var, dA, db) in enumerate(derivatives):
+        dA_str = reduced[k*size:k*size+n_unknowns**2]
+        db_str = reduced[k*size+n_unknowns**2:(k+1)*size]
+        rhs = []
+        for i in range(n_unknowns):
+            entry = db_str[i] if db[i] != 0 else ""
+            for j in range(n_unknowns):
+                if dA[i][j] != 0:
+                    term = f"({dA_str[i*n_unknowns+j]})*unknowns[{j}]"
+                    entry = f"{entry} - {term}" if entry else f"-{term}"
+            rhs.append(entry)
+        if not any(rhs):
+            continue
+        script += f"\tjac_{var} = lu_solve(lu, [{', '.join(entry if entry else '0' for entry in rhs)}])\n"
+        jacobian_columns[var] = f"jac_{var}"
+
+    # Rows of dstate = [ds, dds, dtheta1, ddtheta1, ...], only the ddthetas depend on the solve
+    first_order = [state_vars[1], dds] + [state_vars[3+2*i] for i in range(n_poles)]
+    def jacobian_row(row: int, var) -> str:
+        if row < 2 or row % 2 == 0:
+            return "1" if first_order[row if row < 2 else 1+row//2] == var else "0"
+        if var not in jacobian_columns:
+            return "0"
+        return f"{jacobian_columns[var]}[{(row-3)//2}]"
+
+    n_states = 2+2*n_poles
+    script += "\tjacobian_state = jnp.array([\n"
+    for row in range(n_states):
+        script += f"\t\t[{', '.join(jacobian_row(row, var) for var in state_vars)}],\n"
+    script += "\t])\n"
+    script += f"\tjacobian_action = jnp.array([{', '.join(f'[{jacobian_row(row, dds)}]' for row in range(n_states))}])\n"
+    script += "\treturn jacobian_state, jacobian_action\n"
+
+    script += "\n@jax.jit\n"
+    script += "def distance_function(state: jnp.ndarray, goal_state: jnp.ndarray) -> jnp.ndarray:\n"
     script += states + " = state\n"
     script += states_ + " = goal_state\n"
-    dist = f"\t\tdist = jnp.array([dist_s, dist_ds"
-    script += "\t\tdist_s = s_-s\n"
-    script += "\t\tdist_ds = ds_-ds\n"
+    dist = f"\tdist = jnp.array([dist_s, dist_ds"
+    script += "\tdist_s = s_-s\n"
+    script += "\tdist_ds = ds_-ds\n"
     for i in range(n_poles):
-        script += f"\t\tdist_theta{i+1} = jnp.arctan2(jnp.sin(theta{i+1}-theta{i+1}_), jnp.cos(theta{i+1}-theta{i+1}_))\n"
-        script += f"\t\tdist_dtheta{i+1} = dtheta{i+1}_-dtheta{i+1}\n"
+        script += f"\tdist_theta{i+1} = jnp.arctan2(jnp.sin(theta{i+1}-theta{i+1}_), jnp.cos(theta{i+1}-theta{i+1}_))\n"
+        script += f"\tdist_dtheta{i+1} = dtheta{i+1}_-dtheta{i+1}\n"
         dist += f", dist_theta{i+1}, dist_dtheta{i+1}"
     script += f"{dist}])\n"
-    script += "\t\treturn dist\n"
-    script += f"\n\treturn dynamics_function, observation_function, distance_function\n"
+    script += "\treturn dist\n"
+
+    script += f"\ndef generate_dynamics_with_{n_poles}_poles(mc: float, g: float, phi: float, pole_ms: Sequence[float], pole_ls: Sequence[float], pole_as: Sequence[float], pole_ds: Sequence[float], pole_Js: Sequence[float]) -> tuple[Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray], Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray], Callable[[jnp.ndarray, jnp.ndarray], jnp.ndarray]]:\n"
+    script += "\tparams = (mc, g, phi, pole_ms, pole_ls, pole_as, pole_ds, pole_Js)\n"
+    script += "\treturn lambda state, action: dynamics_function(state, action, params), lambda state, action: observation_function(state, action, params), distance_function\n"
 
     # save to a script
     current_path = os.path.dirname(__file__)
@@ -67,14 +200,14 @@ def generate_dynamics_script(n_poles: int, sols):
         f.write(script)
 
 def generate_eom() -> None:
-    max_n_poles = 2
+    max_n_poles = 4
 
     for n_poles in range(1, max_n_poles+1):
         print(f"Loading equations of motion for {n_poles} poles...")
-        pure_sols = load_equations_of_motions(n_poles)
+        mass_matrix, bias, input_map = load_mass_matrix(n_poles)
 
         print("Generating dynamics scripts...")
-        generate_dynamics_script(n_poles, pure_sols)
+        generate_dynamics_script(n_poles, mass_matrix, bias, input_map)
 
 if __name__ == "__main__":
-    generate_eom()
\ No newline at end of file
+    generate_eom()
@@ -1,13 +1,13 @@
-from eom import save_equations_of_motions, calculate_equations_of_motions
+from eom import save_mass_matrix, calculate_mass_matrix
 
 def generate_eom() -> None:
-    max_n_poles = 2
+    max_n_poles = 4
     print("Generating equations of motion files...")
     for n_poles in range(1, max_n_poles+1):
-        sols, pure_sols = calculate_equations_of_motions(n_poles)
+        mass_matrix, bias, input_map = calculate_mass_matrix(n_poles)
 
         print("Saving equations of motion...")
-        save_equations_of_motions(n_poles, pure_sols)
+        save_mass_matrix(n_poles, mass_matrix, bias, input_map)
 
 if __name__ == "__main__":
     generate_eom()
\ No newline at end of file
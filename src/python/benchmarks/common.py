@@ -0,0 +1,55 @@
+import os
+import sys
+from contextlib import contextmanager
+from time import perf_counter
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+from lib.cartpolesystem import CartPoleSystem, Pole, Cart, StepperMotor
+
+EQUATIONS_PATH = os.path.join(os.path.dirname(__file__), "..", "cartpolesystems")
+
+def make_system(num_poles: int, set_equations: bool = True) -> CartPoleSystem:
+    cart = Cart(0.2167, 0.01, (-1.15/2, 1.15/2), 0.2)
+    motor = StepperMotor(0.04456, (-2.7, 2.7), 0.2, (-2, 2), 0.2)
+    poles = [
+        Pole(0.09445, 0.200, 0.067341, 0.0001, 0.00040300),
+        Pole(0.14945, 0.200, 0.116161, 0.001, 0.001017455),
+    ][:num_poles]
+    system = CartPoleSystem(cart, motor, poles, 9.81, False)
+    if set_equations:
+        system.set_equations(EQUATIONS_PATH)
+    return system
+
+def measure(function, number: int = 100, repeat: int = 5, warmup: int = 1) -> dict[str, float]:
+    for _ in range(warmup):
+        function()
+
+    times = np.zeros(repeat)
+    for i in range(repeat):
+        start = perf_counter()
+        for _ in range(number):
+            function()
+        times[i] = (perf_counter()-start)/number
+
+    return {
+        "mean_us": float(np.mean(times)*1e6),
+        "median_us": float(np.median(times)*1e6),
+        "min_us": float(np.min(times)*1e6),
+        "max_us": float(np.max(times)*1e6),
+        "number": number,
+        "repeat": repeat,
+    }
+
+@contextmanager
+def quiet():
+    # IPOPT prints from C, so stdout has to be redirected at the file descriptor level
+    sys.stdout.flush()
+    stdout = os.dup(1)
+    with open(os.devnull, "w") as devnull:
+        os.dup2(devnull.fileno(), 1)
+        try:
+            yield
+        finally:
+            os.dup2(stdout, 1)
+            os.close(stdout)
@@ -0,0 +1,46 @@
+from time import perf_counter
+import numpy as np
+from common import make_system
+from lib.direct_collocation import CartPoleDirectCollocation
+
+def benchmark(num_poles: int, end_time: float, dt: float = 0.005, dt_collocation: float = 0.03):
+    system = make_system(num_poles)
+    N = int(end_time/dt)
+    N_collocation = int(end_time/dt_collocation)+1
+
+    direct_collocation = CartPoleDirectCollocation(
+        N, 
+        N_collocation, 
+        system.num_poles, 
+        system.m_c,
+        system.motor.r,
+        system.state_lower_bound,
+        system.state_upper_bound,
+        system.state_margin,
+        system.ca_differentiate, 
+        0.0001
+    )
+
+    x0 = np.array([0, 0] + [np.pi, 0]*num_poles)
+    r = np.array([0.1, 0] + [0, 0]*num_poles)
+
+    start = perf_counter()
+    direct_collocation.build(end_time)
+    build_time = perf_counter()-start
+
+    start = perf_counter()
+    direct_collocation.make_solver(end_time, x0, r)
+    solve_time = perf_counter()-start
+
+    stats = direct_collocation.opti.stats()
+    iterations = stats["iter_count"]
+    print(f"{num_poles} pole(s), {N_collocation} nodes:")
+    print(f"  build: {build_time*1000:.1f} ms")
+    print(f"  solve: {solve_time*1000:.1f} ms ({iterations} iterations, {solve_time/max(iterations, 1)*1000:.2f} ms/iteration, success: {stats['success']})")
+
+def main():
+    for num_poles, end_time in [(1, 2.0), (2, 4.0)]:
+        benchmark(num_poles, end_time)
+
+if __name__ == "__main__":
+    main()
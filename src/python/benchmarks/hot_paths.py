@@ -0,0 +1,184 @@
+import os
+import json
+import argparse
+import itertools
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+import numpy as np
+import casadi as ca
+
+from common import EQUATIONS_PATH, make_system, measure, quiet
+from lib.cartpoleenv import CartPoleEnv
+from lib.cartpolesimulator import CartPoleEnvSimulator
+from lib.cartpolecontroller import CartPoleController
+from lib.direct_collocation import CartPoleDirectCollocation
+from lib.numerical import rk4_step, CompiledStep
+from lib import symbolic
+
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), "results")
+
+def benchmark_equations(num_poles: int, scale: float) -> dict[str, dict[str, float]]:
+    results = {}
+    system = make_system(num_poles, False)
+    repeat = max(1, int(3*scale))
+
+    # Cold includes loading and parsing the equations, cached only reuses the parsed ones
+    def set_equations_cold():
+        symbolic._parametric_equations.clear()
+        system.set_equations(EQUATIONS_PATH)
+    results["set_equations_cold"] = measure(set_equations_cold, 1, repeat, 0)
+    results["set_equations_cached"] = measure(lambda: system.set_equations(EQUATIONS_PATH), 1, repeat)
+
+    with tempfile.TemporaryDirectory() as path:
+        system.export_functions(path)
+        results["import_functions"] = measure(lambda: system.import_functions(path), max(1, int(10*scale)), 5)
+    return results
+
+def benchmark_dynamics(num_poles: int, scale: float) -> dict[str, dict[str, float]]:
+    results = {}
+    system = make_system(num_poles)
+    number = max(1, int(1000*scale))
+    state = np.array([0.1, 0.2] + [3.0, 0.5]*num_poles)
+    control = np.array([1.0])
+
+    results["differentiate"] = measure(lambda: system.differentiate(state, control), number)
+    results["linearize"] = measure(lambda: system.linearize(state, control), number)
+    results["rk4_step"] = measure(lambda: rk4_step(0.005, system.differentiate, state, control), number)
+
+    states = np.tile(state, (256, 1))
+    controls = np.tile(control, (256, 1))
+    results["differentiate_many_256"] = measure(lambda: system.differentiate_many(states, controls), max(1, number//10))
+    results["linearize_many_256"] = measure(lambda: system.linearize_many(states, controls), max(1, number//10))
+
+    for name, integration_method in [("env_step_rk4", rk4_step), ("env_step_compiled_rk4", CompiledStep())]:
+        env = CartPoleEnv(system, 0.005, integration_method, telemetry_chunk_size=number*10)
+        results[name] = measure(lambda: env.step(control), number)
+        env.close_telemetry()
+    return results
+
+def benchmark_controller(num_poles: int, scale: float) -> dict[str, dict[str, float]]:
+    system = make_system(num_poles)
+    simulator = CartPoleEnvSimulator(0.005, system)
+    controller = CartPoleController(simulator, 0.005)
+
+    # Regulate the upright position, the same path create_reference sets up
+    pole_pos = [True]*num_poles
+    controller._target_state = np.array([0, 0] + [0, 0]*num_poles)
+    controller._target_K = controller._gain_schedule.lookup(0, pole_pos)
+    controller._control_enabled = True
+
+    state = np.array([0.1, 0.2] + [0.1, 0.5]*num_poles)
+    results = {"calculate_control": measure(lambda: controller.calculate_control(state), max(1, int(1000*scale)))}
+    controller.stop()
+    return results
+
+def benchmark_direct_collocation(num_poles: int, scale: float, dt: float = 0.005, dt_collocation: float = 0.03) -> dict[str, dict[str, float]]:
+    system = make_system(num_poles)
+    end_time = 2.0*num_poles
+    N = int(end_time/dt)
+    N_collocation = int(end_time/dt_collocation)+1
+
+    def make_direct_collocation(system=system):
+        return CartPoleDirectCollocation(
+            N, 
+            N_collocation, 
+            system.num_poles, 
+            system.m_c,
+            system.motor.r,
+            system.state_lower_bound,
+            system.state_upper_bound,
+            system.state_margin,
+            system.ca_differentiate, 
+            0.0001
+        )
+
+    x0 = np.array([0, 0] + [np.pi, 0]*num_poles)
+    r = np.array([0.1, 0] + [0, 0]*num_poles)
+    repeat = max(1, int(3*scale))
+
+    results = {}
+    with quiet():
+        results["make_solver_cold"] = measure(lambda: make_direct_collocation().make_solver(end_time, x0, r), 1, repeat, 0)
+
+        # Every warm solve gets a slightly different target than the previous one, so it starts from a neighbouring solution
+        direct_collocation = make_direct_collocation()
+        direct_collocation.make_solver(end_time, x0, r)
+        targets = itertools.cycle([r + np.array([0.005, 0] + [0, 0]*num_poles), r])
+        results["make_solver_warm"] = measure(lambda: direct_collocation.make_solver(end_time, x0, next(targets)), 1, repeat, 0)
+
+        # The optimizer needs the derivatives of the dynamics, which a system loaded from a compiled store has to keep
+        with tempfile.TemporaryDirectory() as path:
+            system.export_functions(path, compile=True)
+            compiled_system = make_system(num_poles, False)
+            compiled_system.import_functions(path)
+            results["make_solver_compiled_store"] = measure(lambda: make_direct_collocation(compiled_system).make_solver(end_time, x0, r), 1, repeat, 0)
+    return results
+
+BENCHMARKS = {
+    "equations": benchmark_equations,
+    "dynamics": benchmark_dynamics,
+    "controller": benchmark_controller,
+    "direct_collocation": benchmark_direct_collocation,
+}
+
+def metadata() -> dict[str, str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "casadi": ca.__version__, #type: ignore
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+def compare(results: dict, baseline: dict, threshold: float):
+    print(f"\n{'case':<55}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for group, cases in results.items():
+        for name, stats in cases.items():
+            old = baseline.get(group, {}).get(name)
+            if old is None:
+                continue
+            ratio = stats["median_us"]/old["median_us"]
+            flag = "  REGRESSION" if ratio > 1+threshold else ""
+            print(f"{group+'/'+name:<55}{old['median_us']:>10.1f}us{stats['median_us']:>10.1f}us{ratio:>8.2f}{flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the simulation and control hot paths")
+    parser.add_argument("--poles", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--scale", type=float, default=1.0, help="Scale the number of iterations")
+    parser.add_argument("--output", type=str, default=None)
+    parser.add_argument("--compare", type=str, default=None, help="Baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    results = {}
+    for num_poles in args.poles:
+        for name in args.only:
+            group = f"{num_poles}_poles/{name}"
+            print(f"Running {group}...")
+            results[group] = BENCHMARKS[name](num_poles, args.scale)
+            for case, stats in results[group].items():
+                print(f"  {case}: {stats['median_us']:.1f} us")
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_PATH, exist_ok=True)
+        output = os.path.join(RESULTS_PATH, f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json")
+    with open(output, "w") as f:
+        json.dump({"metadata": metadata(), "results": results}, f, indent=2)
+    print(f"Saved results to {output}")
+
+    if args.compare is not None:
+        with open(args.compare, "r") as f:
+            compare(results, json.load(f)["results"], args.threshold)
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ from serial.tools.list_ports import comports
 from lib.cartpolecontroller import CartPoleController
 from lib.cartpolesimulator import CartPoleEnvSimulator, CartPoleSerialSimulator
 from lib.cartpolesystem import CartPoleSystem, Pole, Cart, StepperMotor
+from lib.trajectory_cache import TrajectoryCache
 
 def main():
     dt = 0.005
@@ -50,7 +51,6 @@ def main():
     # J2 = 0.001133810
     # pole2 = Pole(m2, l2, a2, d2, J2)
 
-    print("Calculating equations (1-5 min)...")
     cart = Cart(m, 0.01, (-x_max, x_max), 0.2)
     motor = StepperMotor(r, (-2.7, 2.7), 0.2, (-2, 2), 0.2)
     poles = [
@@ -58,22 +58,25 @@ def main():
     ]
     path = "./cartpolesystems"
     
+    print("Loading equations...")
     system = CartPoleSystem(cart, motor, poles, g, False)
 
-    if system.check_equations(path):
-        system.import_equations(path)
+    if system.check_functions(path):
+        system.import_functions(path)
     else:
-        system.set_equations()
-        system.export_equations(path)
+        system.set_equations(path)
+        system.export_functions(path)
+
+    trajectory_cache = TrajectoryCache("./trajectories")
     
     if (input("Simulate (y/n)?") == "y"):
         sim = CartPoleEnvSimulator(dt, system)
-        controller = CartPoleController(sim, dt)
+        controller = CartPoleController(sim, dt, trajectory_cache=trajectory_cache)
         sim.run()
         controller.run()
     else:
         sim = CartPoleSerialSimulator(dt, system)
-        controller = CartPoleController(sim, dt)
+        controller = CartPoleController(sim, dt, trajectory_cache=trajectory_cache)
         # open ports
         print("Available ports: ")
         ports = [port.name for port in comports()]
@@ -2,8 +2,18 @@ from .cartpolecontroller import CartPoleController
 from .cartpoleenv import CartPoleEnv
 from .cartpolesimulator import CartPoleSimulator, CartPoleEnvSimulator, CartPoleSerialSimulator
 from .cartpolesystem import CartPoleSystem, Cart, Pole, StepperMotor
-from .numerical import rk4_step, fe_step
+from .numerical import rk4_step, fe_step, semi_implicit_euler_step, DormandPrince, CompiledStep
 from .colors import Colors
 from .direct_collocation import CartPoleDirectCollocation
 from .regulators import FSFB, LQR
 from .utils import sympy2casadi
+from .trajectory_solver import TrajectorySolver
+from .trajectory_cache import TrajectoryCache
+from .gain_schedule import GainSchedule
+from .scheduler import RealTimeScheduler, SchedulePolicy
+from .serial_framing import SerialFrameReader
+from .telemetry import TelemetryRecorder, read_telemetry
+from .runlog import RunLog, write_runlog, convert_csv
+from .renderer import CartPoleRenderer
+from .vectorcartpoleenv import VectorCartPoleEnv
+from .probes import Probe, Probes, probes
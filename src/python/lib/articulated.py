@@ -0,0 +1,98 @@
+from __future__ import annotations
+import casadi as ca
+
+# Planar spatial algebra in world coordinates about the origin.
+# Motion vectors are [omega, v_x, v_y] and force vectors are [n, f_x, f_y].
+
+def _cross_motion(v: list, m: list) -> list:
+    return [0, v[2]*m[0] - v[0]*m[2], v[0]*m[1] - v[1]*m[0]]
+
+def _cross_force(v: list, f: list) -> list:
+    return [v[1]*f[2] - v[2]*f[1], -v[0]*f[2], v[0]*f[1]]
+
+def _add(a: list, b: list) -> list:
+    return [x + y for x, y in zip(a, b)]
+
+def _scale(a: list, k) -> list:
+    return [x*k for x in a]
+
+def _dot(a: list, b: list):
+    return a[0]*b[0] + a[1]*b[1] + a[2]*b[2]
+
+def _mat_vec(A: list, v: list) -> list:
+    return [_dot(row, v) for row in A]
+
+def _inertia(m, J, c_x, c_y) -> list:
+    return [
+        [J + m*(c_x*c_x + c_y*c_y), -m*c_y, m*c_x],
+        [-m*c_y, m, 0],
+        [m*c_x, 0, m],
+    ]
+
+def articulated_body_dynamics(state: list, dd_s, g, m_c, pole_ms, pole_ls, pole_as, pole_ds, pole_Js) -> tuple[list, object]:
+    num_poles = len(pole_ms)
+    d_s = state[1]
+    thetas = state[2::2]
+    d_thetas = state[3::2]
+
+    # The joints are relative angles between neighbouring poles, so the dampers act on the joint rates
+    d_qs = [d_thetas[i] - (d_thetas[i-1] if i > 0 else 0) for i in range(num_poles)]
+
+    # Forward pass: joint axes, velocities, velocity product accelerations and bias forces
+    p_x = state[0]
+    p_y = 0
+    v = [0, d_s, 0]
+    Ss, cs, Is, ps = [], [], [], []
+    for i in range(num_poles):
+        sin_theta = ca.sin(thetas[i])
+        cos_theta = ca.cos(thetas[i])
+        # Positive angles rotate the poles clockwise, towards positive x
+        S = [-1, -p_y, p_x]
+        v = _add(v, _scale(S, d_qs[i]))
+        I = _inertia(pole_ms[i], pole_Js[i], p_x + pole_as[i]*sin_theta, p_y + pole_as[i]*cos_theta)
+        Ss.append(S)
+        cs.append(_cross_motion(v, _scale(S, d_qs[i])))
+        Is.append(I)
+        ps.append(_cross_force(v, _mat_vec(I, v)))
+        p_x = p_x + pole_ls[i]*sin_theta
+        p_y = p_y + pole_ls[i]*cos_theta
+
+    # Backward pass: articulated inertias and bias forces
+    Us, Ds, us = [None]*num_poles, [None]*num_poles, [None]*num_poles
+    for i in reversed(range(num_poles)):
+        U = _mat_vec(Is[i], Ss[i])
+        D = _dot(Ss[i], U)
+        u = -pole_ds[i]*d_qs[i] - _dot(Ss[i], ps[i])
+        Us[i], Ds[i], us[i] = U, D, u
+        if i > 0:
+            Ia = [[Is[i][r][k] - U[r]*U[k]/D for k in range(3)] for r in range(3)]
+            pa = _add(_add(ps[i], _mat_vec(Ia, cs[i])), _scale(U, u/D))
+            Is[i-1] = [[Is[i-1][r][k] + Ia[r][k] for k in range(3)] for r in range(3)]
+            ps[i-1] = _add(ps[i-1], pa)
+
+    # Forward pass: accelerations, with gravity as an upwards acceleration of the cart
+    a = [0, dd_s, g]
+    dd_qs = []
+    for i in range(num_poles):
+        a = _add(a, cs[i])
+        dd_q = (us[i] - _dot(Us[i], a))/Ds[i]
+        a = _add(a, _scale(Ss[i], dd_q))
+        dd_qs.append(dd_q)
+
+    dd_thetas = []
+    dd_theta = 0
+    for dd_q in dd_qs:
+        dd_theta = dd_theta + dd_q
+        dd_thetas.append(dd_theta)
+
+    # The cart force is the rate of change of the horizontal momentum
+    tau = m_c*dd_s
+    a_x = dd_s
+    for i in range(num_poles):
+        sin_theta = ca.sin(thetas[i])
+        cos_theta = ca.cos(thetas[i])
+        a_com_x = a_x + pole_as[i]*(cos_theta*dd_thetas[i] - sin_theta*d_thetas[i]**2)
+        tau = tau + pole_ms[i]*a_com_x
+        a_x = a_x + pole_ls[i]*(cos_theta*dd_thetas[i] - sin_theta*d_thetas[i]**2)
+
+    return dd_thetas, tau
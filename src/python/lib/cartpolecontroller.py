@@ -3,42 +3,13 @@ from numpy import radians
 import pandas as pd
 from enum import Enum
 from threading import Thread
-from multiprocessing import Queue, Process
+from concurrent.futures import CancelledError, Future, TimeoutError
 from .cartpolesimulator import CartPoleSimulator
-from .direct_collocation import CartPoleDirectCollocation
+from .gain_schedule import GainSchedule
 from .regulators import LQR
-
-def make_solver(
-        N: int, 
-        N_collocation: int,
-        num_poles: int, 
-        m_c: float,
-        radius: float,
-        state_lower_bound: np.ndarray,
-        state_upper_bound: np.ndarray,
-        state_margin: np.ndarray,
-        sp_vars, 
-        sp_sols, 
-        end_time: float, 
-        x0: np.ndarray, 
-        target_state: np.ndarray, 
-        output: Queue
-    ):
-    direct_collocation = CartPoleDirectCollocation(
-        N, 
-        N_collocation, 
-        num_poles, 
-        m_c,
-        radius,
-        state_lower_bound,
-        state_upper_bound,
-        state_margin,
-        sp_vars, 
-        sp_sols, 
-        0.0001
-    )
-    states, controls = direct_collocation.make_solver(end_time, x0, target_state)
-    output.put([states, controls])
+from .runlog import write_runlog
+from .trajectory_cache import TrajectoryCache
+from .trajectory_solver import TrajectorySolver
 
 class ControlType(Enum):
     LQR = 0
@@ -46,13 +17,19 @@ class ControlType(Enum):
     COS = 2
 
 class CartPoleController:
-    def __init__(self, simulator: CartPoleSimulator, dt: float):
+    def __init__(self, simulator: CartPoleSimulator, dt: float, trajectory_timeout: float = 30, trajectory_cache: TrajectoryCache | None = None):
         self._simulator = simulator
         self._system = simulator.system
         self._simulator.get_control = self.calculate_control
+        self.probes = simulator.probes
         self._thread = Thread(target=self._run_loop)
         self._dt = dt
+        self._trajectory_solver = TrajectorySolver(self._system, dt)
+        self._trajectory_timeout = trajectory_timeout
+        self._trajectory_future: Future | None = None
+        self._trajectory_cache = trajectory_cache
         self._reset()
+        self._gain_schedule = GainSchedule(self._system, dt, self.Q, self.R)
 
     def _reset(self):
         self._is_running = False
@@ -93,51 +70,40 @@ class CartPoleController:
             return
         self._control_enabled = False
         self._control_type = ControlType.LQR
+        self.cancel_trajectory()
+
+    def cancel_trajectory(self):
+        if self._trajectory_future is not None:
+            self._trajectory_future.cancel()
+            self._trajectory_future = None
 
     def create_trajectory(self, pos: float, pole_pos: list[bool], end_time: float):
         if self._control_calculating or not self._is_running or self._control_type == ControlType.TRAJECTORY or not self._simulator.running:
             return
         
         self._control_calculating = True
-        dt_collocation = 0.03
-        N_collocation = int(end_time/dt_collocation)+1
 
         self._last_pole_pos = pole_pos
         pole_states = np.array([[float(0 if pos else radians(180)), 0.0] for pos in pole_pos]).flatten()
         target_state = np.array([pos, 0] + pole_states.tolist())
 
-        N = int(end_time/self.dt)
-        system = self._system
         x0 = self._target_state
 
-        output = Queue()
-        process = Process(target=make_solver, args=(
-            N,
-            N_collocation, 
-            system.num_poles, 
-            system.m_c,
-            system.motor.r,
-            system.state_lower_bound,
-            system.state_upper_bound,
-            system.state_margin,
-            system.sp_vars,
-            system.sp_sols,
-            end_time, 
-            x0, 
-            target_state, 
-            output
-        ))
-        process.start()
-
-        while output.empty():
-            pass
-        result = output.get()
-        states, controls = result
-
-        As, Bs = np.vectorize(system.linearize, signature='(n),(m)->(n,n),(n,m)')(states, controls)
-        A_ds, B_ds = np.vectorize(LQR.discretize, signature='(),(n,n),(n,m),(a,b),(c,d)->(n,n),(n,m)')(self.dt, As, Bs, self.C, self.D)
-        _, K_ds = LQR.calculate_finite_K_ds(A_ds, B_ds, self.Q, self.R)
-
+        key = None
+        trajectory = None
+        if self._trajectory_cache is not None:
+            key = self._trajectory_cache.key(self._system, x0, target_state, end_time, self.dt, self.Q, self.R)
+            trajectory = self._trajectory_cache.get(key)
+
+        if trajectory is None:
+            trajectory = self._solve_trajectory(x0, target_state, end_time)
+            if trajectory is None:
+                self._control_calculating = False
+                return
+            if self._trajectory_cache is not None and key is not None:
+                self._trajectory_cache.put(key, *trajectory)
+
+        states, controls, K_ds = trajectory
         self._trajectory_states = states
         self._trajectory_controls = controls
         self._trajectory_K_ds = K_ds
@@ -149,6 +115,32 @@ class CartPoleController:
         self._control_type = ControlType.TRAJECTORY
         self._control_calculating = False
 
+    def _solve_trajectory(self, x0: np.ndarray, target_state: np.ndarray, end_time: float) -> tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+        # The LQR regulator keeps running in the simulator thread while the worker solves
+        future = self._trajectory_solver.submit(x0, target_state, end_time)
+        self._trajectory_future = future
+        try:
+            start = self.probes.start()
+            states, controls = future.result(timeout=self._trajectory_timeout)
+            self.probes.record("controller.wait_trajectory", start)
+        except (TimeoutError, CancelledError):
+            self.cancel_trajectory()
+            return None
+        except RuntimeError as e:
+            print(f'Trajectory error: {e}')
+            self._trajectory_future = None
+            return None
+
+        # A running solve cannot be interrupted, so drop results that were cancelled in the meantime
+        if self._trajectory_future is not future:
+            return None
+        self._trajectory_future = None
+
+        As, Bs = self._system.linearize_many(states, controls)
+        A_ds, B_ds = LQR.discretize_many(self.dt, As, Bs)
+        _, K_ds = LQR.calculate_finite_K_ds(A_ds, B_ds, self.Q, self.R)
+        return states, controls, K_ds
+
     def create_reference(self, pos: float):
         if self._control_calculating or not self._is_running or self._control_type == ControlType.TRAJECTORY or not self._simulator.running:
             return
@@ -158,11 +150,7 @@ class CartPoleController:
         pole_pos = self._last_pole_pos
         pole_states = np.array([[float(0 if pos else radians(180)), 0.0] for pos in pole_pos]).flatten()
         target_state = np.array([pos, 0] + pole_states.tolist())
-        u0 = np.zeros(self._system.num_controls)
-
-        A, B = self._system.linearize(target_state, u0)
-        A_d, B_d = LQR.discretize(self.dt, A, B, self.C, self.D)
-        _, K_d = LQR.calculate_K_d(A_d, B_d, self.Q, self.R)
+        K_d = self._gain_schedule.lookup(pos, pole_pos)
 
         self._target_state = target_state
         self._control_enabled = True
@@ -181,6 +169,7 @@ class CartPoleController:
         self._control_enabled = True
 
     def calculate_control(self, state: np.ndarray):
+        start = self.probes.start()
         control = np.zeros(self._system.num_controls)
         desired_control = np.zeros(self._system.num_controls)
         desired_state = np.zeros(self._system.num_states)
@@ -210,6 +199,7 @@ class CartPoleController:
         self._desired_controls.append(desired_control)
         self._desired_states.append(desired_state)
         self._errors.append(error)
+        self.probes.record("controller.calculate_control", start)
         return control
     
     def _adjust_gains(self):
@@ -244,6 +234,7 @@ class CartPoleController:
         else:
             acc_gain = float(acc_gain)
         self.R[0, 0] = acc_gain
+        self._gain_schedule.refresh(self.Q, self.R)
     
     def run(self):
         if self._is_running:
@@ -330,7 +321,7 @@ class CartPoleController:
                 self.stop()
                 break
         
-    def export(self, name: str, save_to_file: bool) -> pd.DataFrame:
+    def export(self, name: str, save_to_file: bool, file_format: str = "runlog") -> pd.DataFrame:
         df_env = self._simulator.export()
         data = {}
         desired_states = np.array(self._desired_states)
@@ -355,8 +346,15 @@ class CartPoleController:
         df = pd.concat([df_env, df_desired], axis=1)
 
         if save_to_file:
-            df.to_csv(f'{name}.csv', index=False)
+            if file_format == "runlog":
+                write_runlog(f'{name}.runlog', df)
+            elif file_format == "csv":
+                df.to_csv(f'{name}.csv', index=False)
+            else:
+                raise ValueError(f"Unknown export format: {file_format}")
         return df
 
     def stop(self):
-        self._is_running = False
\ No newline at end of file
+        self._is_running = False
+        self.cancel_trajectory()
+        self._trajectory_solver.shutdown(wait=True)
\ No newline at end of file
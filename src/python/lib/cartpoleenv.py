@@ -1,4 +1,5 @@
 from __future__ import annotations
+import os
 from typing import Callable
 import numpy as np
 from numpy import radians, sin, cos
@@ -9,13 +10,20 @@ from gym import spaces, Env
 import pygame
 from time import perf_counter
 from .cartpolesystem import CartPoleSystem
+from .telemetry import TelemetryRecorder
+from .numerical import CompiledStep
+from .probes import Probes, probes as default_probes
 
 class CartPoleEnv(Env):
   def __init__(
     self, 
     system: CartPoleSystem, 
     dt_sim: float,
-    integration_method: Callable[[float, Callable[[np.ndarray, np.ndarray], np.ndarray], np.ndarray, np.ndarray], tuple[np.ndarray, np.ndarray]],
+    integration_method: Callable[[float, Callable[[np.ndarray, np.ndarray], np.ndarray], np.ndarray, np.ndarray], tuple[np.ndarray, np.ndarray]] | CompiledStep,
+    telemetry_dtype: type = np.float64,
+    telemetry_path: str | None = None,
+    telemetry_chunk_size: int = 4096,
+    probes: Probes | None = None,
   ):
     super(CartPoleEnv, self).__init__()
     self.system = system
@@ -45,21 +53,87 @@ class CartPoleEnv(Env):
       dtype=np.float64
     )
     self.integration_method = integration_method
-    self.reset()
+    if isinstance(integration_method, CompiledStep):
+      self._init_compiled_step(integration_method)
+
+    self.telemetry_dtype = telemetry_dtype
+    self.telemetry_path = telemetry_path
+    self.telemetry_chunk_size = telemetry_chunk_size
+    self.telemetry: TelemetryRecorder | None = None
+    self.probes = default_probes if probes is None else probes
+    # The callers reset again before running, so this first run is only kept in memory and never creates a run directory
+    self._reset(None, None)
+
+  def _init_compiled_step(self, compiled_step: CompiledStep):
+    # Fixed argument and result arrays, so each step is a single CasADi call without conversions
+    self._step_state = np.zeros(self.system.num_states)
+    self._step_action = np.zeros(self.system.num_controls)
+    self._step_results = [
+      np.zeros(self.system.num_states), 
+      np.zeros(self.system.num_states), 
+      np.zeros(self.system.num_constraint_states), 
+      np.zeros(self.system.num_controls)
+    ]
+    self.ca_step = compiled_step.build(self.system, self.dt_sim)
+    self._step_buffer, self._step_eval = self.ca_step.buffer()
+    self._step_buffer.set_arg(0, memoryview(self._step_state))
+    self._step_buffer.set_arg(1, memoryview(self._step_action))
+    for i, result in enumerate(self._step_results):
+      self._step_buffer.set_res(i, memoryview(result))
 
   def get_state(self, index: int = -1) -> np.ndarray:
-    if index < 0:
-      index = self.iterations-1
-
-    return self.states[index]
+    if index == -1:
+      return self._state.copy()
+    return np.array(self.telemetry.get("state", index), dtype=np.float64) #type: ignore
+
+  @property
+  def states(self) -> np.ndarray:
+    return self.telemetry.column("state") #type: ignore
+
+  @property
+  def controls(self) -> np.ndarray:
+    return self.telemetry.column("control") #type: ignore
+
+  @property
+  def constraint_states(self) -> np.ndarray:
+    return self.telemetry.column("constraint_state") #type: ignore
+
+  @property
+  def times(self) -> np.ndarray:
+    return self.telemetry.column("time")[:,0] #type: ignore
+
+  def _telemetry_run_path(self) -> str | None:
+    # Every reset records into its own run directory, so earlier runs are never overwritten
+    if self.telemetry_path is None:
+      return None
+    os.makedirs(self.telemetry_path, exist_ok=True)
+    runs = [int(name[4:]) for name in os.listdir(self.telemetry_path) if name.startswith("run_") and name[4:].isdigit()]
+    return f"{self.telemetry_path}/run_{max(runs, default=-1)+1:06d}"
+
+  def close_telemetry(self):
+    # Writes the rows still held in memory and the final row count of an on disk run
+    if self.telemetry is not None:
+      self.telemetry.close()
 
   def reset(self, initial_state: np.ndarray | None = None) -> tuple[np.ndarray, dict]:
+    return self._reset(initial_state, self._telemetry_run_path())
+
+  def _reset(self, initial_state: np.ndarray | None, telemetry_path: str | None) -> tuple[np.ndarray, dict]:
     self.close()
 
-    self.states = []
-    self.controls = []
-    self.constraint_states = []
-    self.times = []
+    self.close_telemetry()
+    self.telemetry = TelemetryRecorder(
+      {
+        "state": self.system.num_states, 
+        "control": self.system.num_controls, 
+        "constraint_state": self.system.num_constraint_states, 
+        "time": 1
+      },
+      self.telemetry_chunk_size,
+      self.telemetry_dtype,
+      telemetry_path
+    )
+    self.time = 0.0
     self.iterations = 0
 
     if initial_state is None:
@@ -71,19 +145,30 @@ class CartPoleEnv(Env):
       for i in range(self.system.num_poles):
         initial_state[2+i*2] = radians(uniform(-50, 50))
 
-    self.states.append(initial_state)
-    self.controls.append(np.zeros(self.system.num_controls))
-    self.constraint_states.append(self.system.constraint_states(initial_state, np.zeros(self.system.num_controls)))
-    self.times.append(0)
+    # The live state is always float64, the telemetry only records copies in telemetry_dtype
+    self._state = np.array(initial_state, dtype=np.float64)
+    self.telemetry.append(
+      self._state, 
+      np.zeros(self.system.num_controls), 
+      self.system.constraint_states(initial_state, np.zeros(self.system.num_controls)), 
+      self.time
+    )
     self.iterations += 1
 
     return self.get_state(), {"Msg": "Reset env"}
 
   def step(self, action: np.ndarray, creative_mode_state: np.ndarray | None = None, creative_mode_dt: float | None = None) -> tuple[np.ndarray, float, bool, dict, bool]:
+    start = self.probes.start()
     reward = 0
 
-    if creative_mode_state is None:
-      last_state = self.get_state()
+    if creative_mode_state is None and isinstance(self.integration_method, CompiledStep):
+      self._step_state[:] = self._state
+      self._step_action[:] = action
+      self._step_eval()
+      state, _, constraint_state, clipped_action = [result.copy() for result in self._step_results]
+      dt = self.dt_sim
+    elif creative_mode_state is None:
+      last_state = self._state
       _, clipped_action = self.system.clip(last_state, action)
       raw_state, d_state = self.integration_method(self.dt_sim, self.system.differentiate, last_state, clipped_action)
       state, _ = self.system.clip(raw_state, clipped_action)
@@ -132,45 +217,70 @@ class CartPoleEnv(Env):
 
     done = won or lost or done
 
-    self.states.append(state)
-    self.controls.append(clipped_action)
-    self.constraint_states.append(constraint_state)
-    self.times.append(self.times[-1] + dt)
+    self.time += dt
+    self._state = np.array(state, dtype=np.float64)
+    self.telemetry.append(state, clipped_action, constraint_state, self.time) #type: ignore
     self.iterations += 1
+    self.probes.record("env.step", start)
     
     return state, reward, done, {"won": won, "lost": lost}, False
 
   def si_to_pixels(self, x: float):
     return int(x * 500)
 
-  def render(self, *states):
-    if not self.screen:
-      pygame.init()
+  def _init_render(self):
+    pygame.init()
+
+    self.screen = pygame.display.set_mode(self.size)
+    self.font = pygame.font.Font('freesansbold.ttf', 20)
+    self.start_time = perf_counter()
+    self.i = 0
+    self._glyphs: dict[str, pygame.surface.Surface] = {}
+
+    max_x = self.width//2 + self.si_to_pixels(self.system.state_upper_bound[0])
+    min_x = self.width//2 + self.si_to_pixels(self.system.state_lower_bound[0])
+    y0 = self.height//2
+    self._min_x = min_x
 
-      self.screen = pygame.display.set_mode(self.size)
-      self.font = pygame.font.Font('freesansbold.ttf', 20)
-      self.start_time = perf_counter()
-      self.i = 0
+    # The track and end stops never move, so their geometry is computed once
+    self._static_rects = [
+      (Colors.black, pygame.Rect(min_x, y0+4, max_x+20-(min_x-10), 2)),
+      (Colors.red, pygame.Rect(min_x-10, y0, 10, 10)),
+      (Colors.red, pygame.Rect(max_x+20, y0, 10, 10)),
+    ]
+
+  def _glyph(self, text: str) -> pygame.surface.Surface:
+    glyph = self._glyphs.get(text)
+    if glyph is None:
+      glyph = self.font.render(text, True, Colors.black, Colors.light_gray).convert()
+      self._glyphs[text] = glyph
+    return glyph
+
+  def _draw_text(self, label: str, value: str, x: int, y: int):
+    # Labels are cached whole, changing values are assembled from cached character glyphs
+    glyph = self._glyph(label)
+    self.screen.blit(glyph, (x, y)) #type: ignore
+    x += glyph.get_width()
+    for char in value:
+      glyph = self._glyph(char)
+      self.screen.blit(glyph, (x, y)) #type: ignore
+      x += glyph.get_width()
+
+  def render(self, *states, time: float = 0.0):
+    start = self.probes.start()
+    if not self.screen:
+      self._init_render()
 
     for event in pygame.event.get():
       if event.type == pygame.QUIT: 
         self.close()
+        return
 
-    background_color = Colors.light_gray
-    self.screen.fill(background_color)
-    
-    if not states:
-      states = tuple([self.get_state()])
-
-    max_x = self.width//2 + self.si_to_pixels(self.system.state_upper_bound[0])
-    min_x = self.width//2 + self.si_to_pixels(self.system.state_lower_bound[0])
-    y0 = self.height//2
+    self.screen.fill(Colors.light_gray) #type: ignore
+    for color, rect in self._static_rects:
+      self.screen.fill(color, rect) #type: ignore
 
-    # Track
-    pygame.draw.rect(self.screen, Colors.black, (min_x, y0+4, max_x+20-(min_x-10), 2))
-    # End stops
-    pygame.draw.rect(self.screen, Colors.red, (min_x-10, y0, 10, 10))
-    pygame.draw.rect(self.screen, Colors.red, (max_x+20, y0, 10, 10))
+    min_x = self._min_x
 
     cart_colors = [Colors.red, Colors.magenta]
     pole_colors = [
@@ -179,7 +289,7 @@ class CartPoleEnv(Env):
     ]
 
     texts = [
-      f"Time: {round(self.i*self.dt_sim,2)} s"
+      ("Time: ", f"{round(time,2)} s")
     ]
 
     for j, (state, cart_color, pole_colors) in enumerate(zip(states, cart_colors, pole_colors)):
@@ -191,14 +301,14 @@ class CartPoleEnv(Env):
       y0 = self.height//2
 
       # Cart
-      pygame.draw.rect(self.screen, cart_color, (x0, y0, 20, 10))
+      pygame.draw.rect(self.screen, cart_color, (x0, y0, 20, 10)) #type: ignore
 
       motor_x0 = min_x-100
       theta_m = x/self.system.motor.r
       motor_sin = self.si_to_pixels(sin(-theta_m)*0.05)
       motor_cos = self.si_to_pixels(cos(-theta_m)*0.05)
 
-      pygame.draw.polygon(self.screen, Colors.black, [
+      pygame.draw.polygon(self.screen, Colors.black, [ #type: ignore
         (motor_x0+motor_sin, y0+motor_cos),
         (motor_x0+motor_cos, y0-motor_sin),
         (motor_x0-motor_sin, y0-motor_cos),
@@ -210,30 +320,29 @@ class CartPoleEnv(Env):
         l = pole.l
         x1 = x0 + self.si_to_pixels(l * sin(theta))
         y1 = y0 + self.si_to_pixels(-l * cos(theta))
-        pygame.draw.line(self.screen, color, (x0+i, y0), (x1+i, y1), 10)
+        pygame.draw.line(self.screen, color, (x0+i, y0), (x1+i, y1), 10) #type: ignore
         x0 = x1
         y0 = y1
   
       texts.extend([
-        "",
-        f"Cart {j+1}:",
-        f"Position: {round(state[0],2)} m",
-        f"Velocity: {round(state[1],2)} m/s",
+        ("", ""),
+        (f"Cart {j+1}:", ""),
+        ("Position: ", f"{round(state[0],2)} m"),
+        ("Velocity: ", f"{round(state[1],2)} m/s"),
       ])
 
       for k, (theta, d_theta) in enumerate(zip(thetas, d_thetas)):
         texts.extend([
-          f"Pole {k+1} angle: {round(theta,2)} rad",
-          f"Pole {k+1} angular velocity: {round(d_theta,2)} rad/s",
+          (f"Pole {k+1} angle: ", f"{round(theta,2)} rad"),
+          (f"Pole {k+1} angular velocity: ", f"{round(d_theta,2)} rad/s"),
         ])
     
-    for k, text_k in enumerate(texts):
-      text = self.font.render(text_k, True, Colors.black, background_color)
-      text_rect = text.get_rect()
-      self.screen.blit(text,(0,20*k,text_rect.width,text_rect.height))
+    for k, (label, value) in enumerate(texts):
+      self._draw_text(label, value, 0, 20*k)
 
     pygame.display.flip()
     self.i += 1
+    self.probes.record("env.render", start)
     
   def close(self):
     pygame.quit()
@@ -241,10 +350,10 @@ class CartPoleEnv(Env):
 
   def export(self) -> pd.DataFrame:
     data = {}
-    states = np.array(self.states)
-    controls = np.array(self.controls)
-    constraint_states = np.array(self.constraint_states)
-    times = np.array(self.times)
+    states = self.states
+    controls = self.controls
+    constraint_states = self.constraint_states
+    times = self.times
     data["s"] = states[:,0]
     data["d_s"] = states[:,1]
     for i in range(self.system.num_poles):
@@ -9,13 +9,18 @@ from multiprocessing import Process
 from .cartpoleenv import CartPoleEnv
 from .cartpolesystem import CartPoleSystem
 from .numerical import rk4_step
+from .probes import Probes, probes as default_probes
+from .renderer import CartPoleRenderer
+from .scheduler import RealTimeScheduler, TimingHistogram
+from .serial_framing import SerialFrameReader
 import pandas as pd
 
 class CartPoleSimulator(ABC):
-    def __init__(self, dt: float, system: CartPoleSystem, get_control: Callable[[np.ndarray], np.ndarray] | None = None):
+    def __init__(self, dt: float, system: CartPoleSystem, get_control: Callable[[np.ndarray], np.ndarray] | None = None, probes: Probes | None = None):
         self._system = system
         self._dt = dt
         self.get_control = get_control
+        self.probes = default_probes if probes is None else probes
 
     @property
     @abstractmethod
@@ -56,15 +61,19 @@ class CartPoleSimulator(ABC):
         ...
 
 class CartPoleSerialSimulator(CartPoleSimulator):
-    def __init__(self, dt: float, system: CartPoleSystem, get_control: Callable[[np.ndarray],np.ndarray] | None = None):
-        super().__init__(dt, system, get_control)
-        env = CartPoleEnv(system, dt, rk4_step)
+    def __init__(self, dt: float, system: CartPoleSystem, get_control: Callable[[np.ndarray],np.ndarray] | None = None, render_fps: float = 60, probes: Probes | None = None):
+        super().__init__(dt, system, get_control, probes)
+        env = CartPoleEnv(system, dt, rk4_step, probes=self.probes)
         self._env = env
         self._running = False
         self._render_enabled = True
+        self._renderer = CartPoleRenderer(env, render_fps)
         self._run_process = Thread(target=self.run_loop, daemon=True)
         self._state = np.zeros(system.num_states, dtype=np.float64)
         self._control = np.zeros(system.num_controls, dtype=np.float64)
+        self._reader: SerialFrameReader | None = None
+        # Time from receiving a state frame to writing the control back
+        self._round_trip = TimingHistogram(dt)
 
     @property
     def dt(self):
@@ -96,6 +105,8 @@ class CartPoleSerialSimulator(CartPoleSimulator):
     def stop(self):
         self._running = False
         self._run_process.join()
+        self._renderer.stop()
+        self._env.close_telemetry()
 
     def run_loop(self):
         if self.get_control is None:
@@ -104,45 +115,63 @@ class CartPoleSerialSimulator(CartPoleSimulator):
         last_update = perf_counter()
         counter = 0
         with Serial(self._port, self._baudrate, timeout=self._timeout) as ser:
+            reader = SerialFrameReader(ser, b"xst", self._state.nbytes)
+            self._reader = reader
+            if self._render_enabled:
+                self._renderer.start()
+            probes = self.probes
             while ser.is_open and self._running:
-                if ser.in_waiting == 0:
+                # Blocks until a full frame arrived or the port timed out
+                start = probes.start()
+                if not reader.read_frame(self._state):
                     continue
+                received = perf_counter()
+                probes.record("serial.read_frame", start)
 
-                ser.read_until(b"xst")
-                state_bytes = ser.read(self._state.nbytes)
-                state = np.frombuffer(state_bytes, dtype=self._state.dtype)
-                self._state = np.array(state, dtype=self._state.dtype)
-
-                # print("State bytes:", state_bytes)
-                # print("Num of bytes:", len(state_bytes))
-                # print("State:", state)
-                # print("_State:", self._state)
-
+                start = probes.start()
                 self._control = self.get_control(self._state)
+                probes.record("serial.get_control", start)
 
-                ser.write(self._control.tobytes())
-                dt = perf_counter() - last_update
+                start = probes.start()
+                ser.write(memoryview(self._control))
+                self._round_trip.add(perf_counter() - received)
+                probes.record("serial.write", start)
+
+                dt = received - last_update
                 self._env.step(self._control, self._state, dt)
-                last_update = perf_counter()
+                last_update = received
 
                 counter += 1
 
                 if self._render_enabled:
-                    self._env.render()
+                    self._renderer.publish(self._state, time=self._env.time)
     
+    @property
+    def round_trip(self) -> TimingHistogram:
+        return self._round_trip
+
+    def serial_stats(self) -> dict[str, int]:
+        if self._reader is None:
+            return {}
+        return self._reader.stats()
+
     def export(self):
         return self._env.export()
 
 class CartPoleEnvSimulator(CartPoleSimulator):
-    def __init__(self, dt: float, system: CartPoleSystem, get_control: Callable[[np.ndarray],np.ndarray] | None = None, max_time: float = 60*10):
-        super().__init__(dt, system, get_control)
-        env = CartPoleEnv(system, dt, rk4_step)
+    def __init__(self, dt: float, system: CartPoleSystem, get_control: Callable[[np.ndarray],np.ndarray] | None = None, max_time: float = 60*10, scheduler: RealTimeScheduler | None = None, render_fps: float = 60, probes: Probes | None = None):
+        super().__init__(dt, system, get_control, probes)
+        if scheduler is None:
+            scheduler = RealTimeScheduler(dt)
+        self._scheduler = scheduler
+        env = CartPoleEnv(system, dt, rk4_step, probes=self.probes)
         self._env = env
         self._system = env.system
         self._max_time = max_time
         self._N_max = int(max_time/env.dt_sim)
         self._running = False
         self._render_enabled = True
+        self._renderer = CartPoleRenderer(env, render_fps)
         self._run_process = Thread(target=self.run_loop, daemon=True)
 
     @property
@@ -156,6 +185,10 @@ class CartPoleEnvSimulator(CartPoleSimulator):
     @property
     def state(self) -> np.ndarray:
         return self._env.get_state()
+
+    @property
+    def scheduler(self) -> RealTimeScheduler:
+        return self._scheduler
     
     @property
     def system(self) -> CartPoleSystem:
@@ -172,34 +205,39 @@ class CartPoleEnvSimulator(CartPoleSimulator):
     def stop(self):
         self._running = False
         self._run_process.join()
+        self._renderer.stop()
+        self._env.close_telemetry()
 
     def run_loop(self):
         initial_state = np.array([0,0] + [radians(180), 0] * self._system.num_poles)
         state, _ = self._env.reset(initial_state)
         if self._render_enabled:
-            self._env.render()
+            self._renderer.start(state)
 
         self._running = True
         self.step = 0
-        last_update = perf_counter()
+        self._scheduler.start()
 
+        probes = self.probes
         while self._running: 
             state = self._env.get_state()
+            time = self._env.time
             self.step += 1
             if self.get_control is None:
                 raise ValueError("No control function provided")
+            start = probes.start()
             control = self.get_control(state)
+            probes.record("simulator.get_control", start)
 
             self._env.step(control)
             if self._render_enabled:
-                self._env.render(state)
+                self._renderer.publish(state, time=time)
 
             if self.step >= self._N_max:
                 self._running = False
-            while perf_counter() - last_update < self._dt:
-                pass
-
-            last_update = (perf_counter() // self._dt) * self._dt
+            start = probes.start()
+            self._scheduler.wait()
+            probes.record("simulator.wait", start)
 
     def export(self):
         return self._env.export()
\ No newline at end of file
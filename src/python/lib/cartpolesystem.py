@@ -2,13 +2,18 @@ from __future__ import annotations
 import os
 import numpy as np
 import casadi as ca
-import sympy as sp 
-import sympy.physics.mechanics as me
-from .utils import sympy2casadi
+from typing import Callable
+from .utils import compile_functions
 
 HASH_MOD = 31
 HASH_MAX = 2**32-1
 
+CA_FUNCTION_NAMES = ["differentiate", "constraint_states", "linearize", "differentiate_vec", "constraint_states_vec"]
+# Handed to the optimizer and to symbolic integrators, so they are never loaded as externals, which have no derivatives
+CA_DIFFERENTIABLE_FUNCTION_NAMES = ["differentiate", "differentiate_vec"]
+
+DYNAMICS_ENGINES = ["symbolic", "articulated"]
+
 class StepperMotor:
     def __init__(
         self, 
@@ -105,12 +110,16 @@ class CartPoleSystem:
         motor: StepperMotor,
         poles: list[Pole],
         g: float,
-        set_equations: bool = True
+        set_equations: bool = True,
+        engine: str = "symbolic"
     ):
+        if engine not in DYNAMICS_ENGINES:
+            raise ValueError(f"Unknown dynamics engine {engine}, expected one of {DYNAMICS_ENGINES}")
         self.cart = cart
         self.motor = motor
         self.poles = poles
         self.g = g
+        self.engine = engine
         self.num_poles = len(poles)
         self.num_states = 2+self.num_poles*2
         self.num_controls = 1
@@ -138,8 +147,11 @@ class CartPoleSystem:
         if set_equations:
             self.set_equations()
     
-    def set_equations(self):
-        self.set_sp_equations()
+    def set_equations(self, path: str | None = None):
+        if self.engine == "articulated":
+            self.set_articulated_equations()
+            return
+        self.set_sp_equations(path)
         self.set_ca_equations()
 
     def constraint_states(self, state: np.ndarray, control: np.ndarray) -> np.ndarray:
@@ -197,67 +209,22 @@ class CartPoleSystem:
 
         return error
 
-    def set_sp_equations(self):
-        s = me.dynamicsymbols("s")
-        d_s = sp.diff(s)
-        dd_s = sp.diff(d_s)
-        thetas = [me.dynamicsymbols(f"theta{i+1}") for i in range(self.num_poles)]      #type: ignore
-        d_thetas = [sp.diff(theta) for theta in thetas]
-        dd_thetas = [sp.diff(d_theta) for d_theta in d_thetas]
-        tau = sp.symbols("tau")
-
-        pole_pc1s = []
-        pole_pc2s = []
-        for i, (theta, a) in enumerate(zip(thetas, self.pole_as)):
-            prev_1 = 0
-            prev_2 = 0
-            for prev_l, prev_theta in list(zip(self.pole_ls, thetas))[:i]:
-                prev_1 += -prev_l*sp.sin(-prev_theta)       #type: ignore
-                prev_2 += prev_l*sp.cos(-prev_theta)        #type: ignore
-            pole_pc1s.append(s-a*sp.sin(-theta)+prev_1)     #type: ignore
-            pole_pc2s.append(a*sp.cos(-theta)+prev_2)       #type: ignore
-
-        T = 1/2*self.m_c*d_s**2         #type: ignore
-        for m, pc1, pc2, J, d_theta in zip(self.pole_ms, pole_pc1s, pole_pc2s, self.pole_Js, d_thetas):
-            d_pc1 = sp.diff(pc1)
-            d_pc2 = sp.diff(pc2)
-            T += 1/2*m*(d_pc1**2 + d_pc2**2) + 1/2*J*d_theta**2     #type: ignore
-            
-        V = 0   
-        for m, pc2 in zip(self.pole_ms, pole_pc2s):
-            V += self.g*m*pc2
-
-        R = 0
-        prev_w = 0
-        for d, d_theta in zip(self.pole_ds, d_thetas):
-            R += 1/2*d*(d_theta-prev_w)**2     #type: ignore
-            prev_w = d_theta
-
-        eqs = []
-        L = T-V
-        lh = sp.diff(sp.diff(L, d_s)) - sp.diff(L, s) + sp.diff(R, d_s)     #type: ignore
-        rh = tau
-        eqs = [lh-rh]
-        for theta, d_theta in zip(thetas, d_thetas):
-            L = T-V
-            lh = sp.diff(sp.diff(L, d_theta)) - sp.diff(L, theta) + sp.diff(R, d_theta)     #type: ignore
-            rh = 0
-            eqs.append(lh-rh)
-
-        sp_vars = [s, d_s] + [item for pair in zip(thetas, d_thetas) for item in pair] + [dd_s] + dd_thetas
-        sols = sp.solve(eqs, dd_thetas+[tau])
-        sp_sols = [sp.simplify(sols[dd_theta]) for dd_theta in dd_thetas] + [sp.simplify(sols[tau])]
-    
-        pure_s, pure_d_s, pure_dd_s = sp.symbols("s d_s dd_s")
-        pure_thetas = [sp.symbols(f"theta{i+1}") for i in range(self.num_poles)]        #type: ignore
-        pure_d_thetas = [sp.symbols(f"d_theta{i+1}") for i in range(self.num_poles)]    #type: ignore
-        pure_dd_thetas = [sp.symbols(f"dd_theta{i+1}") for i in range(self.num_poles)]  #type: ignore
-
-        self.sp_vars = [pure_s, pure_d_s] + [item for pair in zip(pure_thetas, pure_d_thetas) for item in pair] + [pure_dd_s] + pure_dd_thetas
-        subs_dict = dict(zip(sp_vars, self.sp_vars))
-        self.sp_sols = [sol.subs(subs_dict) for sol in sp_sols]
+    def set_sp_equations(self, path: str | None = None):
+        import sympy as sp
+        from .symbolic import load_parametric_equations
+
+        sp_vars, sp_params, sp_sols = load_parametric_equations(self.num_poles, path)
+
+        values = [self.m_c, self.g] + [float(value) for value in np.concatenate((self.pole_ms, self.pole_ls, self.pole_as, self.pole_ds, self.pole_Js))]
+        subs_dict = {param: sp.Float(value) for param, value in zip(sp_params, values)}
+
+        self.sp_vars = sp_vars
+        self.sp_sols = [sol.xreplace(subs_dict) for sol in sp_sols]
     
     def set_ca_equations(self):
+        import sympy as sp
+        from .utils import sympy2casadi
+
         s = ca.SX.sym("s") #type: ignore
         d_s = ca.SX.sym("d_s") #type: ignore
         dd_s = ca.SX.sym("dd_s") #type: ignore
@@ -274,7 +241,34 @@ class CartPoleSystem:
             dd_theta = sympy2casadi(sol, sp.Matrix(self.sp_vars[:2+2*self.num_poles+1]), ca.vertcat(*self.ca_vars[:2+2*self.num_poles+1]))
             self.ca_vars.append(dd_theta)
             self.ca_d_state_vars.extend([d_theta, dd_theta])
-            
+
+        self._set_ca_functions()
+
+    def set_articulated_equations(self):
+        from .articulated import articulated_body_dynamics
+
+        s = ca.SX.sym("s") #type: ignore
+        d_s = ca.SX.sym("d_s") #type: ignore
+        dd_s = ca.SX.sym("dd_s") #type: ignore
+        thetas = [ca.SX.sym(f"theta{i+1}") for i in range(self.num_poles)]          #type: ignore
+        d_thetas = [ca.SX.sym(f"d_theta{i+1}") for i in range(self.num_poles)]      #type: ignore
+
+        self.ca_vars = [s, d_s] + [item for pair in zip(thetas, d_thetas) for item in pair] + [dd_s]
+        self.ca_state_vars = [s, d_s] + [item for pair in zip(thetas, d_thetas) for item in pair]
+        self.ca_control_vars = [dd_s]
+
+        # Numeric recursion over the chain, linear in the number of poles and without a symbolic derivation
+        dd_thetas, tau = articulated_body_dynamics(
+            self.ca_state_vars, dd_s, self.g, self.m_c, self.pole_ms, self.pole_ls, self.pole_as, self.pole_ds, self.pole_Js
+        )
+        self.ca_constraint_vars = [tau]
+        self.ca_vars.extend(dd_thetas)
+        self.ca_d_state_vars = [d_s, dd_s] + [item for pair in zip(d_thetas, dd_thetas) for item in pair]
+
+        self._set_ca_functions()
+
+    def _set_ca_functions(self):
+        dd_s = self.ca_control_vars[0]
         self.ca_differentiate = ca.Function("differentiate", self.ca_state_vars + [dd_s], self.ca_d_state_vars)
         self.ca_constraint_states = ca.Function("constraint_states", self.ca_state_vars + [dd_s], self.ca_constraint_vars)     
 
@@ -282,27 +276,91 @@ class CartPoleSystem:
         eqs = ca.vertcat(*self.ca_d_state_vars)
         self.F = ca.jacobian(eqs, vars)
 
+        state = ca.vertcat(*self.ca_state_vars)
+        control = ca.vertcat(*self.ca_control_vars)
+        self.ca_linearize = ca.Function("linearize", [state, control], [self.F[:,:self.num_states], self.F[:,self.num_states:]], ["state", "control"], ["A", "B"])
+        self.ca_differentiate_vec = ca.Function("differentiate_vec", [state, control], [eqs], ["state", "control"], ["d_state"])
+        self.ca_constraint_states_vec = ca.Function("constraint_states_vec", [state, control], [ca.vertcat(*self.ca_constraint_vars)*self.motor.r], ["state", "control"], ["constraint_state"])
+        self._ca_maps = {}
+
+    @property
+    def ca_functions(self) -> list[ca.Function]:
+        return [
+            self.ca_differentiate, 
+            self.ca_constraint_states, 
+            self.ca_linearize, 
+            self.ca_differentiate_vec, 
+            self.ca_constraint_states_vec
+        ]
+
+    def _map(self, function: ca.Function, N: int) -> ca.Function:
+        key = (function.name(), N)
+        if key not in self._ca_maps:
+            self._ca_maps[key] = function.map(N)
+        return self._ca_maps[key]
+
+    def make_step_function(self, dt: float, integration_method: Callable, substeps: int = 1) -> ca.Function:
+        differentiate = self.ca_differentiate_vec
+        sym = ca.SX if differentiate.is_a("SXFunction") else ca.MX
+        state = sym.sym("state", self.num_states) #type: ignore
+        action = sym.sym("action", self.num_controls) #type: ignore
+
+        # Same clipping as clip(), so one call covers a whole CartPoleEnv step
+        f_max = self.motor.torque_bounds[1]/self.motor.r
+        f_min = self.motor.torque_bounds[0]/self.motor.r
+        control = ca.fmin(ca.fmax(action, f_min/self.m_c), f_max/self.m_c)
+
+        next_state = state
+        for _ in range(substeps):
+            next_state, _ = integration_method(dt/substeps, differentiate, next_state, control)
+        d_state = (next_state-state)/dt
+
+        clipped = [ca.fmin(ca.fmax(next_state[i], self.state_lower_bound[i]), self.state_upper_bound[i]) for i in range(2)]
+        for i in range(self.num_poles):
+            theta = next_state[2+2*i]
+            clipped.extend([theta-2*np.pi*ca.floor((theta+np.pi)/(2*np.pi)), next_state[3+2*i]])
+        clipped_state = ca.vertcat(*clipped)
+        constraint_state = self.ca_constraint_states_vec(clipped_state, action)
+
+        return ca.Function(
+            f"step_{integration_method.__name__}_{substeps}", 
+            [state, action], 
+            [clipped_state, d_state, constraint_state, control], 
+            ["state", "action"], 
+            ["next_state", "d_state", "constraint_state", "control"]
+        )
+
     def linearize(self, state0: np.ndarray, control0: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
-        vals = ca.vertcat(*state0, *control0)
-        vars = ca.vertcat(*(self.ca_state_vars + self.ca_control_vars))
-        F_eval = ca.substitute(self.F, vars, vals)
-        F_eval_np = np.array(ca.DM(F_eval))
-        A = np.array(F_eval_np[:,:-1]).astype(np.float64)
-        B = np.vstack(np.array(F_eval_np[:,-1]).astype(np.float64))     #type: ignore
-        return A, B
+        A, B = self.ca_linearize(state0, control0)
+        return np.array(A, dtype=np.float64), np.array(B, dtype=np.float64)
+
+    def linearize_many(self, states: np.ndarray, controls: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        N = states.shape[0]
+        As, Bs = self._map(self.ca_linearize, N)(states.T, controls.T)
+        As = np.array(As, dtype=np.float64).reshape(self.num_states, N, self.num_states).transpose(1, 0, 2)
+        Bs = np.array(Bs, dtype=np.float64).reshape(self.num_states, N, self.num_controls).transpose(1, 0, 2)
+        return As, Bs
     
     def differentiate(self, state: np.ndarray, control: np.ndarray) -> np.ndarray:
         values = np.concatenate((state, control))
         d_state = self.ca_differentiate(*values)
         return np.array(d_state).flatten().astype(np.float64)
 
+    def differentiate_many(self, states: np.ndarray, controls: np.ndarray) -> np.ndarray:
+        d_states = self._map(self.ca_differentiate_vec, states.shape[0])(states.T, controls.T)
+        return np.array(d_states, dtype=np.float64).T
+
+    def constraint_states_many(self, states: np.ndarray, controls: np.ndarray) -> np.ndarray:
+        c_states = self._map(self.ca_constraint_states_vec, states.shape[0])(states.T, controls.T)
+        return np.array(c_states, dtype=np.float64).T
+
     def linear_differentiate(self, state: np.ndarray, control: np.ndarray, state0: np.ndarray, control0: np.ndarray) -> np.ndarray:
         A, B = self.linearize(state0, control0)
         d_state = state @ A.T + control @ B.T
         return d_state.T
     
     def copy(self):
-        return CartPoleSystem(self.cart.copy(), self.motor.copy(), [pole.copy() for pole in self.poles], self.g)
+        return CartPoleSystem(self.cart.copy(), self.motor.copy(), [pole.copy() for pole in self.poles], self.g, engine=self.engine)
     
     def __hash__(self) -> int:
         value = HASH_MOD
@@ -311,6 +369,9 @@ class CartPoleSystem:
         for pole in self.poles:
             value = HASH_MOD*(hash(pole) + value)
         value = HASH_MOD*(hash(self.g) + value)
+        # Keeps the hashes, and so the cached files, of symbolic systems unchanged
+        if self.engine != "symbolic":
+            value = HASH_MOD*(hash(self.engine) + value)
         return value % HASH_MAX
     
     def export_equations(self, path: str):
@@ -331,6 +392,8 @@ class CartPoleSystem:
         return os.path.exists(f"{path}/vars_{hash(self)}.txt") and os.path.exists(f"{path}/sols_{hash(self)}.txt")
 
     def import_equations(self, path: str):
+        import sympy as sp
+
         with open(f"{path}/vars_{hash(self)}.txt", "r") as f:
             vars = f.read().split("\n")
         with open(f"{path}/sols_{hash(self)}.txt", "r") as f:
@@ -339,4 +402,25 @@ class CartPoleSystem:
         self.sp_vars = [sp.Symbol(var) for var in vars]
         self.sp_sols = [sp.sympify(sol) for sol in sols]
 
-        self.set_ca_equations()
\ No newline at end of file
+        self.set_ca_equations()
+
+    def export_functions(self, path: str, compile: bool = False, compiler: str = "gcc"):
+        for function in self.ca_functions:
+            function.save(f"{path}/{function.name()}_{hash(self)}.casadi")
+
+        if compile:
+            compile_functions(self.ca_functions, path, f"functions_{hash(self)}", compiler)
+
+    def check_functions(self, path: str) -> bool:
+        return all(os.path.exists(f"{path}/{name}_{hash(self)}.casadi") for name in CA_FUNCTION_NAMES)
+
+    def import_functions(self, path: str):
+        library = f"{path}/functions_{hash(self)}.so"
+        compiled = os.path.exists(library)
+        functions = [
+            ca.external(name, library) if compiled and name not in CA_DIFFERENTIABLE_FUNCTION_NAMES else ca.Function.load(f"{path}/{name}_{hash(self)}.casadi")
+            for name in CA_FUNCTION_NAMES
+        ]
+
+        self.ca_differentiate, self.ca_constraint_states, self.ca_linearize, self.ca_differentiate_vec, self.ca_constraint_states_vec = functions
+        self._ca_maps = {}
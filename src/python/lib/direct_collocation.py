@@ -1,8 +1,6 @@
 import numpy as np
 from scipy.interpolate import CubicSpline #type: ignore
-import sympy as sp
 import casadi as ca
-from .utils import sympy2casadi
 
 class CartPoleDirectCollocation():
     def __init__(
@@ -15,9 +13,9 @@ class CartPoleDirectCollocation():
         state_lower_bound: np.ndarray,
         state_upper_bound: np.ndarray,
         state_margin: np.ndarray,
-        sp_vars, 
-        sp_sols, 
-        tolerance=1e-6
+        ca_differentiate: ca.Function, 
+        tolerance=1e-6,
+        warm_start_tolerance=1e-2
     ):
         self.N = N
         self.N_collocation = N_collocation
@@ -29,47 +27,16 @@ class CartPoleDirectCollocation():
         self.state_lower_bound = state_lower_bound
         self.state_upper_bound = state_upper_bound
         self.state_margin = state_margin
-        self.sp_vars = sp_vars
-        self.sp_sols = sp_sols
-        self.set_ca_equations()
+        self.ca_differentiate = ca_differentiate
         self.tolerance = tolerance
+        self.warm_start_tolerance = warm_start_tolerance
 
-    def set_ca_equations(self):
-        s_mx = ca.MX.sym("s") #type: ignore
-        d_s_mx = ca.MX.sym("d_s") #type: ignore
-        dd_s_mx = ca.MX.sym("dd_s") #type: ignore
-        thetas_mx = [ca.MX.sym(f"theta{i+1}") for i in range(self.num_poles)] #type: ignore
-        d_thetas_mx = [ca.MX.sym(f"d_theta{i+1}") for i in range(self.num_poles)] #type: ignore
-
-        self.ca_vars_mx = [s_mx, d_s_mx] + [item for pair in zip(thetas_mx, d_thetas_mx) for item in pair] + [dd_s_mx]
-        self.ca_state_vars_mx = [s_mx, d_s_mx] + [item for pair in zip(thetas_mx, d_thetas_mx) for item in pair]
-        self.ca_control_vars_mx = [dd_s_mx]
-        self.ca_d_state_vars_mx = [d_s_mx, dd_s_mx]
-        self.ca_constraint_vars_mx = [sympy2casadi(self.sp_sols[-1], sp.Matrix(self.sp_vars[:2+2*self.num_poles+1]), ca.vertcat(*self.ca_vars_mx[:2+2*self.num_poles+1]))]
-
-        for d_theta_mx, sol in zip(d_thetas_mx, self.sp_sols[:-1]):
-            dd_theta_mx = sympy2casadi(sol, sp.Matrix(self.sp_vars[:2+2*self.num_poles+1]), ca.vertcat(*self.ca_vars_mx[:2+2*self.num_poles+1]))
-            self.ca_vars_mx.append(dd_theta_mx)
-            self.ca_d_state_vars_mx.extend([d_theta_mx, dd_theta_mx])
+        x = ca.MX.sym("x", self.N_states) #type: ignore
+        u = ca.MX.sym("u", self.N_controls) #type: ignore
+        self.ca_dynamics = ca.Function("dynamics", [x, u], [ca.vertcat(*self.differentiate(x, u))])
 
     def differentiate(self, x, u):
-        d_s = x[1]
-        dd_s = u[0]
-        d_state = [d_s, dd_s]        
-
-        exprs = self.ca_d_state_vars_mx[3::2]
-        orig_vars = self.ca_state_vars_mx + self.ca_control_vars_mx
-
-        new_vars = []
-        for i in range(2+2*self.num_poles):
-            new_vars.append(x[i])
-        new_vars.append(u[0])
-
-        dd_thetas = ca.substitute(exprs, orig_vars, new_vars)
-        for i, dd_theta in enumerate(dd_thetas):
-            d_state.extend([x[3+2*i], dd_theta])
-
-        return d_state
+        return list(self.ca_differentiate(*[x[i] for i in range(self.N_states)], u[0]))
     
     def constraint_states(self, x, u):
         dd_s = u[0]
@@ -79,9 +46,6 @@ class CartPoleDirectCollocation():
         return np.array([torque])
 
     def make_guess(self, x0: np.ndarray, r: np.ndarray, x_guess: np.ndarray, u_guess: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
-        self.x0 = x0
-        self.r = r
-
         if x_guess.size == 0 or u_guess.size == 0:
             x_guess = np.linspace(x0, r, self.N_collocation)
             u_guess = np.zeros((self.N_collocation, self.N_controls))
@@ -93,10 +57,12 @@ class CartPoleDirectCollocation():
 
         return x_guess, u_guess
 
+    def make_warm_start(self):
+        self.opti.set_initial(self.solution.value_variables())
+        self.opti.set_initial(self.opti.lam_g, self.solution.value(self.opti.lam_g))
+
     def set_objective_function(self):
-        obj = 0
-        for i in range(self.N_collocation-1):
-            obj += (self.us[i,0]**2+self.us[i+1,0]**2)*self.h/2
+        obj = (ca.sumsqr(self.us[:-1,0])+ca.sumsqr(self.us[1:,0]))*self.h/2
         self.opti.minimize(obj)
 
     def set_eq_constraints(self):
@@ -114,58 +80,76 @@ class CartPoleDirectCollocation():
                 self.opti.subject_to(self.xs[-1,i+2] == self.r[i+2])
 
     def set_ineq_constraints(self):
-        for i in range(self.N_collocation):
-            s = self.xs[i,0]
-            last_s = self.xs[i-1,0]
-            d_s = self.xs[i,1]
-            last_d_s = self.xs[i-1,1]
-            dd_s = self.us[i,0]
-            last_dd_s = self.us[i-1,0]
-            self.opti.subject_to(self.opti.bounded(self.state_lower_bound[0]+self.state_margin[0],s,self.state_upper_bound[0]-self.state_margin[0]))
-            self.opti.subject_to(self.opti.bounded(self.state_lower_bound[1]+self.state_margin[1],d_s,self.state_upper_bound[1]-self.state_margin[1]))
-
-            d_x = self.differentiate(self.xs[i,:],self.us[i,:])
-            last_d_x = self.differentiate(self.xs[i-1,:],self.us[i-1,:])
-
-            if i > 0:
-                self.opti.subject_to((d_s+last_d_s)*self.h/2 == (s-last_s)) 
-                self.opti.subject_to((dd_s+last_dd_s)*self.h/2 == (d_s-last_d_s)) 
-
-                for j in range(self.num_poles):
-                    theta = self.xs[i,2+2*j]
-                    last_theta = self.xs[i-1,2+2*j]
-                    d_theta = self.xs[i,3+2*j]
-                    last_d_theta = self.xs[i-1,3+2*j]
-                    
-                    dd_theta = d_x[3+2*j]
-                    last_dd_theta = last_d_x[3+2*j]
-
-                    self.opti.subject_to((d_theta+last_d_theta)*self.h/2 == (theta-last_theta))
-                    self.opti.subject_to((dd_theta+last_dd_theta)*self.h/2 == (d_theta-last_d_theta))
-            
-            constraint_state = self.constraint_states(self.xs[i,:],self.us[i,:])
-            f = constraint_state[0]
-            torque = f*self.radius
-            # self.opti.subject_to(self.opti.bounded(self.system.motor.torque_bounds[0]*(1-self.system.motor.torque_margin),torque,self.system.motor.torque_bounds[1]*(1-self.system.motor.torque_margin))) #type: ignore
+        self.opti.subject_to(self.opti.bounded(self.state_lower_bound[0]+self.state_margin[0],self.xs[:,0],self.state_upper_bound[0]-self.state_margin[0]))
+        self.opti.subject_to(self.opti.bounded(self.state_lower_bound[1]+self.state_margin[1],self.xs[:,1],self.state_upper_bound[1]-self.state_margin[1]))
 
-    def make_solver(self, end_time: float, x0, r, x_guess = np.array([]), u_guess = np.array([])):
+        # Trapezoidal defects for every state and node at once, using the dynamics mapped over all nodes
+        xs = self.xs.T
+        d_xs = self.ca_dynamics.map(self.N_collocation)(xs, self.us.T)
+        self.opti.subject_to((d_xs[:,1:]+d_xs[:,:-1])*self.h/2 == (xs[:,1:]-xs[:,:-1]))
+
+        # self.opti.subject_to(self.opti.bounded(self.system.motor.torque_bounds[0]*(1-self.system.motor.torque_margin),torque,self.system.motor.torque_bounds[1]*(1-self.system.motor.torque_margin))) #type: ignore
+
+    def build(self, end_time: float):
         self.opti = ca.Opti()   
         self.xs = self.opti.variable(self.N_collocation,self.N_states)
         self.us = self.opti.variable(self.N_collocation,self.N_controls)
+        self.x0 = self.opti.parameter(self.N_states)
+        self.r = self.opti.parameter(self.N_states)
 
         self.h = end_time/self.N_collocation
         self.end_time = end_time
-    
-        self.x0 = x0
-        self.r = r
 
-        self.make_guess(x0, r, x_guess, u_guess)
         self.set_objective_function()
         self.set_eq_constraints()
         self.set_ineq_constraints()
 
         self.opti.solver("ipopt")
+        self.solution = None
+        self.warm_started = False
+        self.last_x0 = None
+        self.last_r = None
+
+    def can_warm_start(self, x0, r) -> bool:
+        # A previous solution is only a good initial point for a nearby problem,
+        # for a different start or target IPOPT takes far longer than from a cold guess
+        if self.solution is None or self.last_x0 is None or self.last_r is None:
+            return False
+        x0_error = np.asarray(x0)-self.last_x0
+        r_error = np.asarray(r)-self.last_r
+        x0_error[2::2] = np.arctan2(np.sin(x0_error[2::2]), np.cos(x0_error[2::2]))
+        r_error[2::2] = np.arctan2(np.sin(r_error[2::2]), np.cos(r_error[2::2]))
+        return bool(np.all(np.abs(x0_error) <= self.warm_start_tolerance) and np.all(np.abs(r_error) <= self.warm_start_tolerance))
+
+    def make_solver(self, end_time: float, x0, r, x_guess = np.array([]), u_guess = np.array([])):
+        if not hasattr(self, "opti") or self.end_time != end_time:
+            self.build(end_time)
+
+        self.opti.set_value(self.x0, x0)
+        self.opti.set_value(self.r, r)
+
+        if (x_guess.size == 0 or u_guess.size == 0) and self.can_warm_start(x0, r):
+            if not self.warm_started:
+                self.opti.solver("ipopt", {}, {
+                    "warm_start_init_point": "yes",
+                    "warm_start_bound_push": 1e-6,
+                    "warm_start_mult_bound_push": 1e-6,
+                    "mu_init": 1e-4
+                })
+                self.warm_started = True
+            self.make_warm_start()
+        else:
+            if self.warm_started:
+                self.opti.solver("ipopt")
+                self.warm_started = False
+            if self.solution is not None:
+                self.opti.set_initial(self.opti.lam_g, 0)
+            self.make_guess(x0, r, x_guess, u_guess)
+
         sol = self.opti.solve()
+        self.solution = sol
+        self.last_x0 = np.array(x0, dtype=np.float64)
+        self.last_r = np.array(r, dtype=np.float64)
 
         x_optimal_raw = sol.value(self.xs)
         u_optimal_raw = sol.value(self.us)
@@ -0,0 +1,69 @@
+from __future__ import annotations
+from itertools import product
+from threading import Lock, Thread
+import numpy as np
+from .cartpolesystem import CartPoleSystem
+from .regulators import LQR
+
+class GainSchedule:
+    def __init__(
+        self, 
+        system: CartPoleSystem, 
+        dt: float, 
+        Q: np.ndarray, 
+        R: np.ndarray, 
+        positions: np.ndarray | None = None
+    ):
+        self._system = system
+        self._dt = dt
+
+        if positions is None:
+            # The dynamics are invariant to the cart position, so the linearization and the gains are the same
+            # everywhere on the track and one operating point per pole configuration is enough
+            positions = np.zeros(1)
+        self._positions = np.asarray(positions, dtype=np.float64)
+
+        self._lock = Lock()
+        self._refresh_thread: Thread | None = None
+        self._table = self._build(Q.copy(), R.copy())
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self._positions
+
+    def _build(self, Q: np.ndarray, R: np.ndarray) -> dict[tuple[bool, ...], np.ndarray]:
+        table = {}
+        for pole_pos in product([False, True], repeat=self._system.num_poles):
+            pole_states = np.array([[0.0 if pos else np.pi, 0.0] for pos in pole_pos]).flatten()
+            states = np.array([[pos, 0] + pole_states.tolist() for pos in self._positions])
+
+            As, Bs = self._system.linearize_many(states, np.zeros((states.shape[0], self._system.num_controls)))
+            A_ds, B_ds = LQR.discretize_many(self._dt, As, Bs)
+            table[pole_pos] = np.array([LQR.calculate_K_d(A_d, B_d, Q, R)[1] for A_d, B_d in zip(A_ds, B_ds)])
+        return table
+
+    def lookup(self, pos: float, pole_pos: list[bool]) -> np.ndarray:
+        with self._lock:
+            K_ds = self._table[tuple(bool(p) for p in pole_pos)]
+
+        if K_ds.shape[0] == 1:
+            return K_ds[0]
+        # Linear interpolation of every gain between the two closest operating points
+        return np.apply_along_axis(lambda gains: np.interp(pos, self._positions, gains), 0, K_ds)
+
+    def refresh(self, Q: np.ndarray, R: np.ndarray, background: bool = True):
+        def rebuild(Q: np.ndarray, R: np.ndarray):
+            table = self._build(Q, R)
+            with self._lock:
+                self._table = table
+
+        if not background:
+            rebuild(Q.copy(), R.copy())
+            return
+
+        self._refresh_thread = Thread(target=rebuild, args=(Q.copy(), R.copy()), daemon=True)
+        self._refresh_thread.start()
+
+    @property
+    def refreshing(self) -> bool:
+        return self._refresh_thread is not None and self._refresh_thread.is_alive()
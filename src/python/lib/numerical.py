@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
+from __future__ import annotations
+import tempfile
 from typing import Callable
 import numpy as np
+import casadi as ca
+from .utils import compile_functions
 
 def fe_step(dt: float, differentiate: Callable[[np.ndarray, np.ndarray], np.ndarray], x0: np.ndarray, u: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
     d_x = differentiate(x0, u)
@@ -15,4 +19,158 @@ def rk4_step(dt: float, differentiate: Callable[[np.ndarray, np.ndarray], np.nda
 
     d_x = f1 + 2*f2 + 2*f3 + f4
     x = x0 + (dt/6) * d_x
-    return x, d_x
\ No newline at end of file
+    return x, d_x
+
+def _velocities_to_positions(d_x):
+    # States come in (position, velocity) pairs, so this moves every velocity entry onto its position entry
+    n = d_x.shape[0]
+    shift = np.zeros((n, n))
+    shift[np.arange(0, n, 2), np.arange(1, n, 2)] = 1
+    if isinstance(d_x, np.ndarray):
+        return shift @ d_x
+    return ca.mtimes(ca.DM(shift), d_x)
+
+def semi_implicit_euler_step(dt: float, differentiate: Callable[[np.ndarray, np.ndarray], np.ndarray], x0: np.ndarray, u: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    f = differentiate(x0, u)
+    d_x = f + dt * _velocities_to_positions(f)
+    x = x0 + dt * d_x
+    return x, d_x
+
+# Dormand-Prince 5(4) tableau with the 4th order continuous extension used for dense output
+DP_C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1, 1])
+DP_A = [
+    np.array([]),
+    np.array([1/5]),
+    np.array([3/40, 9/40]),
+    np.array([44/45, -56/15, 32/9]),
+    np.array([19372/6561, -25360/2187, 64448/6561, -212/729]),
+    np.array([9017/3168, -355/33, 46732/5247, 49/176, -5103/18656]),
+    np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84]),
+]
+DP_B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0])
+DP_E = np.array([-71/57600, 0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40])
+DP_P = np.array([
+    [1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+    [0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+    [0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+    [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+    [0, 40617522/29380423, -110615467/29380423, 69997945/29380423],
+])
+
+class DormandPrince:
+    def __init__(
+        self, 
+        rtol: float = 1e-6, 
+        atol: float = 1e-9, 
+        h_min: float = 1e-7, 
+        h_max: float = np.inf, 
+        max_steps: int = 10000
+    ):
+        self.rtol = rtol
+        self.atol = atol
+        self.h_min = h_min
+        self.h_max = h_max
+        self.max_steps = max_steps
+        # The accepted step size is carried over between calls, so calm phases keep large steps
+        self.h: float | None = None
+        self.num_steps = 0
+        self.num_rejected = 0
+        self.num_evaluations = 0
+
+    def _error_norm(self, error: np.ndarray, x0: np.ndarray, x1: np.ndarray) -> float:
+        scale = self.atol + self.rtol*np.maximum(np.abs(x0), np.abs(x1))
+        return float(np.sqrt(np.mean((error/scale)**2)))
+
+    def _initial_step(self, differentiate: Callable[[np.ndarray, np.ndarray], np.ndarray], x0: np.ndarray, u: np.ndarray, f0: np.ndarray, t_end: float) -> float:
+        scale = self.atol + self.rtol*np.abs(x0)
+        d0 = np.sqrt(np.mean((x0/scale)**2))
+        d1 = np.sqrt(np.mean((f0/scale)**2))
+        h0 = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else 0.01*d0/d1
+        h0 = min(h0, t_end)
+
+        f1 = differentiate(x0 + h0*f0, u)
+        self.num_evaluations += 1
+        d2 = np.sqrt(np.mean(((f1-f0)/scale)**2))/h0
+        h1 = max(1e-6, h0*1e-3) if max(d1, d2) <= 1e-15 else (0.01/max(d1, d2))**(1/5)
+        return min(100*h0, h1, t_end)
+
+    def integrate(self, differentiate: Callable[[np.ndarray, np.ndarray], np.ndarray], x0: np.ndarray, u: np.ndarray, t_end: float, t_eval: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        t = 0.0
+        x = np.asarray(x0, dtype=np.float64)
+        f = differentiate(x, u)
+        self.num_evaluations += 1
+
+        if t_eval is None:
+            t_eval = np.array([])
+        dense = np.zeros((len(t_eval), x.shape[0]))
+        eval_index = 0
+
+        h = self.h if self.h is not None else self._initial_step(differentiate, x, u, f, t_end)
+        K = np.zeros((7, x.shape[0]))
+        steps = 0
+        while t < t_end:
+            if steps >= self.max_steps:
+                raise RuntimeError(f"DormandPrince exceeded {self.max_steps} steps")
+            steps += 1
+
+            h = min(max(h, self.h_min), self.h_max)
+            last = t + h >= t_end
+            h_step = t_end - t if last else h
+
+            K[0] = f
+            for i in range(1, 7):
+                K[i] = differentiate(x + h_step*(DP_A[i] @ K[:i]), u)
+            self.num_evaluations += 6
+            x_new = x + h_step*(DP_B @ K)
+
+            error = self._error_norm(h_step*(DP_E @ K), x, x_new)
+            factor = 5.0 if error == 0 else min(5.0, max(0.2, 0.9*error**(-1/5)))
+            if error > 1 and h_step > self.h_min:
+                self.num_rejected += 1
+                h = h_step*factor
+                continue
+
+            while eval_index < len(t_eval) and t_eval[eval_index] <= t + h_step:
+                theta = (t_eval[eval_index]-t)/h_step
+                dense[eval_index] = x + h_step*((DP_P @ theta**np.arange(1, 5)) @ K)
+                eval_index += 1
+
+            self.num_steps += 1
+            t = t_end if last else t + h_step
+            x, f = x_new, K[6].copy()
+            # A step shortened to hit t_end says nothing about the step size the error allows
+            if not last or h_step >= h:
+                h = h_step*factor
+
+        self.h = h
+        return x, dense
+
+    def __call__(self, dt: float, differentiate: Callable[[np.ndarray, np.ndarray], np.ndarray], x0: np.ndarray, u: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        x, _ = self.integrate(differentiate, x0, u, dt)
+        return x, (x-x0)/dt
+
+class CompiledStep:
+    def __init__(
+        self, 
+        integration_method: Callable = rk4_step, 
+        substeps: int = 1, 
+        compile: bool = False, 
+        compiler: str = "gcc", 
+        path: str | None = None
+    ):
+        self.integration_method = integration_method
+        self.substeps = substeps
+        self.compile = compile
+        self.compiler = compiler
+        self.path = path
+
+    def build(self, system, dt: float) -> ca.Function:
+        step = system.make_step_function(dt, self.integration_method, self.substeps)
+        if not self.compile:
+            return step
+
+        path = tempfile.gettempdir() if self.path is None else self.path
+        name = f"{step.name()}_{hash(system)}_{int(round(dt*1e6))}"
+        return compile_functions([step], path, name, self.compiler)[0]
@@ -0,0 +1,126 @@
+from __future__ import annotations
+import os
+import json
+from threading import get_ident, Lock
+from time import perf_counter
+import numpy as np
+
+class Probe:
+    def __init__(self, name: str, capacity: int = 4096):
+        self.name = name
+        self._capacity = capacity
+        self._starts = np.zeros(capacity)
+        self._durations = np.zeros(capacity)
+        self._threads = np.zeros(capacity, dtype=np.int64)
+        self._index = 0
+        self._count = 0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def record(self, start: float, end: float):
+        i = self._index
+        self._starts[i] = start
+        self._durations[i] = end-start
+        self._threads[i] = get_ident()
+        self._index = (i+1) % self._capacity
+        self._count += 1
+
+    def _order(self) -> np.ndarray:
+        size = min(self._count, self._capacity)
+        if self._count <= self._capacity:
+            return np.arange(size)
+        return (np.arange(size)+self._index) % self._capacity
+
+    def durations(self) -> np.ndarray:
+        return self._durations[self._order()]
+
+    def percentile(self, q: float | list[float]) -> float | np.ndarray:
+        durations = self.durations()
+        if durations.size == 0:
+            return np.nan if np.isscalar(q) else np.full(len(q), np.nan) #type: ignore
+        return np.percentile(durations, q)
+
+    def stats(self, percentiles: tuple[float, ...] = (50, 90, 99)) -> dict[str, float]:
+        durations = self.durations()
+        stats = {"count": float(self._count)}
+        if durations.size == 0:
+            return stats
+        stats["mean"] = float(np.mean(durations))
+        stats["max"] = float(np.max(durations))
+        for q, value in zip(percentiles, np.percentile(durations, percentiles)):
+            stats[f"p{q:g}"] = float(value)
+        return stats
+
+    def events(self, epoch: float) -> list[dict]:
+        order = self._order()
+        return [
+            {
+                "name": self.name,
+                "ph": "X",
+                "ts": (self._starts[i]-epoch)*1e6,
+                "dur": self._durations[i]*1e6,
+                "pid": os.getpid(),
+                "tid": int(self._threads[i]),
+            }
+            for i in order
+        ]
+
+    def reset(self):
+        self._index = 0
+        self._count = 0
+
+class Probes:
+    def __init__(self, enabled: bool = False, capacity: int = 4096):
+        self.enabled = enabled
+        self._capacity = capacity
+        self._probes: dict[str, Probe] = {}
+        self._lock = Lock()
+        self._epoch = perf_counter()
+
+    def start(self) -> float:
+        return perf_counter() if self.enabled else 0.0
+
+    def record(self, name: str, start: float):
+        if not self.enabled:
+            return
+        probe = self._probes.get(name)
+        if probe is None:
+            probe = self.probe(name)
+        probe.record(start, perf_counter())
+
+    def probe(self, name: str) -> Probe:
+        with self._lock:
+            if name not in self._probes:
+                self._probes[name] = Probe(name, self._capacity)
+            return self._probes[name]
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._probes)
+
+    def percentiles(self, q: float | list[float] = [50, 90, 99]) -> dict[str, float | np.ndarray]:
+        return {name: probe.percentile(q) for name, probe in self._probes.items()}
+
+    def stats(self, percentiles: tuple[float, ...] = (50, 90, 99)) -> dict[str, dict[str, float]]:
+        return {name: probe.stats(percentiles) for name, probe in self._probes.items()}
+
+    def chrome_trace(self) -> dict:
+        events = []
+        for probe in list(self._probes.values()):
+            events.extend(probe.events(self._epoch))
+        events.sort(key=lambda event: event["ts"])
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump_chrome_trace(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def reset(self):
+        for probe in self._probes.values():
+            probe.reset()
+        self._epoch = perf_counter()
+
+# Shared by the controller, simulators and env unless they are given their own
+probes = Probes()
@@ -1,6 +1,6 @@
 import numpy as np
 from scipy.signal import cont2discrete
-from scipy.linalg import solve_continuous_are, solve_discrete_are
+from scipy.linalg import expm, solve_continuous_are, solve_discrete_are
 
 class FSFB:
     @staticmethod
@@ -10,6 +10,16 @@ class FSFB:
         B_d = np.array(dlti[1])
         return A_d, B_d
 
+    @staticmethod
+    def discretize_many(dt: float, As: np.ndarray, Bs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # Zero-order hold for every (A, B) pair at once: expm([[A, B], [0, 0]]*dt) = [[A_d, B_d], [0, I]]
+        N, n, m = Bs.shape
+        M = np.zeros((N, n+m, n+m))
+        M[:,:n,:n] = As*dt
+        M[:,:n,n:] = Bs*dt
+        M_d = expm(M)
+        return M_d[:,:n,:n], M_d[:,:n,n:]
+
 class LQR(FSFB):
     @staticmethod
     def calculate_K(A: np.ndarray, B: np.ndarray, Q: np.ndarray, R: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
@@ -34,9 +44,23 @@ class LQR(FSFB):
         P_ds = np.zeros((A_ds.shape[0], P_d_last.shape[0], P_d_last.shape[1]))
         P_ds[-1] = P_d_last
 
+        # Transposes are views, and with a single control the gain is a plain division
+        A_dTs = A_ds.transpose(0, 2, 1)
+        B_dTs = B_ds.transpose(0, 2, 1)
+        single_control = R.shape == (1, 1)
+
+        P_d = P_d_last
         for k in range(A_ds.shape[0]-2, -1, -1):
-            K_ds[k] = np.linalg.inv(R + B_ds[k].T @ P_ds[k+1] @ B_ds[k]) @ (B_ds[k].T @ P_ds[k+1] @ A_ds[k])
-            P_ds[k] = A_ds[k].T @ P_ds[k+1] @ A_ds[k] - (A_ds[k].T @ P_ds[k+1] @ B_ds[k]) @ K_ds[k] + Q
+            PA = P_d @ A_ds[k]
+            PB = P_d @ B_ds[k]
+            if single_control:
+                K_d = (B_dTs[k] @ PA)/(R + B_dTs[k] @ PB)
+            else:
+                K_d = np.linalg.solve(R + B_dTs[k] @ PB, B_dTs[k] @ PA)
+            P_d = A_dTs[k] @ (PA - PB @ K_d) + Q
+            P_d = (P_d + P_d.T)/2
+            K_ds[k] = K_d
+            P_ds[k] = P_d
         
         return P_ds, K_ds
 
@@ -0,0 +1,57 @@
+import numpy as np
+from threading import Thread
+from .cartpoleenv import CartPoleEnv
+from .scheduler import RealTimeScheduler
+
+class CartPoleRenderer:
+    def __init__(self, env: CartPoleEnv, fps: float = 60):
+        self._env = env
+        self._fps = fps
+        self._frame: tuple[float, tuple[np.ndarray, ...]] = (0.0, ())
+        self._running = False
+        self._thread: Thread | None = None
+
+    @property
+    def fps(self) -> float:
+        return self._fps
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def publish(self, *states: np.ndarray, time: float = 0.0):
+        # Swapping in a new tuple is atomic, so the control loop never waits on the render thread
+        self._frame = (time, tuple(np.array(state, dtype=np.float64) for state in states))
+
+    def start(self, *initial_states: np.ndarray, time: float = 0.0):
+        if self._running:
+            return
+        # Until something is published only the given initial states are drawn, the env is never read from the render thread
+        if initial_states:
+            self.publish(*initial_states, time=time)
+        self._running = True
+        self._thread = Thread(target=self.run_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run_loop(self):
+        # pygame is only touched from this thread
+        scheduler = RealTimeScheduler(1/self._fps, spin_time=0)
+        scheduler.start()
+        try:
+            while self._running:
+                time, states = self._frame
+                start = self._env.probes.start()
+                self._env.render(*states, time=time)
+                self._env.probes.record("renderer.frame", start)
+                if self._env.screen is None:
+                    break
+                scheduler.wait()
+        finally:
+            self._running = False
+            self._env.close()
@@ -0,0 +1,94 @@
+from __future__ import annotations
+import os
+import json
+import numpy as np
+import pandas as pd
+
+RUNLOG_VERSION = 1
+
+def write_runlog(path: str, df: pd.DataFrame, time_column: str = "time"):
+    os.makedirs(path, exist_ok=True)
+    columns = [str(column) for column in df.columns]
+
+    # One contiguous row per column, so every column can be mapped without copying
+    data = np.lib.format.open_memmap(f"{path}/data.npy", mode="w+", dtype=np.float64, shape=(len(columns), len(df)))
+    for i, column in enumerate(columns):
+        data[i] = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+    data.flush()
+
+    monotonic = True
+    if time_column in columns:
+        times = data[columns.index(time_column)]
+        rows = np.flatnonzero(np.isfinite(times))
+        monotonic = bool(np.all(np.diff(times[rows]) >= 0))
+        if not monotonic:
+            rows = rows[np.argsort(times[rows], kind="stable")]
+        np.save(f"{path}/time_index.npy", np.vstack((rows, times[rows])))
+    del data
+
+    with open(f"{path}/columns.json", "w") as f:
+        json.dump({
+            "version": RUNLOG_VERSION,
+            "columns": columns,
+            "rows": len(df),
+            "time_column": time_column if time_column in columns else None,
+            "monotonic": monotonic
+        }, f)
+
+def convert_csv(csv_path: str, path: str | None = None, time_column: str = "time") -> str:
+    if path is None:
+        path = f"{os.path.splitext(csv_path)[0]}.runlog"
+    write_runlog(path, pd.read_csv(csv_path), time_column)
+    return path
+
+class RunLog:
+    def __init__(self, path: str):
+        self._path = path
+        with open(f"{path}/columns.json", "r") as f:
+            meta = json.load(f)
+        self._columns: list[str] = meta["columns"]
+        self._indices = {column: i for i, column in enumerate(self._columns)}
+        self._time_column: str | None = meta["time_column"]
+        self._monotonic: bool = meta["monotonic"]
+        self._data = np.load(f"{path}/data.npy", mmap_mode="r")
+
+        self._time_rows = np.array([], dtype=np.int64)
+        self._time_values = np.array([])
+        if self._time_column is not None:
+            time_index = np.load(f"{path}/time_index.npy", mmap_mode="r")
+            self._time_rows = time_index[0].astype(np.int64)
+            self._time_values = time_index[1]
+
+    @property
+    def columns(self) -> list[str]:
+        return self._columns
+
+    def __len__(self) -> int:
+        return self._data.shape[1]
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self._data[self._indices[column]]
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._indices
+
+    def rows(self, start: float, end: float) -> slice | np.ndarray:
+        if self._time_column is None:
+            raise ValueError("Run log has no time column")
+        lo = int(np.searchsorted(self._time_values, start, side="left"))
+        hi = int(np.searchsorted(self._time_values, end, side="right"))
+        if hi <= lo:
+            return slice(0, 0)
+        if self._monotonic:
+            # Rows with a missing time inside the range are kept, so the result stays a view
+            return slice(int(self._time_rows[lo]), int(self._time_rows[hi-1])+1)
+        return np.sort(self._time_rows[lo:hi])
+
+    def time_slice(self, start: float, end: float, columns: list[str] | None = None) -> dict[str, np.ndarray]:
+        rows = self.rows(start, end)
+        return {column: self[column][rows] for column in (columns or self._columns)}
+
+    def to_dataframe(self, columns: list[str] | None = None, start: float | None = None, end: float | None = None) -> pd.DataFrame:
+        if start is None and end is None:
+            return pd.DataFrame({column: self[column] for column in (columns or self._columns)})
+        return pd.DataFrame(self.time_slice(-np.inf if start is None else start, np.inf if end is None else end, columns))
@@ -0,0 +1,132 @@
+from __future__ import annotations
+from enum import Enum
+from math import ceil
+from time import perf_counter, sleep
+import numpy as np
+
+class SchedulePolicy(Enum):
+    # Run missed ticks back to back until the schedule has caught up
+    CATCH_UP = 0
+    # Drop missed ticks and continue on the next deadline of the original grid
+    SKIP = 1
+
+class TimingHistogram:
+    def __init__(self, max_value: float, num_bins: int = 100):
+        self._num_bins = num_bins
+        self._width = max_value/num_bins
+        self.edges = np.linspace(0, max_value, num_bins+1)
+        # The last count collects everything above max_value
+        self.counts = np.zeros(num_bins+1, dtype=np.int64)
+        self.max = 0.0
+        self.total = 0.0
+
+    def add(self, value: float):
+        index = int(value/self._width) if value > 0 else 0
+        self.counts[min(index, self._num_bins)] += 1
+        self.max = max(self.max, value)
+        self.total += value
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    @property
+    def mean(self) -> float:
+        return self.total/max(self.count, 1)
+
+    def percentile(self, q: float) -> float:
+        count = self.count
+        if count == 0:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), q/100*count))
+        if index >= self._num_bins:
+            return self.max
+        return float(self.edges[index+1])
+
+    def reset(self):
+        self.counts[:] = 0
+        self.max = 0.0
+        self.total = 0.0
+
+class RealTimeScheduler:
+    def __init__(self, period: float, spin_time: float = 0.0005, policy: SchedulePolicy = SchedulePolicy.SKIP, max_catch_up: int = 5):
+        self._period = period
+        self._spin_time = spin_time
+        self._policy = policy
+        self._max_catch_up = max_catch_up
+
+        # Lateness of each wake-up relative to its deadline
+        self.latency = TimingHistogram(period)
+        # Deviation of each tick interval from the period
+        self.jitter = TimingHistogram(period)
+        # Time spent working between two waits, compared against the period budget
+        self.work = TimingHistogram(2*period)
+        self.start()
+
+    @property
+    def period(self) -> float:
+        return self._period
+
+    @property
+    def policy(self) -> SchedulePolicy:
+        return self._policy
+
+    def start(self):
+        now = perf_counter()
+        self._deadline = now + self._period
+        self._last_tick = now
+        self._counted_deadline = now
+        self.ticks = 0
+        self.misses = 0
+        self.skipped = 0
+        self.latency.reset()
+        self.jitter.reset()
+        self.work.reset()
+
+    def wait(self) -> float:
+        start = perf_counter()
+        self.work.add(start - self._last_tick)
+
+        remaining = self._deadline - start
+        if remaining > self._spin_time:
+            sleep(remaining - self._spin_time)
+        while perf_counter() < self._deadline:
+            pass
+
+        now = perf_counter()
+        self.latency.add(now - self._deadline)
+        self.jitter.add(abs(now - self._last_tick - self._period))
+        self._last_tick = now
+        self.ticks += 1
+
+        self._deadline += self._period
+        if now > self._deadline:
+            missed = ceil((now - self._deadline)/self._period)
+            # Deadlines that are still pending from an earlier overrun are only counted once
+            uncounted = max(self._deadline, self._counted_deadline)
+            if now > uncounted:
+                self.misses += ceil((now - uncounted)/self._period)
+                self._counted_deadline = uncounted + ceil((now - uncounted)/self._period)*self._period
+
+            if self._policy == SchedulePolicy.SKIP:
+                skipped = missed
+            else:
+                skipped = max(missed - self._max_catch_up, 0)
+            self._deadline += skipped*self._period
+            self.skipped += skipped
+        return now
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "ticks": self.ticks,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "latency_mean": self.latency.mean,
+            "latency_p99": self.latency.percentile(99),
+            "latency_max": self.latency.max,
+            "jitter_mean": self.jitter.mean,
+            "jitter_p99": self.jitter.percentile(99),
+            "work_mean": self.work.mean,
+            "work_p99": self.work.percentile(99),
+            "work_max": self.work.max,
+        }
@@ -0,0 +1,82 @@
+from __future__ import annotations
+import numpy as np
+from serial import Serial
+
+class SerialFrameReader:
+    def __init__(self, ser: Serial, header: bytes, payload_size: int, buffer_frames: int = 8):
+        self._ser = ser
+        self._header = header
+        self._payload_size = payload_size
+        self._frame_size = len(header) + payload_size
+        self._buffer = bytearray(self._frame_size*buffer_frames)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+
+        self.frames = 0
+        self.dropped = 0
+        self.partial = 0
+        self.discarded_bytes = 0
+
+    def _compact(self):
+        if self._start == 0:
+            return
+        size = self._end - self._start
+        self._buffer[:size] = self._view[self._start:self._end]
+        self._start = 0
+        self._end = size
+
+    def _fill(self) -> int:
+        if len(self._buffer) - self._end < self._frame_size:
+            self._compact()
+
+        # Block until at least the rest of a frame has arrived (or the port times out)
+        needed = max(self._frame_size - (self._end - self._start), 1)
+        size = min(max(needed, self._ser.in_waiting), len(self._buffer) - self._end)
+        received = self._ser.readinto(self._view[self._end:self._end+size]) or 0
+        self._end += received
+        if received < needed and self._end > self._start:
+            self.partial += 1
+        return received
+
+    def _next_frame(self) -> int:
+        index = self._buffer.find(self._header, self._start, self._end)
+        if index < 0:
+            # Everything except a possible partial header is garbage
+            keep = min(len(self._header)-1, self._end - self._start)
+            self.discarded_bytes += self._end - self._start - keep
+            self._start = self._end - keep
+            return -1
+
+        self.discarded_bytes += index - self._start
+        self._start = index
+        if self._end - index < self._frame_size:
+            return -1
+        return index + len(self._header)
+
+    def read_frame(self, out: np.ndarray) -> bool:
+        self._fill()
+
+        payload = self._next_frame()
+        if payload < 0:
+            return False
+
+        # Only the newest complete frame is used, older ones count as dropped
+        self._start = payload + self._payload_size
+        newest = payload
+        while (payload := self._next_frame()) >= 0:
+            self.dropped += 1
+            newest = payload
+            self._start = payload + self._payload_size
+
+        out[:] = np.frombuffer(self._buffer, dtype=out.dtype, count=out.size, offset=newest)
+        self.frames += 1
+        return True
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "partial": self.partial,
+            "discarded_bytes": self.discarded_bytes,
+        }
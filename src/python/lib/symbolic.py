@@ -0,0 +1,120 @@
+from __future__ import annotations
+import os
+import sympy as sp
+import sympy.physics.mechanics as me
+
+def derive_equations(num_poles: int, m_c, g, pole_ms, pole_ls, pole_as, pole_ds, pole_Js) -> tuple[list, list]:
+    t = me.dynamicsymbols._t
+    s = me.dynamicsymbols("s")
+    d_s = sp.diff(s, t)
+    dd_s = sp.diff(d_s, t)
+    thetas = [me.dynamicsymbols(f"theta{i+1}") for i in range(num_poles)]      #type: ignore
+    d_thetas = [sp.diff(theta, t) for theta in thetas]
+    dd_thetas = [sp.diff(d_theta, t) for d_theta in d_thetas]
+    tau = sp.symbols("tau")
+
+    pole_pc1s = []
+    pole_pc2s = []
+    for i, (theta, a) in enumerate(zip(thetas, pole_as)):
+        prev_1 = 0
+        prev_2 = 0
+        for prev_l, prev_theta in list(zip(pole_ls, thetas))[:i]:
+            prev_1 += -prev_l*sp.sin(-prev_theta)       #type: ignore
+            prev_2 += prev_l*sp.cos(-prev_theta)        #type: ignore
+        pole_pc1s.append(s-a*sp.sin(-theta)+prev_1)     #type: ignore
+        pole_pc2s.append(a*sp.cos(-theta)+prev_2)       #type: ignore
+
+    T = 1/2*m_c*d_s**2         #type: ignore
+    for m, pc1, pc2, J, d_theta in zip(pole_ms, pole_pc1s, pole_pc2s, pole_Js, d_thetas):
+        d_pc1 = sp.diff(pc1, t)
+        d_pc2 = sp.diff(pc2, t)
+        T += 1/2*m*(d_pc1**2 + d_pc2**2) + 1/2*J*d_theta**2     #type: ignore
+
+    V = 0   
+    for m, pc2 in zip(pole_ms, pole_pc2s):
+        V += g*m*pc2
+
+    R = 0
+    prev_w = 0
+    for d, d_theta in zip(pole_ds, d_thetas):
+        R += 1/2*d*(d_theta-prev_w)**2     #type: ignore
+        prev_w = d_theta
+
+    eqs = []
+    L = T-V
+    lh = sp.diff(sp.diff(L, d_s), t) - sp.diff(L, s) + sp.diff(R, d_s)     #type: ignore
+    rh = tau
+    eqs = [lh-rh]
+    for theta, d_theta in zip(thetas, d_thetas):
+        L = T-V
+        lh = sp.diff(sp.diff(L, d_theta), t) - sp.diff(L, theta) + sp.diff(R, d_theta)     #type: ignore
+        rh = 0
+        eqs.append(lh-rh)
+
+    sp_vars = [s, d_s] + [item for pair in zip(thetas, d_thetas) for item in pair] + [dd_s] + dd_thetas
+    # The pole equations are linear in dd_thetas and tau only appears in the cart equation,
+    # so solving them separately avoids a full sp.solve + sp.simplify on the parametric system
+    M, b = sp.linear_eq_to_matrix(eqs[1:], dd_thetas)
+    sols = {dd_theta: sp.factor_terms(sp.cancel(sol)) for dd_theta, sol in zip(dd_thetas, M.LUsolve(b))}
+    sols[tau] = sp.solve(eqs[0], tau)[0].xreplace(sols)
+    sp_sols = [sols[dd_theta] for dd_theta in dd_thetas] + [sols[tau]]
+
+    pure_s, pure_d_s, pure_dd_s = sp.symbols("s d_s dd_s")
+    pure_thetas = [sp.symbols(f"theta{i+1}") for i in range(num_poles)]        #type: ignore
+    pure_d_thetas = [sp.symbols(f"d_theta{i+1}") for i in range(num_poles)]    #type: ignore
+    pure_dd_thetas = [sp.symbols(f"dd_theta{i+1}") for i in range(num_poles)]  #type: ignore
+
+    pure_vars = [pure_s, pure_d_s] + [item for pair in zip(pure_thetas, pure_d_thetas) for item in pair] + [pure_dd_s] + pure_dd_thetas
+    subs_dict = dict(zip(sp_vars, pure_vars))
+    pure_sols = [sol.subs(subs_dict) for sol in sp_sols]
+
+    return pure_vars, pure_sols
+
+def parametric_symbols(num_poles: int) -> list[sp.Symbol]:
+    m_c, g = sp.symbols("m_c g")
+    pole_ms = [sp.symbols(f"m{i+1}") for i in range(num_poles)]
+    pole_ls = [sp.symbols(f"l{i+1}") for i in range(num_poles)]
+    pole_as = [sp.symbols(f"a{i+1}") for i in range(num_poles)]
+    pole_ds = [sp.symbols(f"d{i+1}") for i in range(num_poles)]
+    pole_Js = [sp.symbols(f"J{i+1}") for i in range(num_poles)]
+    return [m_c, g] + pole_ms + pole_ls + pole_as + pole_ds + pole_Js
+
+_parametric_equations: dict[tuple[int, str | None], tuple[list, list, list]] = {}
+
+def _read_parametric_equations(names: list[str], sp_params: list) -> tuple[list, list] | None:
+    if not all(os.path.exists(name) for name in names):
+        return None
+    # Equations saved with a different parametrization are stale and have to be derived again
+    with open(names[1], "r") as f:
+        if f.read().split("\n") != [str(param) for param in sp_params]:
+            return None
+    with open(names[0], "r") as f:
+        sp_vars = [sp.Symbol(var) for var in f.read().split("\n")]
+    symbols = {str(symbol): symbol for symbol in sp_vars + sp_params}
+    with open(names[2], "r") as f:
+        sp_sols = [sp.sympify(sol, locals=symbols) for sol in f.read().split("\n")]
+    return sp_vars, sp_sols
+
+def load_parametric_equations(num_poles: int, path: str | None = None) -> tuple[list, list, list]:
+    key = (num_poles, path)
+    if key in _parametric_equations:
+        return _parametric_equations[key]
+
+    sp_params = parametric_symbols(num_poles)
+    names = [f"{path}/{name}_{num_poles}_poles.txt" for name in ("vars", "params", "sols")]
+
+    loaded = _read_parametric_equations(names, sp_params) if path is not None else None
+    if loaded is not None:
+        sp_vars, sp_sols = loaded
+    else:
+        m_c, g = sp_params[:2]
+        pole_params = [sp_params[2+i*num_poles:2+(i+1)*num_poles] for i in range(5)]
+        sp_vars, sp_sols = derive_equations(num_poles, m_c, g, *pole_params)
+
+        if path is not None:
+            for name, exprs in zip(names, (sp_vars, sp_params, sp_sols)):
+                with open(name, "w") as f:
+                    f.write("\n".join(str(expr) for expr in exprs))
+
+    _parametric_equations[key] = (sp_vars, sp_params, sp_sols)
+    return _parametric_equations[key]
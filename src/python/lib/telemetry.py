@@ -0,0 +1,156 @@
+from __future__ import annotations
+import os
+import json
+from queue import Queue
+from threading import Thread
+import numpy as np
+
+def read_telemetry(path: str) -> dict[str, np.ndarray]:
+    with open(f"{path}/telemetry.json", "r") as f:
+        meta = json.load(f)
+    dtype = np.dtype(meta["dtype"])
+    rows = meta["rows"]
+    return {
+        name: np.memmap(f"{path}/{name}.bin", dtype=dtype, mode="r", shape=(rows, width)) if rows > 0 else np.zeros((0, width), dtype=dtype)
+        for name, width in meta["columns"].items()
+    }
+
+class TelemetryRecorder:
+    def __init__(
+        self,
+        columns: dict[str, int],
+        chunk_size: int = 4096,
+        dtype: type = np.float64,
+        path: str | None = None
+    ):
+        self._columns = columns
+        self._chunk_size = chunk_size
+        self._dtype = dtype
+        self._path = path
+        self._size = 0
+
+        if path is None:
+            # In memory every column is one contiguous array grown by whole chunks, so reading a column is a view
+            self._capacity = chunk_size
+            self._data = {name: np.zeros((chunk_size, width), dtype=dtype) for name, width in columns.items()}
+            return
+
+        # On disk every column is an append-only raw file, the rows are written by a background thread
+        # from a few recycled chunks, so memory stays constant and reading a column is a memory map
+        os.makedirs(path, exist_ok=True)
+        self._files = {name: open(self._column_file(name), "wb") for name in columns}
+        self._free_chunks: Queue[dict[str, np.ndarray]] = Queue()
+        self._write_queue: Queue[tuple[dict[str, np.ndarray], int, int, bool] | None] = Queue()
+        self._writer: Thread | None = Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        self._new_chunk()
+        self._write_meta()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def columns(self) -> dict[str, int]:
+        return self._columns
+
+    def _column_file(self, name: str) -> str:
+        return f"{self._path}/{name}.bin"
+
+    def _write_meta(self):
+        meta = {
+            "columns": self._columns,
+            "dtype": np.dtype(self._dtype).str,
+            "rows": self._size - (self._row - self._queued_rows)
+        }
+        with open(f"{self._path}/telemetry.json", "w") as f:
+            json.dump(meta, f)
+
+    def _new_chunk(self):
+        if not self._free_chunks.empty():
+            chunk = self._free_chunks.get()
+        else:
+            chunk = {name: np.zeros((self._chunk_size, width), dtype=self._dtype) for name, width in self._columns.items()}
+        self._chunk = chunk
+        self._row = 0
+        # Rows of the current chunk already handed to the writer by a flush
+        self._queued_rows = 0
+
+    def _grow(self):
+        self._capacity += self._chunk_size
+        for name, values in self._data.items():
+            grown = np.zeros((self._capacity, values.shape[1]), dtype=self._dtype)
+            grown[:self._size] = values[:self._size]
+            self._data[name] = grown
+
+    def _write_loop(self):
+        while True:
+            item = self._write_queue.get()
+            if item is None:
+                self._write_queue.task_done()
+                break
+            chunk, start, end, full = item
+            for name, file in self._files.items():
+                file.write(chunk[name][start:end].tobytes())
+            if full:
+                # The written chunk is reused for new rows, which keeps memory constant
+                self._free_chunks.put(chunk)
+            self._write_queue.task_done()
+
+    def append(self, *values: np.ndarray | float):
+        if self._path is None:
+            if self._size == self._capacity:
+                self._grow()
+            for name, value in zip(self._columns, values):
+                self._data[name][self._size] = value
+            self._size += 1
+            return
+
+        for name, value in zip(self._columns, values):
+            self._chunk[name][self._row] = value
+        self._row += 1
+        self._size += 1
+
+        if self._row == self._chunk_size:
+            self._write_queue.put((self._chunk, self._queued_rows, self._row, True))
+            self._new_chunk()
+
+    def get(self, name: str, index: int = -1) -> np.ndarray:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError(f"Telemetry index {index} out of range")
+        if self._path is None:
+            return self._data[name][index]
+        chunk_start = self._size - self._row
+        if index >= chunk_start:
+            return self._chunk[name][index - chunk_start]
+        return np.array(self.column(name)[index])
+
+    def column(self, name: str) -> np.ndarray:
+        if self._path is None:
+            return self._data[name][:self._size]
+        self.flush()
+        if self._size == 0:
+            return np.zeros((0, self._columns[name]), dtype=self._dtype)
+        return np.memmap(self._column_file(name), dtype=self._dtype, mode="r", shape=(self._size, self._columns[name]))
+
+    def flush(self):
+        if self._path is None or self._writer is None:
+            return
+        if self._row > self._queued_rows:
+            self._write_queue.put((self._chunk, self._queued_rows, self._row, False))
+            self._queued_rows = self._row
+        self._write_queue.join()
+        for file in self._files.values():
+            file.flush()
+        self._write_meta()
+
+    def close(self):
+        if self._path is None or self._writer is None:
+            return
+        self.flush()
+        self._write_queue.put(None)
+        self._writer.join()
+        self._writer = None
+        for file in self._files.values():
+            file.close()
@@ -0,0 +1,66 @@
+from __future__ import annotations
+import os
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from .cartpolesystem import CartPoleSystem
+
+Trajectory = tuple[np.ndarray, np.ndarray, np.ndarray]
+
+class TrajectoryCache:
+    def __init__(self, path: str | None = None, max_size: int = 32, resolution: float = 1e-3):
+        self._path = path
+        self._max_size = max_size
+        self._resolution = resolution
+        self._entries: OrderedDict[str, Trajectory] = OrderedDict()
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def _quantize(self, values: np.ndarray) -> np.ndarray:
+        return np.round(np.asarray(values, dtype=np.float64)/self._resolution).astype(np.int64)
+
+    def key(self, system: CartPoleSystem, x0: np.ndarray, target_state: np.ndarray, end_time: float, dt: float, Q: np.ndarray, R: np.ndarray) -> str:
+        states = np.array([x0, target_state], dtype=np.float64)
+        # pi and -pi are the same pole position
+        states[:,2::2] = (states[:,2::2] + np.pi) % (2*np.pi) - np.pi
+
+        digest = hashlib.sha1()
+        for values in (states, [end_time, dt], Q, R):
+            digest.update(self._quantize(values).tobytes())
+        return f"{hash(system)}_{digest.hexdigest()[:16]}"
+
+    def _file(self, key: str) -> str:
+        return f"{self._path}/trajectory_{key}.npz"
+
+    def get(self, key: str) -> Trajectory | None:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        if self._path is None or not os.path.exists(self._file(key)):
+            return None
+
+        with np.load(self._file(key)) as data:
+            trajectory = (data["states"], data["controls"], data["K_ds"])
+        self._remember(key, trajectory)
+        return trajectory
+
+    def put(self, key: str, states: np.ndarray, controls: np.ndarray, K_ds: np.ndarray):
+        trajectory = (states, controls, K_ds)
+        self._remember(key, trajectory)
+
+        if self._path is not None:
+            # Write to a temporary file first so a crash never leaves a truncated entry behind
+            tmp_file = f"{self._path}/trajectory_{key}.tmp.npz"
+            np.savez_compressed(tmp_file, states=states, controls=controls, K_ds=K_ds)
+            os.replace(tmp_file, self._file(key))
+
+    def _remember(self, key: str, trajectory: Trajectory):
+        self._entries[key] = trajectory
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
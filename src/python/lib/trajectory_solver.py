@@ -0,0 +1,69 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+import numpy as np
+from .cartpolesystem import CartPoleSystem
+from .direct_collocation import CartPoleDirectCollocation
+
+# Worker process state, set once by _init_worker and reused by every request
+_solver_args: tuple = ()
+_direct_collocations: dict[tuple, CartPoleDirectCollocation] = {}
+
+def _init_worker(
+        num_poles: int, 
+        m_c: float,
+        radius: float,
+        state_lower_bound: np.ndarray,
+        state_upper_bound: np.ndarray,
+        state_margin: np.ndarray,
+        ca_differentiate, 
+        tolerance: float
+    ):
+    global _solver_args
+    _solver_args = (
+        num_poles, 
+        m_c, 
+        radius, 
+        state_lower_bound, 
+        state_upper_bound, 
+        state_margin, 
+        ca_differentiate, 
+        tolerance
+    )
+
+def _ready() -> bool:
+    return True
+
+def _solve(N: int, N_collocation: int, end_time: float, x0: np.ndarray, target_state: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # One solver per target, so repeated requests for the same target warm start from its own last solution
+    key = (N, N_collocation, tuple(np.round(target_state, 6)))
+    if key not in _direct_collocations:
+        _direct_collocations[key] = CartPoleDirectCollocation(N, N_collocation, *_solver_args)
+    return _direct_collocations[key].make_solver(end_time, x0, target_state)
+
+class TrajectorySolver:
+    def __init__(self, system: CartPoleSystem, dt: float, dt_collocation: float = 0.03, tolerance: float = 0.0001, max_workers: int = 1):
+        self._dt = dt
+        self._dt_collocation = dt_collocation
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers, 
+            initializer=_init_worker, 
+            initargs=(
+                system.num_poles, 
+                system.m_c,
+                system.motor.r,
+                system.state_lower_bound,
+                system.state_upper_bound,
+                system.state_margin,
+                system.ca_differentiate,
+                tolerance
+            )
+        )
+        # Start the workers right away so the first request does not pay for it
+        self._executor.submit(_ready)
+
+    def submit(self, x0: np.ndarray, target_state: np.ndarray, end_time: float) -> Future:
+        N = int(end_time/self._dt)
+        N_collocation = int(end_time/self._dt_collocation)+1
+        return self._executor.submit(_solve, N, N_collocation, end_time, x0, target_state)
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
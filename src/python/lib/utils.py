@@ -11,4 +11,15 @@ def sympy2casadi(sympy_expr,sympy_var,casadi_var):
              'Abs':casadi.fabs
             }
   f = lambdify(sympy_var,sympy_expr,modules=[mapping, casadi])
-  return f(*casadi_var)
\ No newline at end of file
+  return f(*casadi_var)
+
+def compile_functions(functions, path, name, compiler="gcc"):
+  import subprocess
+  import casadi
+  generator = casadi.CodeGenerator(f"{name}.c")
+  for function in functions:
+    generator.add(function)
+  generator.generate(f"{path}/")
+  library = f"{path}/{name}.so"
+  subprocess.run([compiler, "-fPIC", "-shared", "-O3", f"{path}/{name}.c", "-o", library], check=True)
+  return [casadi.external(function.name(), library) for function in functions]
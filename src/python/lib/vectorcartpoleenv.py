@@ -0,0 +1,159 @@
+from __future__ import annotations
+import tempfile
+import numpy as np
+import casadi as ca
+from gym import spaces
+from .cartpolesystem import CartPoleSystem
+from .numerical import rk4_step
+from .utils import compile_functions
+
+class VectorCartPoleEnv:
+    def __init__(
+        self,
+        system: CartPoleSystem,
+        dt_sim: float,
+        num_envs: int,
+        auto_reset: bool = True,
+        compile: bool = False,
+        compiler: str = "gcc",
+        path: str | None = None,
+        seed: int | None = None
+    ):
+        self.system = system
+        self.dt_sim = dt_sim
+        self.num_envs = num_envs
+        self.auto_reset = auto_reset
+        self.max_height = system.L
+        self.rng = np.random.default_rng(seed)
+
+        self.single_action_space = spaces.Box(
+            low=system.control_lower_bound,
+            high=system.control_upper_bound,
+            dtype=np.float64
+        )
+        self.single_observation_space = spaces.Box(
+            low=system.state_lower_bound,
+            high=system.state_upper_bound,
+            dtype=np.float64
+        )
+
+        f_max = system.motor.torque_bounds[1]/system.motor.r
+        f_min = system.motor.torque_bounds[0]/system.motor.r
+        self._control_bounds = (f_min/system.m_c, f_max/system.m_c)
+        self._steps_limit = int(5/dt_sim)
+
+        # CasADi matrices are column-major, so a C-ordered (num_envs, n) array is an (n, num_envs) matrix without copying
+        n = system.num_states
+        self._states = np.zeros((num_envs, n))
+        self._actions = np.zeros((num_envs, system.num_controls))
+        self._controls = np.zeros((num_envs, system.num_controls))
+        self._next_states = np.zeros((num_envs, n))
+        self._constraint_states = np.zeros((num_envs, system.num_constraint_states))
+        self.counter_up = np.zeros(num_envs, dtype=np.int64)
+        self.counter_down = np.zeros(num_envs, dtype=np.int64)
+        self.times = np.zeros(num_envs)
+
+        step, constraint_states = self._make_functions(compile, compiler, path)
+        self.ca_step = step
+        self.ca_constraint_states = constraint_states
+
+        self._step_buffer, self._step_eval = step.buffer()
+        self._step_buffer.set_arg(0, memoryview(self._states))
+        self._step_buffer.set_arg(1, memoryview(self._controls))
+        self._step_buffer.set_res(0, memoryview(self._next_states))
+
+        self._constraint_buffer, self._constraint_eval = constraint_states.buffer()
+        self._constraint_buffer.set_arg(0, memoryview(self._states))
+        # Like CartPoleEnv.step, the constraint states are evaluated with the unclipped actions
+        self._constraint_buffer.set_arg(1, memoryview(self._actions))
+        self._constraint_buffer.set_res(0, memoryview(self._constraint_states))
+
+        self.reset()
+
+    def _make_functions(self, compile: bool, compiler: str, path: str | None) -> tuple[ca.Function, ca.Function]:
+        differentiate = self.system.ca_differentiate_vec
+        sym = ca.SX if differentiate.is_a("SXFunction") else ca.MX
+
+        x = sym.sym("state", self.system.num_states) #type: ignore
+        u = sym.sym("control", self.system.num_controls) #type: ignore
+        next_x, _ = rk4_step(self.dt_sim, differentiate, x, u)
+        rk4 = ca.Function("rk4_step", [x, u], [next_x], ["state", "control"], ["next_state"])
+
+        step = rk4.map(f"vector_step_{self.num_envs}", "serial", self.num_envs, [], [])
+        constraint_states = self.system.ca_constraint_states_vec.map(f"vector_constraint_states_{self.num_envs}", "serial", self.num_envs, [], [])
+        if not compile:
+            return step, constraint_states
+
+        if path is None:
+            path = tempfile.gettempdir()
+        step, constraint_states = compile_functions([step, constraint_states], path, f"vector_{hash(self.system)}_{self.num_envs}", compiler)
+        return step, constraint_states
+
+    @property
+    def states(self) -> np.ndarray:
+        return self._states
+
+    @property
+    def controls(self) -> np.ndarray:
+        return self._controls
+
+    @property
+    def constraint_states(self) -> np.ndarray:
+        return self._constraint_states
+
+    def random_states(self, num: int) -> np.ndarray:
+        states = np.zeros((num, self.system.num_states))
+        states[:,0] = self.rng.uniform(self.system.state_lower_bound[0], self.system.state_upper_bound[0], num)*0.8
+        states[:,2::2] = np.radians(self.rng.uniform(-50, 50, (num, self.system.num_poles)))
+        return states
+
+    def reset(self, initial_states: np.ndarray | None = None, mask: np.ndarray | None = None) -> tuple[np.ndarray, dict]:
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        num = int(np.count_nonzero(mask))
+
+        if initial_states is None:
+            self._states[mask] = self.random_states(num)
+        else:
+            self._states[mask] = np.broadcast_to(initial_states, (self.num_envs, self.system.num_states))[mask]
+
+        self._actions[mask] = 0
+        self._controls[mask] = 0
+        self.counter_up[mask] = 0
+        self.counter_down[mask] = 0
+        self.times[mask] = 0
+        self._constraint_eval()
+
+        return self._states, {"Msg": "Reset env"}
+
+    def step(self, actions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict, np.ndarray]:
+        self._actions[:] = actions
+        np.clip(self._actions, *self._control_bounds, out=self._controls)
+        self._step_eval()
+
+        np.clip(self._next_states[:,:2], self.system.state_lower_bound[:2], self.system.state_upper_bound[:2], out=self._states[:,:2])
+        np.remainder(self._next_states[:,2::2] + np.pi, 2*np.pi, out=self._states[:,2::2])
+        self._states[:,2::2] -= np.pi
+        self._states[:,3::2] = self._next_states[:,3::2]
+        self._constraint_eval()
+        self.times += self.dt_sim
+
+        x = self._states[:,0]
+        y = np.sin(self._states[:,2::2]) @ self.system.pole_ls
+        up = (y > self.max_height*0.9) & np.all(np.abs(self._states[:,3::2]) < 1, axis=1)
+
+        lost = (x >= self.system.state_upper_bound[0]) | (x <= self.system.state_lower_bound[0])
+        won = self.counter_up > self._steps_limit
+        done = won | lost | (self.counter_down > self._steps_limit)
+
+        self.counter_up = np.where(up, self.counter_up + 1, 0)
+        self.counter_down = np.where(up, 0, self.counter_down + 1)
+
+        rewards = np.where(up, 0.0, -1.0) - 10.0*lost + 10.0*(won & ~lost)
+        info = {"won": won, "lost": lost}
+
+        if self.auto_reset and done.any():
+            info["final_states"] = self._states[done].copy()
+            self.reset(mask=done)
+
+        return self._states, rewards, done, info, np.zeros(self.num_envs, dtype=bool)